@@ -62,6 +62,28 @@ int8_t lx = 0, ly = 0, rx = 0, ry = 0;
 uint8_t lt = 0, rt = 0;
 uint16_t buttons = 0;
 
+/* =====================================================
+   ================= SERIAL PROTOCOL ===================
+   ===================================================== */
+// Must match serial_protocol.py on the Pi.
+// Command: [0xA5][seq][lx ly rx ry lt rt btn_hi btn_lo][crc8]
+// Ack:     [0x5A][seq][flags][loop_us lo][loop_us hi][crc8]
+
+const uint8_t CMD_SYNC = 0xA5;
+const uint8_t ACK_SYNC = 0x5A;
+const int CMD_LEN = 11;
+const uint8_t ACK_FLAG_FAILSAFE = 0x01;
+
+// Pi sends a keepalive at least every 200ms; stop if we hear nothing for longer
+const unsigned long FAILSAFE_MS = 500;
+
+uint8_t rxBuf[CMD_LEN];
+int rxLen = 0;
+unsigned long lastPacketMs = 0;
+bool failsafe = false;
+unsigned long lastLoopUs = 0;
+unsigned long loopUs = 0;
+
 /* =====================================================
    ================= SETUP =============================
    ===================================================== */
@@ -90,7 +112,12 @@ void setup() {
    ===================================================== */
 
 void loop() {
+  unsigned long now = micros();
+  loopUs = now - lastLoopUs;
+  lastLoopUs = now;
+
   readControllerPacket();
+  checkFailsafe();
 
   // ---- LEFT STICK → STEPPERS ----
   int* speeds = holonomicXDrive(
@@ -216,12 +243,30 @@ void updateGimbalFromJoystick() {
    ================= SERIAL INPUT ======================
    ===================================================== */
 
-void readControllerPacket() {
-  if (Serial.available() < 8) return;
+uint8_t crc8(const uint8_t* data, int len) {
+  uint8_t crc = 0;
+  for (int i = 0; i < len; i++) {
+    crc ^= data[i];
+    for (int b = 0; b < 8; b++) {
+      crc = (crc & 0x80) ? (uint8_t)((crc << 1) ^ 0x07) : (uint8_t)(crc << 1);
+    }
+  }
+  return crc;
+}
 
-  uint8_t buf[8];
-  Serial.readBytes(buf, 8);
+void sendAck(uint8_t seq) {
+  uint16_t us = loopUs > 0xFFFF ? 0xFFFF : (uint16_t)loopUs;
+  uint8_t ack[6];
+  ack[0] = ACK_SYNC;
+  ack[1] = seq;
+  ack[2] = failsafe ? ACK_FLAG_FAILSAFE : 0;
+  ack[3] = us & 0xFF;
+  ack[4] = us >> 8;
+  ack[5] = crc8(ack + 1, 4);
+  Serial.write(ack, 6);
+}
 
+void applyPacket(const uint8_t* buf) {
   lx = (int8_t)buf[0];
   ly = (int8_t)buf[1];
   rx = (int8_t)buf[2];
@@ -233,3 +278,35 @@ void readControllerPacket() {
 
   buttons = ((uint16_t)buf[6] << 8) | buf[7];
 }
+
+void readControllerPacket() {
+  // Byte-at-a-time so a partial frame never blocks the motor loop
+  while (Serial.available() > 0) {
+    uint8_t b = Serial.read();
+    if (rxLen == 0 && b != CMD_SYNC) continue; // Hunt for sync
+    rxBuf[rxLen++] = b;
+    if (rxLen < CMD_LEN) continue;
+
+    if (crc8(rxBuf + 1, CMD_LEN - 2) == rxBuf[CMD_LEN - 1]) {
+      applyPacket(rxBuf + 2);
+      lastPacketMs = millis();
+      sendAck(rxBuf[1]);
+      failsafe = false;
+      rxLen = 0;
+    } else {
+      // Bad frame: drop the sync byte and rescan what we already have
+      int next = 1;
+      while (next < CMD_LEN && rxBuf[next] != CMD_SYNC) next++;
+      rxLen = CMD_LEN - next;
+      memmove(rxBuf, rxBuf + next, rxLen);
+    }
+  }
+}
+
+void checkFailsafe() {
+  if (!failsafe && millis() - lastPacketMs > FAILSAFE_MS) {
+    failsafe = true;
+    uint8_t neutral[8] = {0, 0, 0, 0, 0, 0, 0, 0};
+    applyPacket(neutral);
+  }
+}
@@ -0,0 +1,119 @@
+import os
+import select
+import sys
+import threading
+import time
+import tty
+
+from serial_protocol import FrameParser, encode_ack, CMD_SYNC, CMD_LEN, ACK_FLAG_FAILSAFE
+
+# PTY stand-in for arduino/motor-control.ino, so the Pi's serial path can be
+# tested and benchmarked without hardware.
+#
+#   python arduino_emulator.py            # prints a /dev/pts/N path
+#   SERIAL_PORT=/dev/pts/N python pi_client.py
+#   python arduino_emulator.py --bench    # ack latency through pi_client.SerialLink
+
+FAILSAFE_MS = 500 # Same as the sketch
+LOOP_US = 250 # Pretend motor loop time reported in acks
+
+class ArduinoEmulator:
+    def __init__(self, failsafe_ms=FAILSAFE_MS, ack_delay=0.0):
+        self.master, slave = os.openpty()
+        tty.setraw(slave)
+        self.slave = slave
+        self.port = os.ttyname(slave)
+        self.failsafe_ms = failsafe_ms
+        self.ack_delay = ack_delay # Simulated processing time before the ack
+
+        self.parser = FrameParser(CMD_SYNC, CMD_LEN)
+        self.state = {"lx": 0, "ly": 0, "rx": 0, "ry": 0, "lt": 0, "rt": 0, "buttons": 0}
+        self.packets = 0
+        self.failsafe = True # Like the sketch: stopped until the first command
+        self.last_packet = 0.0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="arduino-emu", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1.0)
+        os.close(self.master)
+        os.close(self.slave)
+
+    def apply(self, payload):
+        signed = lambda b: b - 256 if b > 127 else b
+        self.state = {
+            "lx": signed(payload[0]), "ly": signed(payload[1]),
+            "rx": signed(payload[2]), "ry": signed(payload[3]),
+            "lt": payload[4], "rt": payload[5],
+            "buttons": (payload[6] << 8) | payload[7]
+        }
+
+    def run(self):
+        while self.running:
+            ready, _, _ = select.select([self.master], [], [], 0.01)
+            if ready:
+                try:
+                    data = os.read(self.master, 256)
+                except OSError:
+                    break
+                for frame in self.parser.feed(data):
+                    seq, payload = frame[1], frame[2:-1]
+                    self.apply(payload)
+                    self.packets += 1
+                    self.last_packet = time.time()
+                    was_failsafe = self.failsafe
+                    self.failsafe = False
+                    if self.ack_delay:
+                        time.sleep(self.ack_delay)
+                    flags = ACK_FLAG_FAILSAFE if was_failsafe else 0
+                    os.write(self.master, encode_ack(seq, flags, LOOP_US))
+
+            # Failsafe: stop if commands go quiet
+            if not self.failsafe and (time.time() - self.last_packet) * 1000 > self.failsafe_ms:
+                self.failsafe = True
+                self.apply(bytes(8))
+                print("[EMU] Failsafe: no commands, motors stopped")
+
+def bench(updates=500, rate_hz=100):
+    """Drives pi_client.SerialLink against the emulator and reports ack latency."""
+    import serial
+    import pi_client
+
+    emu = ArduinoEmulator().start()
+    ser = serial.Serial(emu.port, pi_client.BAUD_RATE, timeout=0.05)
+    link = pi_client.SerialLink(ser)
+    link.start()
+    try:
+        for i in range(updates):
+            link.update(bytes([i & 0x7F, 0, 0, 0, 0, 0, 0, 0]))
+            time.sleep(1.0 / rate_hz)
+        time.sleep(0.3)
+        st = link.stats()
+    finally:
+        link.stop()
+        ser.close()
+        emu.stop()
+    print(f"updates={updates} @ {rate_hz}Hz -> writes={st['writes']} acks={st['acks']} crc_errors={st['crc_errors']}")
+    print(f"ack p50={st['ack_p50_ms']:.3f}ms max={st['ack_max_ms']:.3f}ms, input->ack p50={st['input_p50_ms']:.3f}ms")
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        bench()
+        sys.exit(0)
+    emu = ArduinoEmulator().start()
+    print(f"Arduino emulator on {emu.port}")
+    print(f"Run: SERIAL_PORT={emu.port} python pi_client.py")
+    try:
+        while True:
+            time.sleep(1.0)
+            print(f"\r[EMU] packets={emu.packets} failsafe={emu.failsafe} {emu.state}   ", end="", flush=True)
+    except KeyboardInterrupt:
+        emu.stop()
@@ -0,0 +1,113 @@
+import os
+import time
+from typing import Dict, Optional
+
+# ----- ADMISSION CONTROL -----
+# Spectators are what scales with a crowd: every one of them is another video
+# send per Pi frame. Load is the highest of three budget ratios: connected
+# clients, relay egress, and CPU time of this process (mostly the event loop).
+# As it rises, spectators get fewer frames and eventually new ones are turned
+# away. The active player and anyone holding a queue slot are never shed (see
+# VideoRelay.spectator_interval and ConnectionManager.admit).
+#
+#   normal    everyone gets every frame
+#   reduced   spectators get REDUCED_FPS
+#   snapshot  spectators get one frame a second
+#   full      as snapshot, and new spectators are refused with a retry hint
+#
+# A budget set to 0 is ignored.
+
+MAX_CLIENTS = int(os.environ.get("MAX_CLIENTS", "150"))
+MAX_EGRESS_MBPS = float(os.environ.get("MAX_EGRESS_MBPS", "40"))
+MAX_CPU = float(os.environ.get("MAX_CPU", "0.85")) # Fraction of one core
+
+LEVEL_NORMAL = "normal"
+LEVEL_REDUCED = "reduced"
+LEVEL_SNAPSHOT = "snapshot"
+LEVEL_FULL = "full"
+LEVELS = [LEVEL_NORMAL, LEVEL_REDUCED, LEVEL_SNAPSHOT, LEVEL_FULL]
+BOUNDS = [0.7, 0.9, 1.0] # Load at which each level after normal starts
+HYSTERESIS = 0.1 # Load has to fall this far below a bound to step back down
+
+REDUCED_FPS = 5
+SPECTATOR_INTERVAL = {LEVEL_NORMAL: 0.0, LEVEL_REDUCED: 1.0 / REDUCED_FPS, LEVEL_SNAPSHOT: 1.0, LEVEL_FULL: 1.0}
+
+SAMPLE_INTERVAL = 1.0 # Seconds between load measurements
+RETRY_AFTER = 10 # Seconds a refused client is told to wait
+
+def level_index(load: float) -> int:
+    return sum(1 for bound in BOUNDS if load >= bound)
+
+class LoadMonitor:
+    def __init__(self, max_clients: int = MAX_CLIENTS, max_egress_mbps: float = MAX_EGRESS_MBPS,
+                 max_cpu: float = MAX_CPU):
+        self.max_clients = max_clients
+        self.max_egress = max_egress_mbps * 1e6 / 8 # bytes/s
+        self.max_cpu = max_cpu
+        self.level = LEVEL_NORMAL
+        self.load = 0.0
+        self.clients = 0
+        self.egress = 0.0 # bytes/s
+        self.cpu = 0.0
+        self.refused = 0
+        self.last_at: Optional[float] = None
+        self.last_bytes = 0
+        self.last_cpu = 0.0
+
+    def sample(self, clients: int, bytes_sent: int, now: Optional[float] = None,
+               cpu_time: Optional[float] = None) -> bool:
+        """Updates the load level at most once per SAMPLE_INTERVAL. Returns True if it changed."""
+        now = time.time() if now is None else now
+        cpu_time = time.process_time() if cpu_time is None else cpu_time
+        self.clients = clients
+        if self.last_at is None:
+            self.last_at, self.last_bytes, self.last_cpu = now, bytes_sent, cpu_time
+            return False
+        elapsed = now - self.last_at
+        if elapsed < SAMPLE_INTERVAL:
+            return False
+
+        self.egress = (bytes_sent - self.last_bytes) / elapsed
+        self.cpu = (cpu_time - self.last_cpu) / elapsed
+        self.last_at, self.last_bytes, self.last_cpu = now, bytes_sent, cpu_time
+
+        ratios = [0.0]
+        if self.max_clients:
+            ratios.append(clients / self.max_clients)
+        if self.max_egress:
+            ratios.append(self.egress / self.max_egress)
+        if self.max_cpu:
+            ratios.append(self.cpu / self.max_cpu)
+        self.load = max(ratios)
+
+        index = level_index(self.load)
+        current = LEVELS.index(self.level)
+        if index < current:
+            # Step down only once clearly below the bound (no flapping at the edge)
+            index = max(index, level_index(self.load + HYSTERESIS))
+        changed = LEVELS[index] != self.level
+        self.level = LEVELS[index]
+        return changed
+
+    def spectator_interval(self) -> float:
+        return SPECTATOR_INTERVAL[self.level]
+
+    def admits_spectator(self, clients: int) -> bool:
+        if self.max_clients and clients >= self.max_clients:
+            return False
+        return self.level != LEVEL_FULL
+
+    def stats(self) -> Dict:
+        return {
+            "level": self.level,
+            "load": round(self.load, 3),
+            "clients": self.clients,
+            "egress_mbps": round(self.egress * 8 / 1e6, 2),
+            "cpu": round(self.cpu, 3),
+            "refused": self.refused,
+            "budget": {
+                "clients": self.max_clients,
+                "egress_mbps": self.max_egress * 8 / 1e6,
+                "cpu": self.max_cpu
+            }
+        }
@@ -0,0 +1,60 @@
+from collections import deque
+from typing import Dict, Optional
+
+from .clock import Clock, WALL_CLOCK
+
+# ----- ARENA UTILIZATION -----
+# How much of the time the arena is actually in use: games per hour, idle
+# time between games, and how long a hand-off to the next player takes.
+
+EWMA = 0.2
+
+class ArenaStats:
+    def __init__(self, clock: Clock = WALL_CLOCK):
+        self.clock = clock
+        self.started_at = clock.time()
+        self.games = 0
+        self.recent_starts = deque() # Start times within the last hour
+        self.idle_seconds = 0.0
+        self.idle_since: Optional[float] = self.started_at
+        self.last_end: Optional[float] = None
+        self.handoff_ms: Optional[float] = None # Last game over -> next game started
+        self.handoff_avg_ms: Optional[float] = None
+        self.preconfirmed = 0 # Games whose player was confirmed while the previous game ran
+
+    def game_started(self, preconfirmed: bool = False):
+        now = self.clock.time()
+        self.games += 1
+        self.recent_starts.append(now)
+        if preconfirmed:
+            self.preconfirmed += 1
+        if self.idle_since is not None:
+            self.idle_seconds += now - self.idle_since
+            self.idle_since = None
+        if self.last_end is not None:
+            ms = (now - self.last_end) * 1000
+            self.handoff_ms = ms
+            self.handoff_avg_ms = ms if self.handoff_avg_ms is None else self.handoff_avg_ms + EWMA * (ms - self.handoff_avg_ms)
+            self.last_end = None
+
+    def game_ended(self):
+        now = self.clock.time()
+        self.idle_since = now
+        self.last_end = now
+
+    def snapshot(self) -> Dict:
+        now = self.clock.time()
+        while self.recent_starts and now - self.recent_starts[0] > 3600:
+            self.recent_starts.popleft()
+        idle = self.idle_seconds + (now - self.idle_since if self.idle_since is not None else 0)
+        uptime = max(1e-6, now - self.started_at)
+        return {
+            "games": self.games,
+            "games_last_hour": len(self.recent_starts),
+            "games_per_hour": round(self.games / uptime * 3600, 2),
+            "idle_seconds": round(idle, 1),
+            "utilization": round(1 - idle / uptime, 3),
+            "handoff_ms": round(self.handoff_ms, 1) if self.handoff_ms is not None else None,
+            "handoff_avg_ms": round(self.handoff_avg_ms, 1) if self.handoff_avg_ms is not None else None,
+            "preconfirmed": self.preconfirmed
+        }
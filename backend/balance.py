@@ -0,0 +1,61 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+
+from . import metrics
+
+# ----- HOUSE BALANCE CACHE -----
+# /house-key used to hit the RPC on every request. The balance is now kept
+# here and refreshed on an interval, plus right after payouts / entries.
+
+REFRESH_INTERVAL = 30 # Seconds
+
+class BalanceCache:
+    def __init__(self, fetch: Callable[[], Awaitable[int]], low_threshold: int, interval: float = REFRESH_INTERVAL):
+        self.fetch = fetch # Coroutine returning the balance in lamports
+        self.low_threshold = low_threshold
+        self.interval = interval
+        self.lamports: Optional[int] = None
+        self.updated_at = 0.0
+        self.task: Optional[asyncio.Task] = None
+        self.wake = asyncio.Event()
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    def request_refresh(self):
+        """Ask for an early refresh (after a payout or a verified entry)."""
+        self.wake.set()
+
+    async def run(self):
+        while True:
+            await self.refresh()
+            self.wake.clear()
+            try:
+                await asyncio.wait_for(self.wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def refresh(self):
+        try:
+            self.lamports = await self.fetch()
+            self.updated_at = time.time()
+        except Exception as e:
+            print(f"[SOLANA] Balance refresh failed: {e}")
+            return
+
+        metrics.set_gauge("house_balance_lamports", self.lamports)
+        metrics.set_gauge("house_balance_low", int(self.lamports < self.low_threshold))
+
+    def snapshot(self):
+        return {
+            "balance": self.lamports / 10**9 if self.lamports is not None else None,
+            "balanceUpdatedAt": self.updated_at or None,
+            "low": self.lamports is not None and self.lamports < self.low_threshold
+        }
@@ -0,0 +1,61 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import List, Optional, Tuple
+
+# ----- CLOCK -----
+# Game code reads time and sleeps through a Clock so simulations and tests can
+# swap in VirtualClock and run whole games, cooldowns and timeouts instantly.
+# Network-facing timing (pings, relay stats, feedback pacing) stays on the
+# real clock on purpose.
+
+SETTLE_YIELDS = 5 # Loop turns given to woken sleepers before time moves on
+
+class Clock:
+    """Wall clock."""
+    def time(self) -> float:
+        return time.time()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+WALL_CLOCK = Clock()
+
+class VirtualClock(Clock):
+    """
+    Time only moves when advance() is called. Sleepers wake in deadline order,
+    and each one gets to run (and sleep again) before time moves past it.
+    """
+    def __init__(self, start: Optional[float] = None):
+        self.now = time.time() if start is None else start
+        self.sleepers: List[Tuple[float, int, asyncio.Future]] = []
+        self.order = itertools.count()
+
+    def time(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float):
+        if seconds <= 0:
+            await asyncio.sleep(0)
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.sleepers, (self.now + seconds, next(self.order), future))
+        await future
+
+    async def advance(self, seconds: float):
+        await self.advance_to(self.now + seconds)
+
+    async def advance_to(self, target: float):
+        await settle()
+        while self.sleepers and self.sleepers[0][0] <= target:
+            wake_at, _, future = heapq.heappop(self.sleepers)
+            self.now = max(self.now, wake_at)
+            if not future.done():
+                future.set_result(None)
+            await settle()
+        self.now = max(self.now, target)
+
+async def settle():
+    for _ in range(SETTLE_YIELDS):
+        await asyncio.sleep(0)
@@ -1,22 +1,68 @@
 import asyncio
 import json
+import os
 import time
 import random
 from typing import List, Dict, Optional
 from fastapi import WebSocket
 
 from .game import GameState, leaderboard, save_leaderboard
-from .solana import verify_transaction, payout, PAYOUT_AMOUNT, WIN_THRESHOLD
-from .cv import process_frame_for_qr
+from . import ranked, metrics, recorder, payouts
+from .frames import parse_frame, pack_detections, with_detections, TIER_HIGH, TIER_LOW
+from .relay import VideoRelay
+from .control import RttStats, PING_INTERVAL, ping_message, pong_rtt
+from .arena import ArenaStats
+from .clock import Clock, WALL_CLOCK
+from .killcam import KillCam
+from .state_store import StateStore
+from .admission import LoadMonitor, RETRY_AFTER, SAMPLE_INTERVAL
+from .demand import stream_mode, mode_message, keyframe_message, MODE_PAUSED, MODE_FULL, MODE_REDUCED
+from .ranked import PAYOUT_AMOUNT, WIN_THRESHOLD
 
 TIMEOUT_CONFIRMATION = 120
+PRECONFIRM_WINDOW = 20 # Seconds before a game ends when the next player gets their match_found
+FEEDBACK_INTERVAL = 1.0 # Seconds between video_feedback messages to the Pi
+RECONNECT_GRACE = 15 # Seconds a dropped client keeps its game or queue slot
+
+# Queue entry fields that survive a restart (the websocket doesn't)
+ENTRY_FIELDS = ("name", "token", "loadout", "mode", "key", "preconfirmed")
+
+# Reference frame size for detections (tracker + browser overlay use this)
+NATIVE_WIDTH = 640
+NATIVE_HEIGHT = 480
 
 class ConnectionManager:
-    def __init__(self):
+    def __init__(self, clock: Clock = WALL_CLOCK, state_path: Optional[str] = None):
+        # Game time (timers, cooldowns, timeouts); VirtualClock for simulations
+        self.clock = clock
         self.active_connections: List[WebSocket] = [] # All connected clients
-        self.pi_ws: Optional[WebSocket] = None
-        self.game_state = GameState()
+        self.pi_ws: Optional[WebSocket] = None # Video uplink (and controls if there's no control channel)
+        self.pi_control_ws: Optional[WebSocket] = None # Control-only channel
+        self.game_state = GameState(clock=clock)
         self.frame_count = 0
+
+        # Video relay + feedback for the Pi's bitrate controller
+        self.relay = VideoRelay()
+        self.video_meta: Dict = {} # Encoder settings from the latest frame header
+        self.low_video_meta: Dict = {} # Same for the spectator tier (simulcast)
+        # Latest CV results waiting to ride on the next frame of each tier
+        self.pending_detections: Dict[int, bytes] = {}
+        self.next_feedback = 0.0
+        # How much video the Pi should send (see demand.py)
+        self.stream_mode = MODE_PAUSED
+        metrics.register("video", lambda: {
+            **self.relay.stats(),
+            "mode": self.stream_mode,
+            "encoder": self.video_meta,
+            "low_encoder": self.low_video_meta
+        })
+
+        # Round trips measured separately on each Pi socket
+        self.control_rtt = RttStats()
+        self.video_rtt = RttStats()
+        self.controls_sent = 0
+        self.ping_task: Optional[asyncio.Task] = None
+        metrics.register("control", self.control_stats)
         
         # Queue System
         # List of {"name": str, "ws": WebSocket}
@@ -28,28 +74,207 @@ class ConnectionManager:
         self.confirming_player_data: Optional[Dict] = None
         self.confirmation_task: Optional[asyncio.Task] = None
 
-    async def connect(self, websocket: WebSocket, client_type: str):
+        # Ranked entries waiting on the verifier
+        self.verifying_players: List[Dict] = []
+        # Confirmed entries waiting for the arena: {"name", "ws", "loadout", "mode", "key"}
+        self.ready_players: List[Dict] = []
+
+        # Session tokens (from the client's URL) let a dropped client, or every
+        # client after a server restart, reattach to their game or queue slot
+        self.sessions: Dict[WebSocket, str] = {}
+        self.current_token: Optional[str] = None
+        self.detached: Dict[str, float] = {} # token -> deadline to reconnect by
+
+        # Crash-safe game/queue state (see state_store.py), restored by restore_state()
+        self.store: Optional[StateStore] = StateStore(state_path) if state_path else None
+        if self.store:
+            metrics.register("state", self.store.stats)
+
+        # Session recording for replay.py (set RECORD_SESSION=path to enable)
+        record_path = os.environ.get("RECORD_SESSION")
+        self.recorder: Optional[recorder.Recorder] = recorder.Recorder(record_path) if record_path else None
+        if self.recorder:
+            metrics.register("recorder", self.recorder.stats)
+
+        # Last few seconds of the player's stream, for the game-over screen
+        self.killcam = KillCam()
+        metrics.register("killcam", self.killcam.stats)
+
+        # Spectator admission and load shedding (see admission.py)
+        self.load = LoadMonitor()
+        self.load_task: Optional[asyncio.Task] = None
+        metrics.register("admission", self.load.stats)
+
+        # Arena utilization (games/hour, idle time, hand-off time)
+        self.arena = ArenaStats(clock)
+        metrics.register("arena", self.arena.snapshot)
+
+        # Game Engine
+        # Fire and game actions are queued here and handled by one task, so the
+        # websocket receive loop never waits on hits, broadcasts or end_game.
+        self.game_events: Optional[asyncio.Queue] = None
+        self.game_engine_task: Optional[asyncio.Task] = None
+        self.fire_pending = False # Coalesce held-trigger packets into one queued shot
+
+    def start_game_engine(self):
+        # Needs a running loop, so this is started on first connect
+        if self.game_engine_task is None or self.game_engine_task.done():
+            self.game_events = asyncio.Queue()
+            self.game_engine_task = asyncio.create_task(self.game_engine())
+        if self.load_task is None or self.load_task.done():
+            self.load_task = asyncio.create_task(self.monitor_load())
+
+    async def game_engine(self):
+        print("Game engine started.")
+        while True:
+            event = await self.game_events.get()
+            try:
+                await self.handle_game_event(event)
+                self.save_state()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Game Engine Error ({event[0]}): {e}")
+
+    def enqueue_game_event(self, kind: str, websocket: Optional[WebSocket] = None, data: Optional[dict] = None):
+        if self.game_events is None:
+            self.start_game_engine()
+        self.game_events.put_nowait((kind, websocket, data))
+
+    async def handle_game_event(self, event):
+        kind, websocket, data = event
+
+        if kind == "fire":
+            self.fire_pending = False
+            await self.handle_fire()
+        elif kind == "advance_queue":
+            await self.try_start_next_game()
+        elif kind == "join_queue":
+            await self.join_queue(websocket, data.get("name", "Player"))
+        elif kind == "leave_queue":
+            await self.leave_queue(websocket)
+        elif kind == "confirm_match":
+            await self.confirm_match(
+                websocket,
+                data.get("loadout"),
+                data.get("mode", "casual"),
+                data.get("signature"),
+                data.get("publicKey")
+            )
+        elif kind == "stop_game":
+            # Only current player can stop
+            if self.current_player_ws == websocket:
+                await self.end_game()
+        elif kind == "end_game":
+            # Timeout, disconnect or expired session of one particular game; by the
+            # time this runs that game may be over and the next one started
+            if self.game_state.is_active and self.game_state.start_time == data["started"]:
+                await self.end_game()
+        elif kind == "confirmation_timeout":
+            if websocket is not None and websocket == self.confirming_player_ws:
+                await self.expire_confirmation()
+        elif kind == "verified":
+            await self.complete_verification(data["entry"], data["valid"])
+        elif kind == "add_score":
+            # In real app, this comes from Pi, but for dev we allow client sim
+            # Allow sim only if playing
+            if self.current_player_ws == websocket:
+                await self.add_score(data.get("score", 0))
+
+    async def handle_fire(self):
+        # Use attempt_shot instead of simple fire_ammo
+        shot_result = self.game_state.attempt_shot()
+        if shot_result['fired']:
+            print(f"Fired! Ammo: {self.game_state.ammo}")
+            # If we hit something, we should broadcast update immediately
+            if shot_result['hits']:
+                await self.broadcast_game_update()
+                
+                # Check Win Condition (Keep going)
+                if self.game_state.is_ranked and self.game_state.score >= WIN_THRESHOLD:
+                    print("Win Threshold Reached! (Continuing...)")
+            
+            # Auto-end if out of ammo
+            if self.game_state.ammo <= 0:
+                print(f"PLAYER {self.game_state.player_name} OUT OF AMMO! Ending session.")
+                await self.end_game()
+
+    async def connect(self, websocket: WebSocket, client_type: str, token: Optional[str] = None):
+        self.start_game_engine()
         await websocket.accept()
         if client_type == "client":
+            if not self.admit(token):
+                self.load.refused += 1
+                print(f"At capacity ({self.load.level}), refusing spectator")
+                try:
+                    await websocket.send_text(json.dumps({
+                        "type": "server_busy",
+                        "load": self.load.level,
+                        "retry_after": RETRY_AFTER
+                    }))
+                    await websocket.close(code=1013) # Try again later
+                except:
+                    pass
+                return False
             self.active_connections.append(websocket)
+            self.relay.add(websocket)
+            if self.recorder:
+                self.recorder.record(recorder.CONNECT, b"", websocket)
             print("Web Client Connected")
+            if token:
+                self.sessions[websocket] = token
+                await self.reattach(websocket, token)
+            # New viewer: wake the stream and get them a frame straight away
+            await self.update_stream_mode(keyframe=True)
             await self.broadcast_game_update()
         elif client_type == "pi":
             self.pi_ws = websocket
             print("Pi Client Connected")
+            self.start_pinger()
+            await self.update_stream_mode(force=True)
+        elif client_type == "pi-control":
+            self.pi_control_ws = websocket
+            print("Pi Control Channel Connected")
+            self.start_pinger()
+        return True
+
+    def admit(self, token: Optional[str]) -> bool:
+        """Spectators can be turned away under load; anyone coming back to a game or queue slot can't."""
+        if token and (token == self.current_token or token in self.detached):
+            return True
+        return self.load.admits_spectator(len(self.relay.streams))
+
+    async def monitor_load(self):
+        # Real time on purpose: this measures the process, not the game
+        while True:
+            await asyncio.sleep(SAMPLE_INTERVAL)
+            if self.load.sample(len(self.relay.streams), self.relay.bytes_sent()):
+                print(f"Load level: {self.load.level} (load {self.load.load:.2f})")
+                self.relay.spectator_interval = self.load.spectator_interval()
+                await self.broadcast_game_update() # Clients show the level
 
     def disconnect(self, websocket: WebSocket, client_type: str):
         if client_type == "client":
             if websocket in self.active_connections:
                 self.active_connections.remove(websocket)
-            
-            # Remove from queue if present
-            self.waiting_queue = [p for p in self.waiting_queue if p["ws"] != websocket]
-            
-            # If current player disconnects, end game or pass turn
-            if websocket == self.current_player_ws:
-                print("Current player disconnected!")
-                asyncio.create_task(self.end_game())
+            self.relay.remove(websocket)
+            if self.recorder:
+                self.recorder.disconnected(websocket)
+
+            token = self.sessions.pop(websocket, None)
+            if token:
+                # Hold their game / queue slot; reconnecting with the token picks it back up
+                self.detach(websocket, token)
+            else:
+                # Remove from queue if present
+                self.waiting_queue = [p for p in self.waiting_queue if p["ws"] != websocket]
+                self.ready_players = [p for p in self.ready_players if p["ws"] != websocket]
+                self.verifying_players = [p for p in self.verifying_players if p["ws"] != websocket]
+
+                # If current player disconnects, end game or pass turn
+                if websocket == self.current_player_ws:
+                    print("Current player disconnected!")
+                    self.enqueue_game_event("end_game", data={"started": self.game_state.start_time})
             
             # If confirming player disconnects
             if websocket == self.confirming_player_ws:
@@ -58,51 +283,110 @@ class ConnectionManager:
                 self.confirming_player_data = None
                 if self.confirmation_task:
                     self.confirmation_task.cancel()
-                asyncio.create_task(self.try_start_next_game())
+                self.enqueue_game_event("advance_queue")
                 
+            asyncio.create_task(self.update_stream_mode())
             print("Web Client Disconnected")
             
         elif client_type == "pi":
-            self.pi_ws = None
+            if websocket == self.pi_ws:
+                self.pi_ws = None
             print("Pi Client Disconnected")
+        elif client_type == "pi-control":
+            if websocket == self.pi_control_ws:
+                self.pi_control_ws = None
+            print("Pi Control Channel Disconnected")
 
     async def broadcast_to_pi(self, message: bytes):
-        if self.pi_ws:
-            await self.pi_ws.send_bytes(message)
+        # Controls take the dedicated channel when the Pi has one open
+        ws = self.pi_control_ws or self.pi_ws
+        if ws:
+            await ws.send_bytes(message)
+            self.controls_sent += 1
+
+    def start_pinger(self):
+        if self.ping_task is None or self.ping_task.done():
+            self.ping_task = asyncio.create_task(self.ping_pi())
+
+    async def ping_pi(self):
+        # Runs while either Pi socket is open
+        while self.pi_ws or self.pi_control_ws:
+            for ws in (self.pi_control_ws, self.pi_ws):
+                if ws:
+                    try:
+                        await ws.send_text(ping_message())
+                    except:
+                        pass
+            await asyncio.sleep(PING_INTERVAL)
+
+    def control_stats(self) -> Dict:
+        return {
+            "channel": "dedicated" if self.pi_control_ws else ("shared" if self.pi_ws else "none"),
+            "sent": self.controls_sent,
+            "control_rtt": self.control_rtt.stats(),
+            "video_rtt": self.video_rtt.stats()
+        }
 
-    async def broadcast_to_clients(self, message: bytes):
+    async def broadcast_to_clients(self, message: bytes, tier: int = TIER_HIGH):
         if not self.active_connections:
             return
 
-        async def send_safe(ws):
-            try:
-                await ws.send_bytes(message)
-                return None
-            except:
-                return ws # Return the websocket object if it failed
-
-        # Run all sends concurrently
-        results = await asyncio.gather(*[send_safe(ws) for ws in self.active_connections])
+        # Hand the frame to every client on this tier (never waits on a slow client)
+        failed = self.relay.relay(message, tier)
         
         # Cleanup failed connections
-        for ws in results:
-            if ws:
-                try:
-                    self.active_connections.remove(ws)
-                except ValueError:
-                    pass
+        for ws in failed:
+            try:
+                self.active_connections.remove(ws)
+            except ValueError:
+                pass
+
+    async def update_stream_mode(self, keyframe: bool = False, force: bool = False):
+        """Tells the Pi when demand changes (and optionally asks for a frame right away)."""
+        mode = stream_mode(self.game_state.is_active, len(self.relay.streams), self.relay.visible_count())
+        changed = mode != self.stream_mode
+        if changed:
+            print(f"Stream mode: {self.stream_mode} -> {mode}")
+            self.stream_mode = mode
+        if not self.pi_ws:
+            return
+        try:
+            if changed or force:
+                await self.pi_ws.send_text(mode_message(mode))
+            if keyframe and mode != MODE_PAUSED:
+                await self.pi_ws.send_text(keyframe_message())
+        except:
+            pass
+
+    async def send_video_feedback(self):
+        now = time.time()
+        if now < self.next_feedback or not self.pi_ws:
+            return
+        self.next_feedback = now + FEEDBACK_INTERVAL
+        try:
+            await self.pi_ws.send_text(json.dumps(self.relay.feedback()))
+        except:
+            pass
     
+    def queue_names(self) -> List[str]:
+        # Confirmed / verifying players are ahead of everyone still waiting
+        ahead = self.ready_players + self.verifying_players
+        return [p["name"] for p in ahead] + [p["name"] for p in self.waiting_queue]
+
     async def broadcast_game_update(self):
         """Send current game state, queue, and leaderboard to ALL clients"""
-        
+        self.save_state()
+        # Queued players keep the full frame rate when spectators are shed
+        queued = self.waiting_queue + self.ready_players + self.verifying_players
+        self.relay.set_protected({p["ws"] for p in queued} | {self.confirming_player_ws})
+
         # Calculate time left
         time_left = 0
         if self.game_state.is_active:
-            elapsed = time.time() - self.game_state.start_time
-            time_left = max(0, self.game_state.game_duration - int(elapsed))
+            time_left = self.time_left()
             
             if time_left == 0:
-                await self.end_game()
+                self.enqueue_game_event("end_game", data={"started": self.game_state.start_time})
                 return
 
         payload = {
@@ -111,11 +395,12 @@ class ConnectionManager:
             "time_left": time_left,
             "score": self.game_state.score,
             "player": self.game_state.player_name,
-            "queue": [p["name"] for p in self.waiting_queue],
+            "queue": self.queue_names(),
             "leaderboard": sorted(leaderboard, key=lambda x: x['score'], reverse=True)[:10],
             "ammo": self.game_state.ammo,
             "max_ammo": self.game_state.max_ammo,
-            "enemies": self.game_state.enemies
+            "enemies": self.game_state.enemies,
+            "load": self.load.level
         }
         
         json_payload = json.dumps(payload)
@@ -128,6 +413,12 @@ class ConnectionManager:
             except:
                 pass
 
+    def time_left(self) -> int:
+        if not self.game_state.is_active:
+            return 0
+        elapsed = self.clock.time() - self.game_state.start_time
+        return max(0, self.game_state.game_duration - int(elapsed))
+
     async def join_queue(self, websocket: WebSocket, name: str):
         # Check if already in queue
         for p in self.waiting_queue:
@@ -136,18 +427,21 @@ class ConnectionManager:
 
         entry = {
             "name": name or "Anonymous", 
-            "ws": websocket
+            "ws": websocket,
+            "token": self.sessions.get(websocket)
         }
         self.waiting_queue.append(entry)
         await self.broadcast_game_update()
         
-        # If game is not active and no one is playing, try to start
-        if not self.game_state.is_active and self.current_player_ws is None and self.confirming_player_ws is None:
+        # Start now if the arena is free (or line them up if the current game is nearly over)
+        if self.confirming_player_ws is None:
             await self.try_start_next_game()
 
     async def leave_queue(self, websocket: WebSocket):
         # Remove from wait queue if there
         self.waiting_queue = [p for p in self.waiting_queue if p["ws"] != websocket]
+        self.ready_players = [p for p in self.ready_players if p["ws"] != websocket]
+        self.verifying_players = [p for p in self.verifying_players if p["ws"] != websocket]
         
         # Also check if they are the one currently confirming
         if websocket == self.confirming_player_ws:
@@ -165,12 +459,31 @@ class ConnectionManager:
         await self.broadcast_game_update()
 
     async def try_start_next_game(self):
-        # If we are already confirming someone or playing, don't start
-        if self.game_state.is_active or self.confirming_player_ws:
+        if self.game_state.is_active:
+            # Pipelining: near the end of a game, get the next player through
+            # match_found, loadout and (ranked) payment before the arena frees up
+            if self.time_left() <= PRECONFIRM_WINDOW and not self.ready_players and not self.verifying_players:
+                await self.prompt_next_player()
+            return
+
+        # Players who already confirmed (and paid, for ranked) go first
+        ready = next((p for p in self.ready_players if p["ws"] is not None), None)
+        if ready:
+            self.ready_players.remove(ready)
+            await self.start_game_for(ready)
+            return
+
+        await self.prompt_next_player()
+
+    async def prompt_next_player(self):
+        # If we are already confirming someone, don't start
+        if self.confirming_player_ws:
             return
 
-        if self.waiting_queue:
-            next_player = self.waiting_queue.pop(0)
+        # Players who dropped keep their place but are skipped until they're back
+        next_player = next((p for p in self.waiting_queue if p["ws"] is not None), None)
+        if next_player:
+            self.waiting_queue.remove(next_player)
             self.confirming_player_ws = next_player["ws"]
             self.confirming_player_data = next_player
             
@@ -189,94 +502,145 @@ class ConnectionManager:
                 print("Failed to contact candidate, moving to next...")
                 self.confirming_player_ws = None
                 await self.try_start_next_game()
-        else:
+        elif not self.game_state.is_active:
             self.current_player_ws = None
             
     async def confirmation_timeout(self):
         try:
-            await asyncio.sleep(TIMEOUT_CONFIRMATION)
-            # Timeout happened
+            await self.clock.sleep(TIMEOUT_CONFIRMATION)
+            # Through the engine: a confirm_match already queued still wins
             if self.confirming_player_ws:
-                print(f"Confirmation timed out for {self.confirming_player_data['name']}")
-                # Notify them they missed it?
-                try:
-                    await self.confirming_player_ws.send_text(json.dumps({"type": "match_timeout"}))
-                except:
-                    pass
-                    
-                self.confirming_player_ws = None
-                self.confirming_player_data = None
-                
-                # IMPORTANT: Broadcast so the user's UI resets (removes "Abort" button)
-                await self.broadcast_game_update()
-                
-                await self.try_start_next_game()
+                self.enqueue_game_event("confirmation_timeout", self.confirming_player_ws)
         except asyncio.CancelledError:
             pass
 
+    async def expire_confirmation(self):
+        print(f"Confirmation timed out for {self.confirming_player_data['name']}")
+        # Notify them they missed it?
+        try:
+            await self.confirming_player_ws.send_text(json.dumps({"type": "match_timeout"}))
+        except:
+            pass
+
+        self.confirming_player_ws = None
+        self.confirming_player_data = None
+
+        # IMPORTANT: Broadcast so the user's UI resets (removes "Abort" button)
+        await self.broadcast_game_update()
+
+        await self.try_start_next_game()
+
     async def confirm_match(self, websocket: WebSocket, loadout: dict, mode: str = "casual", signature: str = None, player_key: str = None):
         if websocket == self.confirming_player_ws:
+            entry = {
+                **self.confirming_player_data,
+                "loadout": loadout or {},
+                "mode": mode,
+                "key": player_key,
+                "preconfirmed": self.game_state.is_active # Lined up while someone else was playing
+            }
+
             # Ranked Verification
             if mode == "ranked":
                 if not signature or not player_key:
                     print("Ranked mode selected but missing signature/key")
                     return # Or send error
-                
-                print(f"Verifying Ranked Entry for {self.confirming_player_data['name']}...")
-                valid = await verify_transaction(signature, player_key)
-                if not valid:
-                    print("Invalid Transaction! Game aborted.")
-                    # Cleanup to prevent stuck queue
-                    if self.confirmation_task:
-                        self.confirmation_task.cancel()
-                    self.confirming_player_ws = None
-                    self.confirming_player_data = None
-                    
-                    try:
-                        await websocket.send_text(json.dumps({"type": "match_timeout"}))
-                    except:
-                        pass
-                        
-                    await self.broadcast_game_update()
-                    await self.try_start_next_game()
+                if not ranked.RANKED_ENABLED:
+                    print("Ranked mode selected but this server is casual-only")
                     return
+                
+                # Verification runs in the background. Free up the confirming slot
+                # so the next player in line isn't stuck behind the RPC.
+                if self.confirmation_task:
+                    self.confirmation_task.cancel()
+                self.confirming_player_ws = None
+                self.confirming_player_data = None
+                entry["signature"] = signature # Kept so a restart can verify it again
+                self.verifying_players.append(entry)
+
+                print(f"Verifying Ranked Entry for {entry['name']}...")
+                asyncio.create_task(self.finish_verification(entry, signature, player_key))
+                await self.try_start_next_game()
+                return
 
             if self.confirmation_task:
                 self.confirmation_task.cancel()
-            
-            # Start Game
-            self.current_player_ws = websocket
             self.confirming_player_ws = None
-            
-            p_id = loadout.get("id", "vanguard")
-            self.game_state.init_game(
-                name=self.confirming_player_data["name"],
-                mode=mode,
-                p_class=p_id,
-                key=player_key
-            )
-            
-            print(f"Game Started for {self.game_state.player_name} (Mode: {mode}, Class: {p_id})")
+            self.confirming_player_data = None
+
+            self.ready_players.append(entry)
+            await self.try_start_next_game()
+
+    async def finish_verification(self, entry: Dict, signature: str, player_key: str, resume: bool = False):
+        try:
+            sol = ranked.solana() if ranked.is_loaded() else await asyncio.to_thread(ranked.solana)
+            valid = await sol.verify_transaction(signature, player_key, resume)
+        except Exception as e:
+            print(f"Verification Error: {e}")
+            valid = False
+        # The queue changes happen on the game engine, like every other hand-off
+        self.enqueue_game_event("verified", data={"entry": entry, "valid": valid})
+
+    async def complete_verification(self, entry: Dict, valid: bool):
+        if not any(p is entry for p in self.verifying_players):
+            # Player left while we were verifying
+            return
+        self.verifying_players = [p for p in self.verifying_players if p is not entry]
+        websocket = entry["ws"] # May have reconnected (or be None) since we started
+
+        if not valid:
+            print("Invalid Transaction! Game aborted.")
+            try:
+                await websocket.send_text(json.dumps({"type": "match_timeout"}))
+            except:
+                pass
             await self.broadcast_game_update()
-            
-            asyncio.create_task(self.game_timer())
+            # Their slot is free again, line up whoever is next
+            await self.try_start_next_game()
+            return
+
+        self.ready_players.append(entry)
+        await self.try_start_next_game()
+
+    async def start_game_for(self, entry: Dict):
+        # Start Game
+        self.current_player_ws = entry["ws"]
+        self.current_token = entry.get("token")
+        self.relay.set_player(entry["ws"])
+        self.killcam.reset()
+        
+        p_id = entry["loadout"].get("id", "vanguard")
+        self.game_state.init_game(
+            name=entry["name"],
+            mode=entry["mode"],
+            p_class=p_id,
+            key=entry["key"]
+        )
+        
+        print(f"Game Started for {self.game_state.player_name} (Mode: {entry['mode']}, Class: {p_id})")
+        self.arena.game_started(entry.get("preconfirmed", False))
+        await self.update_stream_mode()
+        await self.broadcast_game_update()
+        
+        asyncio.create_task(self.game_timer())
 
     async def end_game(self):
         if self.game_state.is_active:
             self.game_state.is_active = False
+            self.arena.game_ended()
             print(f"Game Over! Final Score: {self.game_state.score}")
             
             # Payout?
             if self.game_state.is_ranked and self.game_state.score >= WIN_THRESHOLD and self.game_state.player_key:
-                print("RANKED WIN DETECTED! Processing Payout...")
-                await payout(self.game_state.player_key, PAYOUT_AMOUNT)
+                print("RANKED WIN DETECTED! Queueing Payout...")
+                asyncio.create_task(self.queue_payout(self.game_state.player_key))
             
             # Save to leaderboard
             leaderboard.append({
                 "name": self.game_state.player_name,
                 "score": self.game_state.score,
                 "class": self.game_state.player_class,
-                "date": time.strftime("%Y-%m-%d %H:%M"),
+                "date": time.strftime("%Y-%m-%d %H:%M", time.localtime(self.clock.time())),
                 "mode": "ranked" if self.game_state.is_ranked else "casual"
             })
             save_leaderboard(leaderboard)
@@ -289,23 +653,152 @@ class ConnectionManager:
                 "enemies": self.game_state.enemies_killed
             }
             
+            # Kill-cam clip of the last few seconds, fetched by the player over HTTP
+            clip_id = self.killcam.finish()
+
             # 1. Notify the player specifically with game over stats
             if self.current_player_ws:
                 try:
                     await self.current_player_ws.send_text(json.dumps({
                         "type": "game_over",
-                        "stats": final_stats
+                        "stats": final_stats,
+                        "killcam": f"/killcam/{clip_id}" if clip_id else None
                     }))
                 except:
                     pass
 
             self.current_player_ws = None
+            self.current_token = None
+            self.relay.set_player(None)
+            await self.update_stream_mode()
             await self.broadcast_game_update()
             
-            # Wait a bit then start next
-            await asyncio.sleep(3)
+            # Next player was lined up during this game, so hand over straight away
             await self.try_start_next_game()
 
+    async def queue_payout(self, dest: str):
+        # The stack may not be loaded yet (e.g. a ranked game restored from a snapshot),
+        # so load it off the loop and never let a failure cost the winner their payout
+        try:
+            sol = ranked.solana() if ranked.is_loaded() else await asyncio.to_thread(ranked.solana)
+            sol.payout_service.submit(dest, PAYOUT_AMOUNT)
+        except Exception as e:
+            print(f"Payout service unavailable ({e}), saving payout for the next start")
+            try:
+                payouts.record_payout(dest, PAYOUT_AMOUNT)
+            except Exception as e:
+                print(f"FAILED TO RECORD PAYOUT of {PAYOUT_AMOUNT} to {dest}: {e}")
+
+    # ----- SESSIONS & CRASH RECOVERY -----
+
+    def detach(self, websocket: WebSocket, token: str):
+        for p in self.waiting_queue + self.ready_players + self.verifying_players:
+            if p["ws"] == websocket:
+                p["ws"] = None
+        if websocket == self.current_player_ws:
+            print("Current player disconnected, holding their game...")
+            self.current_player_ws = None
+            self.relay.set_player(None)
+        self.hold_session(token)
+
+    def hold_session(self, token: str):
+        self.detached[token] = self.clock.time() + RECONNECT_GRACE
+        asyncio.create_task(self.expire_session(token))
+
+    async def expire_session(self, token: str):
+        await self.clock.sleep(RECONNECT_GRACE)
+        deadline = self.detached.get(token)
+        if deadline is None or self.clock.time() < deadline:
+            return # Came back (or dropped again and has a newer deadline)
+        del self.detached[token]
+
+        def gone(p):
+            return p.get("token") == token and p["ws"] is None
+        self.waiting_queue = [p for p in self.waiting_queue if not gone(p)]
+        self.ready_players = [p for p in self.ready_players if not gone(p)]
+        self.verifying_players = [p for p in self.verifying_players if not gone(p)]
+
+        if self.game_state.is_active and self.current_token == token and self.current_player_ws is None:
+            print(f"{self.game_state.player_name} did not reconnect, ending their game.")
+            self.enqueue_game_event("end_game", data={"started": self.game_state.start_time})
+        else:
+            await self.broadcast_game_update()
+
+    async def reattach(self, websocket: WebSocket, token: str):
+        """Gives a reconnecting client back whatever it held under this token."""
+        self.detached.pop(token, None)
+        name = None
+        for p in self.waiting_queue + self.ready_players + self.verifying_players:
+            if p.get("token") == token and p["ws"] is None:
+                p["ws"] = websocket
+                name = p["name"]
+        if self.game_state.is_active and self.current_token == token and self.current_player_ws is None:
+            self.current_player_ws = websocket
+            self.relay.set_player(websocket)
+            name = self.game_state.player_name
+            print(f"{name} reattached to their game.")
+        if name is None:
+            return
+
+        # Tell the page who it is again (a reload loses the name it joined with)
+        await websocket.send_text(json.dumps({"type": "session", "name": name}))
+        if self.confirming_player_ws is None:
+            self.enqueue_game_event("advance_queue")
+
+    def queue_snapshot(self) -> Dict:
+        def keep(entries, fields):
+            return [{k: p.get(k) for k in fields} for p in entries if p.get("token")]
+        # A match_found prompt doesn't survive a restart; that player goes back to the front
+        confirming = [self.confirming_player_data] if self.confirming_player_data else []
+        return {
+            "waiting": keep(confirming + self.waiting_queue, ("name", "token")),
+            "ready": keep(self.ready_players, ENTRY_FIELDS),
+            "verifying": keep(self.verifying_players, ENTRY_FIELDS + ("signature",))
+        }
+
+    def save_state(self):
+        """Journals game and queue state if either changed (cheap when nothing did)."""
+        if not self.store:
+            return
+        game = None
+        if self.game_state.is_active:
+            game = {**self.game_state.to_snapshot(), "token": self.current_token}
+        self.store.update("game", game)
+        self.store.update("queue", self.queue_snapshot())
+        self.store.maybe_snapshot()
+
+    async def restore_state(self):
+        """Picks up the game and queue left by the previous process. Everyone starts detached."""
+        if not self.store:
+            return
+        started = time.perf_counter()
+        sections = self.store.load()
+        queue = sections.get("queue") or {}
+        game = sections.get("game")
+
+        self.waiting_queue = [{**p, "ws": None} for p in queue.get("waiting", [])]
+        self.ready_players = [{**p, "ws": None} for p in queue.get("ready", [])]
+        for p in queue.get("verifying", []):
+            entry = {**p, "ws": None}
+            self.verifying_players.append(entry)
+            asyncio.create_task(self.finish_verification(entry, p["signature"], p["key"], resume=True))
+        tokens = {p["token"] for p in self.waiting_queue + self.ready_players + self.verifying_players}
+
+        if game and game.get("is_active"):
+            self.game_state.restore(game)
+            self.current_token = game.get("token")
+            if self.current_token:
+                tokens.add(self.current_token)
+            self.arena.game_started()
+            asyncio.create_task(self.game_timer())
+            print(f"[STATE] Restored {self.game_state.player_name}'s game "
+                  f"(score {self.game_state.score}, {self.time_left()}s left)")
+
+        for token in tokens:
+            self.hold_session(token)
+        print(f"[STATE] Restored {len(self.waiting_queue)} waiting, {len(self.ready_players)} ready, "
+              f"{len(self.verifying_players)} verifying in {(time.perf_counter() - started) * 1000:.1f}ms")
+
     async def add_score(self, points: int):
         if self.game_state.is_active:
             self.game_state.score += points
@@ -316,9 +809,14 @@ class ConnectionManager:
                 print("Manual Score: Win Threshold Reached! (Continuing...)")
 
     async def game_timer(self):
-        while self.game_state.is_active:
+        # Tied to this game: with instant hand-offs the next game can start inside our loop
+        started = self.game_state.start_time
+        while self.game_state.is_active and self.game_state.start_time == started:
             await self.broadcast_game_update()
-            await asyncio.sleep(1)
+            if self.game_state.is_active and self.time_left() <= PRECONFIRM_WINDOW:
+                # Through the engine, like the other queue changes
+                self.enqueue_game_event("advance_queue")
+            await self.clock.sleep(1)
             
     # ----- MESSAGE HANDLING -----
     
@@ -328,6 +826,8 @@ class ConnectionManager:
         
         if "bytes" in message:
             data = message["bytes"]
+            if self.recorder:
+                self.recorder.record(recorder.CONTROL, data, websocket)
             # ONLY forward controls if this is the current player
             # if self.current_player_ws == websocket and self.game_state.is_active:
             # Allow all controls for testing
@@ -338,55 +838,32 @@ class ConnectionManager:
                     # Parse 16-bit buttons
                     buttons = int.from_bytes(data[6:], byteorder='little')
                     
-                    # Fire Logic
-                    if buttons & 0x1:
-                        # Use attempt_shot instead of simple fire_ammo
-                        shot_result = self.game_state.attempt_shot()
-                        if shot_result['fired']:
-                            print(f"Fired! Ammo: {self.game_state.ammo}")
-                            # If we hit something, we should broadcast update immediately
-                            if shot_result['hits']:
-                                await self.broadcast_game_update()
-                                
-                                # Check Win Condition (Keep going)
-                                if self.game_state.is_ranked and self.game_state.score >= WIN_THRESHOLD:
-                                    print("Win Threshold Reached! (Continuing...)")
-                            
-                            # Auto-end if out of ammo
-                            if self.game_state.ammo <= 0:
-                                print(f"PLAYER {self.game_state.player_name} OUT OF AMMO! Ending session.")
-                                await self.end_game()
+                    # Fire Logic (handled by the game engine, we only enqueue)
+                    if buttons & 0x1 and not self.fire_pending:
+                        self.fire_pending = True
+                        self.enqueue_game_event("fire")
 
                 await self.broadcast_to_pi(data)
             
         elif "text" in message:
+            if self.recorder:
+                self.recorder.record(recorder.ACTION, message["text"].encode(), websocket)
             data = json.loads(message["text"])
             action = data.get("action")
             
-            if action == "join_queue":
-                await self.join_queue(
-                    websocket, 
-                    data.get("name", "Player")
-                )
-            elif action == "leave_queue":
-                await self.leave_queue(websocket)
-            elif action == "confirm_match":
-                await self.confirm_match(
-                    websocket,
-                    data.get("loadout"),
-                    data.get("mode", "casual"),
-                    data.get("signature"),
-                    data.get("publicKey")
-                )
-            elif action == "stop_game":
-                # Only current player can stop
-                if self.current_player_ws == websocket:
-                    await self.end_game()
-            elif action == "add_score":
-                # In real app, this comes from Pi, but for dev we allow client sim
-                # Allow sim only if playing
-                if self.current_player_ws == websocket:
-                    await self.add_score(data.get("score", 0))
+            if action in ("join_queue", "leave_queue", "confirm_match", "stop_game", "add_score"):
+                self.enqueue_game_event(action, websocket, data)
+            elif action == "set_video_tier":
+                # Spectators get the low-res tier unless they ask for the full stream
+                self.relay.set_wants_high(websocket, data.get("tier") == "high")
+            elif action == "client_stats":
+                # Browser decode time / dropped frames, reported every few seconds
+                self.relay.set_client_stats(websocket, data)
+            elif action == "set_visibility":
+                # Hidden tabs get no frames; coming back asks the Pi for one right away
+                visible = bool(data.get("visible", True))
+                self.relay.set_visible(websocket, visible)
+                await self.update_stream_mode(keyframe=visible)
             elif action == "ping":
                 await websocket.send_text(json.dumps({
                     "type": "pong",
@@ -404,10 +881,29 @@ class ConnectionManager:
             #self.frame_count += 1
             #if self.frame_count % 30 == 0:
             #   print(f"Server received video frame {self.frame_count} ({len(data)} bytes)")
+            if self.recorder:
+                self.recorder.record(recorder.FRAME, data)
+
+            try:
+                _, meta, jpeg_offset = parse_frame(data)
+            except Exception:
+                meta, jpeg_offset = {}, 8
+            tier = meta.get("tier", TIER_HIGH)
+
+            # 1. Forward raw video to clients (Data includes timestamp + encoder settings header)
+            # Forward AS IS so client can measure latency, plus any new CV results in the header
+            block = self.pending_detections.pop(tier, None)
+            outgoing = with_detections(data, meta, jpeg_offset, block) if block else data
+            await self.broadcast_to_clients(outgoing, tier)
+            await self.send_video_feedback()
+            if tier == TIER_HIGH and self.game_state.is_active:
+                self.killcam.add(outgoing) # Reference, not a copy
 
-            # 1. Forward raw video to clients (Data now includes 8-byte timestamp header)
-            # Forward AS IS so client can measure latency
-            await self.broadcast_to_clients(data)
+            if tier == TIER_LOW:
+                self.low_video_meta = meta
+                return # CV and the tracker work off the full stream
+            if meta:
+                self.video_meta = meta
             
             # 2. Server-side CV processing (Offloaded & Non-Blocking)
             try:
@@ -415,13 +911,15 @@ class ConnectionManager:
                 if not hasattr(self, 'is_cv_running'):
                     self.is_cv_running = False
                 
-                # Check directly if we should run CV (every 3 frames roughly)
-                if not self.is_cv_running and self.frame_count % 3 == 0:
+                # Check directly if we should run CV (every 3 frames roughly),
+                # only while someone is playing or watching
+                watched = self.stream_mode in (MODE_FULL, MODE_REDUCED)
+                if watched and not self.is_cv_running and self.frame_count % 3 == 0:
                     self.is_cv_running = True
-                    # Strip 8-byte timestamp for CV
-                    if len(data) > 8:
-                        image_data = data[8:]
-                        asyncio.create_task(self.run_cv_task(image_data))
+                    # Strip header for CV
+                    if len(data) > jpeg_offset:
+                        image_data = data[jpeg_offset:]
+                        asyncio.create_task(self.run_cv_task(image_data, meta))
                     else:
                         self.is_cv_running = False
                 
@@ -431,13 +929,41 @@ class ConnectionManager:
                  print(f"CV Dispatch Error: {e}")
         
         elif "text" in message:
-            print(f"Warning: Received TEXT from Pi: {message['text']}")
+            try:
+                rtt = pong_rtt(json.loads(message["text"]))
+            except (ValueError, AttributeError):
+                rtt = None
+            if rtt is None:
+                print(f"Warning: Received TEXT from Pi: {message['text']}")
+            else:
+                self.video_rtt.record(rtt)
+
+    async def process_pi_control_message(self, websocket: WebSocket, message: dict):
+        """Handle incoming messages on the PI control channel (only pongs for now)"""
+        if "text" in message:
+            try:
+                rtt = pong_rtt(json.loads(message["text"]))
+            except (ValueError, AttributeError):
+                rtt = None
+            if rtt is not None:
+                self.control_rtt.record(rtt)
 
-    async def run_cv_task(self, data):
+    async def run_cv_task(self, data, meta: Dict = None):
         try:
+            # Imported here so cv2 stays off the import path (warmed by the startup task)
+            from .cv import process_frame_for_qr
+
             loop = asyncio.get_running_loop()
             # Run blocking CV code in a thread pool
             qr_results = await loop.run_in_executor(None, process_frame_for_qr, data)
+
+            # The Pi may be sending a downscaled stream; keep detections in 640x480 coordinates
+            width = (meta or {}).get("width") or NATIVE_WIDTH
+            height = (meta or {}).get("height") or NATIVE_HEIGHT
+            if width != NATIVE_WIDTH or height != NATIVE_HEIGHT:
+                sx, sy = NATIVE_WIDTH / width, NATIVE_HEIGHT / height
+                for qr in qr_results:
+                    qr["bbox"] = [[int(x * sx), int(y * sy)] for x, y in qr["bbox"]]
             
             # Update Tracker Implementation
             try:
@@ -445,18 +971,12 @@ class ConnectionManager:
             except Exception as e:
                 print(f"Tracker Update Error: {e}")
             
-            # Broadcast results
-            json_payload = json.dumps({
-                "type": "qr_detected",
-                "data": qr_results
-            })
-            
-            # Broadcast to all clients
-            for connection in self.active_connections:
-                try:
-                    await connection.send_text(json_payload)
-                except:
-                    pass
+            if self.recorder:
+                self.recorder.record_json(recorder.CV, {"seq": (meta or {}).get("seq", 0), "results": qr_results})
+
+            # Results go out with the next frame of each tier, tagged with the frame they came from
+            block = pack_detections((meta or {}).get("seq", 0), qr_results)
+            self.pending_detections = {TIER_HIGH: block, TIER_LOW: block}
         except Exception as e:
             print(f"CV Task Error: {e}")
         finally:
@@ -0,0 +1,44 @@
+import json
+import time
+from typing import Dict, List, Optional
+
+# ----- PI CONTROL CHANNEL -----
+# Controls go to the Pi over their own websocket (/ws/pi-control) so an 8-byte
+# packet never waits behind JPEG frames on the video socket. Both sockets are
+# pinged on the same schedule, so /metrics shows control and video round trips
+# side by side.
+
+PING_INTERVAL = 1.0
+RTT_WINDOW = 30 # Samples kept for the percentile
+EWMA = 0.2
+
+class RttStats:
+    def __init__(self):
+        self.samples: List[float] = []
+        self.ewma: Optional[float] = None
+        self.last: Optional[float] = None
+
+    def record(self, ms: float):
+        self.last = ms
+        self.ewma = ms if self.ewma is None else self.ewma + EWMA * (ms - self.ewma)
+        self.samples.append(ms)
+        if len(self.samples) > RTT_WINDOW:
+            del self.samples[0]
+
+    def stats(self) -> Dict:
+        ordered = sorted(self.samples)
+        return {
+            "last_ms": round(self.last, 2) if self.last is not None else None,
+            "avg_ms": round(self.ewma, 2) if self.ewma is not None else None,
+            "p50_ms": round(ordered[len(ordered) // 2], 2) if ordered else None,
+            "max_ms": round(ordered[-1], 2) if ordered else None
+        }
+
+def ping_message() -> str:
+    return json.dumps({"type": "ping", "t": time.perf_counter() * 1000})
+
+def pong_rtt(msg: Dict) -> Optional[float]:
+    """Round trip in ms for a pong echoing one of our pings, else None."""
+    if msg.get("type") != "pong" or not isinstance(msg.get("t"), (int, float)):
+        return None
+    return time.perf_counter() * 1000 - msg["t"]
@@ -0,0 +1,37 @@
+import json
+from typing import Dict
+
+# ----- STREAM DEMAND -----
+# The server tells the Pi how much video is actually wanted, so nobody pays
+# for encoding and uplink while the arena is idle or every tab is hidden.
+# The Pi keeps capturing in every mode, so resuming costs at most one
+# capture interval.
+
+MODE_FULL = "full" # A game is running: full rate (player + CV)
+MODE_REDUCED = "reduced" # Only spectators watching: capped frame rate
+MODE_KEYFRAME = "keyframe" # Clients connected but none looking: a frame now and then, or on request
+MODE_PAUSED = "paused" # Nobody connected: send nothing
+
+REDUCED_FPS = 10
+KEYFRAME_INTERVAL = 5.0 # Seconds between frames in keyframe mode
+
+def stream_mode(game_active: bool, clients: int, visible: int) -> str:
+    if game_active:
+        return MODE_FULL
+    if visible:
+        return MODE_REDUCED
+    if clients:
+        return MODE_KEYFRAME
+    return MODE_PAUSED
+
+def mode_message(mode: str) -> str:
+    msg: Dict = {"type": "stream_mode", "mode": mode}
+    if mode == MODE_REDUCED:
+        msg["max_fps"] = REDUCED_FPS
+    elif mode == MODE_KEYFRAME:
+        msg["interval"] = KEYFRAME_INTERVAL
+    return json.dumps(msg)
+
+def keyframe_message() -> str:
+    """Asks the Pi to send the next captured frame regardless of mode."""
+    return json.dumps({"type": "keyframe"})
@@ -0,0 +1,81 @@
+import struct
+from typing import Dict, List, Tuple
+
+# ----- VIDEO FRAME FORMAT -----
+# [8 bytes timestamp (double, ms, LE)][1 byte ext_len][ext_len bytes ext][JPEG]
+# ext starts with the encoder settings below; newer fields are appended after
+# them, so readers just skip ext_len bytes to find the JPEG.
+#   + tier (u8): 0 = full-quality player stream, 1 = low-res spectator stream
+#   + detections (added by the server, see pack_detections): QR results from
+#     CV on an earlier frame, tagged with that frame's seq
+# Legacy frames (no ext) have the JPEG SOI marker right after the timestamp.
+
+TIMESTAMP = struct.Struct('<d')
+SETTINGS = struct.Struct('<IBBHH') # seq, jpeg quality, target fps, width, height
+TIER = struct.Struct('<B')
+DETECTIONS = struct.Struct('<IB') # source seq, count
+DETECTION = struct.Struct('<8hB') # 4 corner points (x, y in 640x480 space), text length
+MAX_EXT = 255
+MAX_TEXT = 32
+JPEG_SOI = b'\xff\xd8'
+
+TIER_HIGH = 0
+TIER_LOW = 1
+
+def parse_frame(data: bytes) -> Tuple[float, Dict, int]:
+    """Returns (timestamp_ms, meta, jpeg_offset). meta is empty for legacy frames."""
+    timestamp = TIMESTAMP.unpack_from(data, 0)[0]
+    if data[8:10] == JPEG_SOI:
+        return timestamp, {}, 8
+
+    ext_len = data[8]
+    meta = {}
+    if ext_len >= SETTINGS.size:
+        seq, quality, fps, width, height = SETTINGS.unpack_from(data, 9)
+        meta = {"seq": seq, "quality": quality, "fps": fps, "width": width, "height": height, "tier": TIER_HIGH}
+    if ext_len >= SETTINGS.size + TIER.size:
+        meta["tier"] = TIER.unpack_from(data, 9 + SETTINGS.size)[0]
+    if ext_len >= SETTINGS.size + TIER.size + DETECTIONS.size:
+        meta["detections"] = unpack_detections(data, 9 + SETTINGS.size + TIER.size)
+    return timestamp, meta, 9 + ext_len
+
+def pack_detections(source_seq: int, detections: List[Dict], room: int = MAX_EXT - SETTINGS.size - TIER.size) -> bytes:
+    """
+    Compact binary form of CV results. Detections that don't fit in room bytes
+    are left out (the ext length is a single byte).
+    """
+    items = []
+    used = DETECTIONS.size
+    for qr in detections:
+        points = qr.get("bbox") or []
+        if len(points) != 4:
+            continue
+        text = str(qr.get("text", "")).encode()[:MAX_TEXT]
+        coords = [max(-32768, min(32767, int(v))) for point in points for v in point]
+        item = DETECTION.pack(*coords, len(text)) + text
+        if used + len(item) > room:
+            break
+        items.append(item)
+        used += len(item)
+    return DETECTIONS.pack(source_seq & 0xFFFFFFFF, len(items)) + b''.join(items)
+
+def unpack_detections(data: bytes, offset: int) -> Dict:
+    seq, count = DETECTIONS.unpack_from(data, offset)
+    offset += DETECTIONS.size
+    items = []
+    for _ in range(count):
+        *coords, text_len = DETECTION.unpack_from(data, offset)
+        offset += DETECTION.size
+        text = bytes(data[offset:offset + text_len]).decode(errors="replace")
+        offset += text_len
+        items.append({"text": text, "bbox": [list(coords[i:i + 2]) for i in range(0, 8, 2)]})
+    return {"seq": seq, "items": items}
+
+def with_detections(data: bytes, meta: Dict, jpeg_offset: int, block: bytes) -> bytes:
+    """Rebuilds a frame's header with a detections block appended to its ext."""
+    settings = SETTINGS.pack(
+        meta.get("seq", 0), meta.get("quality", 0), meta.get("fps", 0),
+        meta.get("width", 0), meta.get("height", 0)
+    ) + TIER.pack(meta.get("tier", TIER_HIGH))
+    ext = settings + block
+    return data[:8] + bytes([len(ext)]) + ext + data[jpeg_offset:]
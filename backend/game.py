@@ -1,6 +1,5 @@
 import json
 import os
-import time
 import random
 from dataclasses import dataclass, field
 from typing import List, Dict, Optional
@@ -21,6 +20,36 @@ def save_leaderboard(data):
         json.dump(data, f)
 
 from .tracker import Tracker
+from .clock import Clock, WALL_CLOCK
+
+# Enemy call signs, in slot order. These match the QR text on the physical targets.
+CALLSIGNS = ["ALPHA", "BRAVO", "CHARLIE", "DELTA", "ECHO", "FOXTROT"]
+
+# Extra marker payloads that should resolve to a slot (alias -> callsign)
+# e.g. {"A": "ALPHA"} if a target gets reprinted with a short code
+ENEMY_ALIASES: Dict[str, str] = {}
+
+def build_enemy_index(callsigns: List[str], aliases: Dict[str, str] = None) -> Dict[str, int]:
+    """
+    Maps every accepted marker payload straight to an enemy slot.
+    Covers the callsign, enemy_N (1-based), and the usual case variants,
+    so hit resolution is a single dict lookup.
+    """
+    index = {}
+
+    def add(key, slot):
+        for variant in (key, key.lower(), key.upper(), key.capitalize()):
+            index.setdefault(variant, slot)
+
+    for slot, name in enumerate(callsigns):
+        add(name, slot)
+        add(f"enemy_{slot + 1}", slot)
+
+    for alias, name in (aliases or {}).items():
+        if name in callsigns:
+            add(alias, callsigns.index(name))
+
+    return index
 
 # Global State
 leaderboard: List[Dict] = load_leaderboard()
@@ -44,15 +73,23 @@ class GameState:
     
     # Enemies & Tracking
     enemies: List[Dict] = field(default_factory=list)
+    enemy_index: Dict[str, int] = field(default_factory=dict) # marker payload -> slot in enemies
+    enemies_alive: int = 0
     tracker: Tracker = field(default_factory=Tracker)
     
     # Stats Tracking
     shots_fired: int = 0
     enemies_killed: int = 0
 
+    # Time source (VirtualClock in tests and simulations)
+    clock: Clock = field(default=WALL_CLOCK, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.tracker.clock = self.clock
+
     def init_game(self, name: str, mode: str, p_class: str, key: str = None):
         self.is_active = True
-        self.start_time = time.time()
+        self.start_time = self.clock.time()
         self.score = 0
         self.player_name = name
         self.is_ranked = (mode == 'ranked')
@@ -60,7 +97,7 @@ class GameState:
         self.player_class = p_class
         
         # Reset Tracker
-        self.tracker = Tracker()
+        self.tracker = Tracker(self.clock)
         self.shots_fired = 0
         self.enemies_killed = 0
         
@@ -75,19 +112,52 @@ class GameState:
         
         # Init Enemies
         self.enemies = []
-        callsigns = ["ALPHA", "BRAVO", "CHARLIE", "DELTA", "ECHO", "FOXTROT"]
-        for i in range(6):
+        for i, callsign in enumerate(CALLSIGNS):
             hp = random.randint(60, 150)
             self.enemies.append({
                 "id": i,
-                "name": callsigns[i], # This matches QR text
+                "name": callsign, # This matches QR text
                 "hp": hp,
                 "max_hp": hp
             })
+        self.enemies_alive = len(self.enemies)
+
+        # Resolve table is built once per game, the fire path only does lookups
+        self.enemy_index = build_enemy_index(CALLSIGNS, ENEMY_ALIASES)
+
+    # Fields that make up a game in progress (see state_store.py); the tracker is rebuilt from CV
+    SNAPSHOT_FIELDS = ("is_active", "score", "player_name", "player_class", "game_duration",
+                       "is_ranked", "player_key", "ammo", "max_ammo", "enemies",
+                       "enemies_alive", "shots_fired", "enemies_killed")
+
+    def to_snapshot(self) -> Dict:
+        # Whole seconds played rather than start_time, so downtime doesn't count against the player
+        return {**{name: getattr(self, name) for name in self.SNAPSHOT_FIELDS},
+                "elapsed": int(self.clock.time() - self.start_time)}
+
+    def restore(self, data: Dict):
+        """Picks a game back up from a snapshot."""
+        for name in self.SNAPSHOT_FIELDS:
+            if name in data:
+                setattr(self, name, data[name])
+        self.start_time = self.clock.time() - data.get("elapsed", 0)
+        self.last_fire_time = 0
+        self.tracker = Tracker(self.clock)
+        self.enemy_index = build_enemy_index(CALLSIGNS, ENEMY_ALIASES)
+
+    def resolve_enemy(self, marker: str) -> Optional[Dict]:
+        """Returns the enemy a marker payload refers to, or None."""
+        slot = self.enemy_index.get(marker)
+        if slot is None:
+            # Uncommon casing (e.g. "eNeMy_1"), fall back to a lowercase lookup
+            slot = self.enemy_index.get(marker.lower())
+            if slot is None:
+                return None
+        return self.enemies[slot]
 
     def fire_ammo(self) -> bool:
         """Returns True if a shot was fired successfully (ammo > 0 and not on cooldown)."""
-        now = time.time()
+        now = self.clock.time()
         # Cooldown Logic
         cooldown = 0.5
         if self.player_class == 'interceptor': cooldown = 0.2
@@ -122,33 +192,8 @@ class GameState:
             if self.player_class == 'juggernaut': damage = 60
             elif self.player_class == 'interceptor': damage = 10
             
-            callsigns = ["ALPHA", "BRAVO", "CHARLIE", "DELTA", "ECHO", "FOXTROT"]
-            
             for t in targets:
-                raw_id = t['id']
-                target_name = raw_id
-                
-                # Try to map enemy_N to Call Signs
-                # e.g. "enemy_1" -> "ALPHA" (index 0)
-                # "enemy_2" -> "BRAVO" (index 1)
-                lower_id = raw_id.lower()
-                if "enemy_" in lower_id:
-                    try:
-                        # Extract number
-                        parts = lower_id.split('_')
-                        if len(parts) > 1:
-                            idx = int(parts[1]) - 1 # enemy_1 -> index 0
-                            if 0 <= idx < len(callsigns):
-                                target_name = callsigns[idx]
-                    except:
-                        pass
-                
-                # Find enemy object
-                enemy = next((e for e in self.enemies if e['name'] == target_name), None)
-                
-                # Fallback: Check if raw_id matches directly (case insensitive?)
-                if not enemy:
-                     enemy = next((e for e in self.enemies if e['name'].lower() == target_name.lower()), None)
+                enemy = self.resolve_enemy(t['id'])
 
                 if enemy and enemy['hp'] > 0:
                     self.apply_damage(enemy, damage)
@@ -164,10 +209,11 @@ class GameState:
             # Kill Bonus
             self.score += 100
             self.enemies_killed += 1
+            self.enemies_alive -= 1
             print(f"DESTROYED {enemy['name']}!")
             
             # Check if all enemies are dead
-            if all(e['hp'] == 0 for e in self.enemies):
+            if self.enemies_alive <= 0:
                 print("Squad Wipe! Respawning enemies and refilling ammo...")
                 # Refill Ammo
                 self.ammo = self.max_ammo
@@ -177,4 +223,5 @@ class GameState:
                     respawn_hp = random.randint(60, 150)
                     e['hp'] = respawn_hp
                     e['max_hp'] = respawn_hp
+                self.enemies_alive = len(self.enemies)
 
@@ -0,0 +1,81 @@
+import struct
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+# ----- KILL-CAM -----
+# Keeps the last few seconds of the player's stream (frames as relayed, so QR
+# overlays ride along in their headers) by reference to the bytes we already
+# received. At game over the buffer becomes a clip the player downloads from
+# /killcam/<id>, so the replay costs the Pi nothing.
+#
+# Clip: [b"KCAM"][count u16] then per frame [len u32][frame as relayed]
+
+KILLCAM_SECONDS = 5.0
+KILLCAM_FPS = 15 # Frames closer together than this are skipped
+KILLCAM_MAX_BYTES = 6 * 1024 * 1024 # Hard cap for the live buffer
+KILLCAM_KEEP = 3 # Finished clips kept for download
+
+CLIP_MAGIC = b"KCAM"
+CLIP_HEADER = struct.Struct('<4sH')
+CLIP_FRAME = struct.Struct('<I')
+
+class KillCam:
+    def __init__(self, seconds: float = KILLCAM_SECONDS, fps: float = KILLCAM_FPS,
+                 max_bytes: int = KILLCAM_MAX_BYTES, keep: int = KILLCAM_KEEP):
+        self.seconds = seconds
+        self.min_gap = 0.9 / fps # Slack so frame jitter at the target rate doesn't halve it
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.frames: Deque[Tuple[float, bytes]] = deque()
+        self.bytes = 0
+        self.clips: "OrderedDict[str, List[bytes]]" = OrderedDict()
+        self.evicted = 0
+
+    def add(self, frame: bytes, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        if self.frames and now - self.frames[-1][0] < self.min_gap:
+            return
+        self.frames.append((now, frame))
+        self.bytes += len(frame)
+        # Drop from the front until we're inside both the time window and the memory cap
+        while self.frames and (now - self.frames[0][0] > self.seconds or self.bytes > self.max_bytes):
+            _, old = self.frames.popleft()
+            self.bytes -= len(old)
+            self.evicted += 1
+
+    def reset(self):
+        self.frames.clear()
+        self.bytes = 0
+
+    def finish(self) -> Optional[str]:
+        """Turns the buffer into a downloadable clip. Returns its id, or None if empty."""
+        if not self.frames:
+            return None
+        clip_id = uuid.uuid4().hex[:12]
+        self.clips[clip_id] = [frame for _, frame in self.frames]
+        while len(self.clips) > self.keep:
+            self.clips.popitem(last=False)
+        self.reset()
+        return clip_id
+
+    def clip(self, clip_id: str) -> Optional[bytes]:
+        frames = self.clips.get(clip_id)
+        if frames is None:
+            return None
+        parts = [CLIP_HEADER.pack(CLIP_MAGIC, len(frames))]
+        for frame in frames:
+            parts.append(CLIP_FRAME.pack(len(frame)))
+            parts.append(frame)
+        return b"".join(parts)
+
+    def stats(self) -> Dict:
+        return {
+            "buffered_frames": len(self.frames),
+            "buffered_bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "clips": len(self.clips),
+            "clip_bytes": sum(len(f) for frames in self.clips.values() for f in frames),
+            "evicted": self.evicted
+        }
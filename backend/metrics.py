@@ -0,0 +1,28 @@
+import time
+from typing import Callable, Dict
+
+# ----- METRICS -----
+# Tiny in-process registry. Gauges/counters are set directly, providers are
+# callables evaluated whenever /metrics is read.
+
+values: Dict[str, float] = {}
+providers: Dict[str, Callable[[], Dict]] = {}
+
+def set_gauge(name: str, value):
+    values[name] = value
+
+def inc(name: str, amount=1):
+    values[name] = values.get(name, 0) + amount
+
+def register(name: str, provider: Callable[[], Dict]):
+    """provider() returns a dict that is nested under name in the snapshot."""
+    providers[name] = provider
+
+def snapshot() -> Dict:
+    out = {"time": time.time(), **values}
+    for name, provider in providers.items():
+        try:
+            out[name] = provider()
+        except Exception as e:
+            out[name] = {"error": str(e)}
+    return out
@@ -0,0 +1,302 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Callable, List, Dict, Optional
+
+# ----- PAYOUT SERVICE -----
+# Winners are queued here and paid by a background task, so end_game never
+# waits on devnet. Pending payouts are persisted so a restart doesn't lose them.
+
+PAYOUTS_FILE = "pending_payouts.json"
+
+BLOCKHASH_TTL = 60 # Seconds we treat a blockhash as usable (devnet is ~150 slots)
+BLOCKHASH_REFRESH_AHEAD = 15 # Refresh this many seconds before the TTL runs out
+MAX_BATCH = 8 # Transfers per transaction
+MAX_ATTEMPTS = 6 # Give up (and keep the record) after this many failed sends
+MAX_BACKOFF = 60
+POLL_INTERVAL = 2 # Seconds between confirmation checks while something is in flight
+
+
+def new_payout(dest: str, amount_lamports: int) -> Dict:
+    return {
+        "id": uuid.uuid4().hex,
+        "dest": dest,
+        "amount": int(amount_lamports),
+        "status": "pending",
+        "attempts": 0,
+        "next_try": 0,
+        "signature": None,
+        "sent_at": 0,
+        "last_valid_height": None
+    }
+
+
+def record_payout(dest: str, amount_lamports: int, path: str = PAYOUTS_FILE) -> Dict:
+    """
+    Appends a payout to the pending file without a running service, for when the
+    Solana stack can't be loaded. The service picks it up the next time it starts.
+    """
+    entry = new_payout(dest, amount_lamports)
+    pending = []
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            pending = json.load(f)
+    pending.append(entry)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(pending, f)
+    os.replace(tmp, path)
+    return entry
+
+
+class BlockhashCache:
+    """
+    Keeps a recent blockhash around and refreshes it ahead of expiry. The TTL
+    only decides when to fetch a new one; whether a transaction built on it
+    can still land is decided by its last valid block height.
+    """
+
+    def __init__(self, rpc, ttl: float = BLOCKHASH_TTL, refresh_ahead: float = BLOCKHASH_REFRESH_AHEAD):
+        self.rpc = rpc
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.blockhash = None
+        self.last_valid_height = None
+        self.fetched_at = 0.0
+
+    def is_fresh(self) -> bool:
+        return self.blockhash is not None and time.time() - self.fetched_at < self.ttl - self.refresh_ahead
+
+    async def get(self):
+        """Returns (blockhash, last valid block height)."""
+        if not self.is_fresh():
+            await self.refresh()
+        return self.blockhash, self.last_valid_height
+
+    async def refresh(self):
+        self.blockhash, self.last_valid_height = await self.rpc.latest_blockhash()
+        self.fetched_at = time.time()
+
+    def invalidate(self):
+        self.blockhash = None
+
+
+class PayoutService:
+    """
+    Background payout pipeline.
+    rpc must provide: latest_blockhash() -> (blockhash, last valid block height),
+    block_height(), build_transfers(transfers, blockhash), signature_of(tx),
+    send(tx), and signature_statuses(signatures) -> list of "confirmed" /
+    "failed" / None (not found, searching the full history). See SolanaRpc in solana.py.
+
+    A transaction is saved as "sent" with its signature before it goes out, and
+    is only rebuilt once that signature is known to have failed, or is not found
+    and the chain is past its blockhash's last valid block height. A send that
+    errors (or a crash right after it) may still have landed, so resending any
+    earlier could pay a winner twice.
+    """
+
+    def __init__(self, rpc, path: str = PAYOUTS_FILE, max_batch: int = MAX_BATCH,
+                 max_attempts: int = MAX_ATTEMPTS, poll_interval: float = POLL_INTERVAL):
+        self.rpc = rpc
+        self.path = path
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.blockhashes = BlockhashCache(rpc)
+
+        # List of {"id", "dest", "amount", "status", "attempts", "next_try", "signature", "sent_at", "last_valid_height"}
+        # status: pending -> sent -> (removed when confirmed) | failed
+        self.pending: List[Dict] = self.load()
+        self.task: Optional[asyncio.Task] = None
+        self.wake = asyncio.Event()
+
+        # Counters for metrics
+        self.paid = 0
+        self.sends = 0
+
+        # Called after a payout confirms (e.g. to refresh the house balance)
+        self.on_settled: Optional[Callable[[], None]] = None
+
+    # --- Persistence ---
+
+    def load(self) -> List[Dict]:
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    return json.load(f)
+            except:
+                return []
+        return []
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.pending, f)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"[PAYOUT] Failed to persist pending payouts: {e}")
+
+    # --- Public API ---
+
+    def submit(self, dest: str, amount_lamports: int) -> Dict:
+        """Queue a payout and return immediately."""
+        entry = new_payout(dest, amount_lamports)
+        self.pending.append(entry)
+        self.save()
+        print(f"[PAYOUT] Queued {amount_lamports/1e9} SOL to {dest}")
+        self.start()
+        self.wake.set()
+        return entry
+
+    def start(self):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return # No loop yet, the startup hook will call us again
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    def stats(self) -> Dict:
+        return {
+            "pending": sum(1 for e in self.pending if e["status"] in ("pending", "sent")),
+            "failed": sum(1 for e in self.pending if e["status"] == "failed"),
+            "paid": self.paid,
+            "transactions_sent": self.sends
+        }
+
+    # --- Worker ---
+
+    async def run(self):
+        print("[PAYOUT] Payout service started.")
+        while True:
+            try:
+                await self.process_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[PAYOUT] Worker error: {e}")
+
+            self.wake.clear()
+            try:
+                await asyncio.wait_for(self.wake.wait(), timeout=self.next_wakeup())
+            except asyncio.TimeoutError:
+                pass
+
+    def next_wakeup(self) -> float:
+        """Seconds until there is something to do (keeps the blockhash warm while busy)."""
+        now = time.time()
+        waits = []
+        for e in self.pending:
+            if e["status"] == "sent":
+                waits.append(self.poll_interval)
+            elif e["status"] == "pending":
+                waits.append(max(0.0, e["next_try"] - now))
+        if not waits:
+            return 3600
+        return max(0.05, min(waits))
+
+    async def process_once(self):
+        await self.check_confirmations()
+        await self.send_ready()
+
+    async def check_confirmations(self):
+        in_flight = {}
+        for e in self.pending:
+            if e["status"] == "sent":
+                in_flight.setdefault(e["signature"], []).append(e)
+        if not in_flight:
+            return
+
+        signatures = list(in_flight.keys())
+        statuses = await self.rpc.signature_statuses(signatures)
+        now = time.time()
+        changed = False
+        height = None
+        if any(s is None for s in statuses):
+            height = await self.rpc.block_height()
+
+        for sig, status in zip(signatures, statuses):
+            batch = in_flight[sig]
+            if status == "confirmed":
+                for e in batch:
+                    print(f"[PAYOUT] Confirmed {e['amount']/1e9} SOL to {e['dest']} ({sig})")
+                    self.pending.remove(e)
+                    self.paid += 1
+                changed = True
+                if self.on_settled:
+                    self.on_settled()
+            elif status == "failed" or (status is None and self.expired(batch[0], height, now)):
+                # Failed on chain, or dropped and its blockhash can no longer land: safe to resend
+                print(f"[PAYOUT] Transaction {sig} {'failed' if status else 'expired'}, retrying")
+                for e in batch:
+                    self.schedule_retry(e, now)
+                changed = True
+
+        if changed:
+            self.save()
+
+    def expired(self, entry: Dict, height: int, now: float) -> bool:
+        last_valid = entry.get("last_valid_height")
+        if last_valid is None:
+            # Saved before we tracked block heights: fall back to the wall clock
+            return now - entry["sent_at"] > self.blockhashes.ttl
+        return height > last_valid
+
+    async def send_ready(self):
+        now = time.time()
+        ready = [e for e in self.pending if e["status"] == "pending" and e["next_try"] <= now]
+
+        for i in range(0, len(ready), self.max_batch):
+            batch = ready[i:i + self.max_batch]
+            try:
+                blockhash, last_valid_height = await self.blockhashes.get()
+                tx = self.rpc.build_transfers([(e["dest"], e["amount"]) for e in batch], blockhash)
+                signature = str(self.rpc.signature_of(tx))
+            except Exception as e:
+                print(f"[PAYOUT] Could not build transaction: {e}")
+                self.blockhashes.invalidate()
+                for entry in batch:
+                    self.schedule_retry(entry, time.time())
+                self.save()
+                continue
+
+            # On disk before it goes out: after a crash we check this signature instead of paying again
+            sent_at = time.time()
+            for e in batch:
+                e["status"] = "sent"
+                e["signature"] = signature
+                e["sent_at"] = sent_at
+                e["last_valid_height"] = last_valid_height
+            self.save()
+
+            try:
+                await self.rpc.send(tx)
+                self.sends += 1
+                print(f"[PAYOUT] Sent {len(batch)} transfer(s) in one transaction: {signature}")
+            except Exception as e:
+                # It may have landed anyway. check_confirmations polls the signature
+                # and only retries once its blockhash has expired.
+                print(f"[PAYOUT] Send failed, watching {signature} until its blockhash expires: {e}")
+                # A stale blockhash is the usual culprit
+                self.blockhashes.invalidate()
+
+    def schedule_retry(self, entry: Dict, now: float):
+        entry["attempts"] += 1
+        entry["signature"] = None
+        if entry["attempts"] >= self.max_attempts:
+            entry["status"] = "failed"
+            print(f"[PAYOUT] Giving up on payout {entry['id']} to {entry['dest']} after {entry['attempts']} attempts")
+            return
+        entry["status"] = "pending"
+        entry["next_try"] = now + min(MAX_BACKOFF, 2 ** entry["attempts"])
@@ -0,0 +1,162 @@
+import asyncio
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+# ----- ON-DEMAND PROFILER -----
+# GET /admin/profile?seconds=N (see server.py) samples every thread's stack for
+# N seconds and returns them as collapsed stacks ("thread;outer;...;inner count"),
+# the input format of flamegraph.pl and speedscope. For the same window it
+# times the hot ConnectionManager handlers and turns on asyncio's slow-callback
+# warnings, and reports anything over its threshold.
+#
+# Nothing is installed outside a profile: handlers are wrapped on the manager
+# instance when one starts and unwrapped when it ends, and the loop's debug
+# mode is put back how it was.
+
+MAX_SECONDS = 30
+DEFAULT_INTERVAL = 0.005 # Seconds between stack samples
+MAX_SLOW_EVENTS = 20 # Slowest calls kept per handler
+
+# Handler -> seconds (wall time, including awaits) above which a call is reported
+HANDLER_THRESHOLDS = {
+    "process_client_message": 0.005,
+    "process_pi_message": 0.010,
+    "broadcast_game_update": 0.005
+}
+LOOP_SLOW_CALLBACK = 0.05 # asyncio debug threshold for any single callback
+
+class HandlerTimer:
+    def __init__(self, name: str, threshold: float):
+        self.name = name
+        self.threshold = threshold
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow: List[Dict] = []
+        self.slow_count = 0
+
+    def record(self, seconds: float, started: float):
+        self.calls += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if seconds > self.threshold:
+            self.slow_count += 1
+            self.slow.append({"at": round(started, 3), "ms": round(seconds * 1000, 2)})
+            self.slow.sort(key=lambda e: e["ms"], reverse=True)
+            del self.slow[MAX_SLOW_EVENTS:]
+
+    def report(self) -> Dict:
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "calls": self.calls,
+            "avg_ms": round(self.total / self.calls * 1000, 3) if self.calls else None,
+            "max_ms": round(self.max * 1000, 2),
+            "slow": self.slow_count,
+            "slowest": self.slow
+        }
+
+def timed(fn, timer: HandlerTimer):
+    async def wrapper(*args, **kwargs):
+        started = time.time()
+        t0 = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            timer.record(time.perf_counter() - t0, started)
+    return wrapper
+
+class SlowCallbackLog(logging.Handler):
+    """Collects asyncio's 'Executing <Handle ...> took N seconds' warnings."""
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.events: List[str] = []
+
+    def emit(self, record):
+        message = record.getMessage()
+        if message.startswith("Executing") and len(self.events) < MAX_SLOW_EVENTS:
+            self.events.append(message)
+
+def frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def sample_stacks(stop: threading.Event, interval: float, counts: Counter):
+    me = threading.get_ident()
+    while not stop.wait(interval):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            counts[";".join(reversed(stack))] += 1
+
+class Profiler:
+    def __init__(self):
+        self.running = False
+        self.runs = 0
+
+    async def profile(self, manager, seconds: float, interval: float = DEFAULT_INTERVAL) -> Dict:
+        if self.running:
+            raise RuntimeError("a profile is already running")
+        seconds = max(0.1, min(seconds, MAX_SECONDS))
+        self.running = True
+        loop = asyncio.get_running_loop()
+
+        # Wrap the hot handlers on this instance only (the class is untouched)
+        timers = {name: HandlerTimer(name, threshold) for name, threshold in HANDLER_THRESHOLDS.items()}
+        for name, timer in timers.items():
+            setattr(manager, name, timed(getattr(manager, name), timer))
+
+        was_debug, was_threshold = loop.get_debug(), loop.slow_callback_duration
+        slow_log = SlowCallbackLog()
+        asyncio_logger = logging.getLogger("asyncio")
+        asyncio_logger.addHandler(slow_log)
+        loop.slow_callback_duration = LOOP_SLOW_CALLBACK
+        loop.set_debug(True)
+
+        counts: Counter = Counter()
+        stop = threading.Event()
+        sampler = threading.Thread(target=sample_stacks, args=(stop, interval, counts), name="profiler", daemon=True)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            await asyncio.to_thread(sampler.join)
+            loop.set_debug(was_debug)
+            loop.slow_callback_duration = was_threshold
+            asyncio_logger.removeHandler(slow_log)
+            for name in timers:
+                manager.__dict__.pop(name, None)
+            self.running = False
+            self.runs += 1
+
+        return {
+            "seconds": round(time.perf_counter() - started, 3),
+            "interval_ms": interval * 1000,
+            "samples": sum(counts.values()),
+            "collapsed": collapsed(counts),
+            "handlers": {name: timer.report() for name, timer in timers.items()},
+            "slow_callbacks": {"threshold_ms": LOOP_SLOW_CALLBACK * 1000, "events": slow_log.events}
+        }
+
+def collapsed(counts: Counter) -> str:
+    """One 'frame;frame;frame count' line per distinct stack, heaviest first."""
+    return "\n".join(f"{stack} {n}" for stack, n in counts.most_common())
+
+def check_admin(token: Optional[str]) -> bool:
+    """Admin endpoints are off unless ADMIN_TOKEN is set, and then need it."""
+    expected = os.environ.get("ADMIN_TOKEN")
+    # Bytes: compare_digest refuses non-ASCII str, and a bad token must be a 404, not a 500
+    return bool(expected) and token is not None and hmac.compare_digest(token.encode(), expected.encode())
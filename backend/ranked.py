@@ -0,0 +1,35 @@
+import os
+import threading
+
+from .startup import phase
+
+# ----- RANKED MODE -----
+# Constants live here so the game loop can use them without importing the
+# solana/solders stack. The stack itself (keypair, RPC client, payout and
+# verifier services) is loaded on first use, or by the server's startup task.
+# Set RANKED_ENABLED=0 for a casual-only deployment that never loads it.
+
+RANKED_ENABLED = os.environ.get("RANKED_ENABLED", "1") != "0"
+
+ENTRY_FEE = 0.1 * 10**9 # 0.1 SOL in lamports
+WIN_THRESHOLD = 500 # Score to win
+PAYOUT_AMOUNT = 0.18 * 10**9 # 0.18 SOL (House takes fee)
+
+_solana = None
+_lock = threading.Lock()
+
+def is_loaded() -> bool:
+    return _solana is not None
+
+def solana():
+    """Returns the backend.solana module, importing it the first time."""
+    global _solana
+    if _solana is None:
+        if not RANKED_ENABLED:
+            raise RuntimeError("Ranked mode is disabled (RANKED_ENABLED=0)")
+        with _lock:
+            if _solana is None:
+                with phase("solana"):
+                    from . import solana as module
+                _solana = module
+    return _solana
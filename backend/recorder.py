@@ -0,0 +1,108 @@
+import json
+import queue
+import struct
+import threading
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+# ----- SESSION RECORDER -----
+# Writes everything that flows through ConnectionManager to one file so a live
+# session can be replayed later (see replay.py). Writing happens on its own
+# thread; the event loop only pays for a queue put.
+#
+# File: MAGIC, then records of [kind u8][client u16][t f64 seconds][len u32][payload]
+#   FRAME    Pi video frame as received (header + JPEG)
+#   CONTROL  8-byte control packet from a client
+#   ACTION   JSON text from a client (join_queue, confirm_match, ...)
+#   CV       JSON {"seq": source frame seq, "results": [...]} after each CV run
+#   CONNECT / DISCONNECT  client came or went (empty payload)
+
+MAGIC = b"GURTREC1"
+RECORD = struct.Struct('<BHdI')
+
+FRAME = 1
+CONTROL = 2
+ACTION = 3
+CV = 4
+CONNECT = 5
+DISCONNECT = 6
+
+KIND_NAMES = {FRAME: "frame", CONTROL: "control", ACTION: "action", CV: "cv", CONNECT: "connect", DISCONNECT: "disconnect"}
+
+MAX_QUEUE = 512 # Records waiting for the writer before we start dropping frames
+
+class Recorder:
+    def __init__(self, path: str):
+        self.path = path
+        self.started = time.perf_counter()
+        self.queue: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self.clients: Dict[object, int] = {}
+        self.next_client = 1
+        self.records = 0
+        self.bytes = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self.writer, name="recorder", daemon=True)
+        self.thread.start()
+        print(f"[RECORD] Recording session to {path}")
+
+    def client_id(self, websocket) -> int:
+        cid = self.clients.get(websocket)
+        if cid is None:
+            cid = self.clients[websocket] = self.next_client
+            self.next_client = (self.next_client + 1) & 0xFFFF or 1
+        return cid
+
+    def record(self, kind: int, payload: bytes = b"", websocket=None):
+        # Frames are the bulk; if the disk can't keep up, lose frames rather than events
+        if kind == FRAME and self.queue.qsize() > MAX_QUEUE:
+            self.dropped += 1
+            return
+        cid = self.client_id(websocket) if websocket is not None else 0
+        t = time.perf_counter() - self.started
+        self.queue.put(RECORD.pack(kind, cid, t, len(payload)) + payload)
+
+    def record_json(self, kind: int, data, websocket=None):
+        self.record(kind, json.dumps(data, separators=(",", ":")).encode(), websocket)
+
+    def disconnected(self, websocket):
+        self.record(DISCONNECT, b"", websocket)
+        self.clients.pop(websocket, None)
+
+    def writer(self):
+        with open(self.path, "wb") as f:
+            f.write(MAGIC)
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+                f.write(item)
+                self.records += 1
+                self.bytes += len(item)
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+
+    def stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "records": self.records,
+            "bytes": self.bytes,
+            "queued": self.queue.qsize(),
+            "dropped_frames": self.dropped
+        }
+
+def read_records(path: str) -> Iterator[Tuple[int, int, float, bytes]]:
+    """Yields (kind, client, t, payload) from a recording."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a session recording")
+        while True:
+            head = f.read(RECORD.size)
+            if len(head) < RECORD.size:
+                return # A recording cut off mid-record just ends there
+            kind, client, t, length = RECORD.unpack(head)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+            yield kind, client, t, payload
@@ -0,0 +1,216 @@
+import asyncio
+import math
+import time
+from typing import Dict, Optional
+from fastapi import WebSocket
+
+from .frames import TIER_HIGH, TIER_LOW
+
+# ----- VIDEO RELAY -----
+# Each client gets its own sender with a one-frame slot. If a client is still
+# busy sending the previous frame, the waiting frame is replaced (latest wins)
+# and counted as a drop, so one slow spectator never holds up the others.
+#
+# Simulcast: the Pi may also send a low-res tier. The active player (and any
+# spectator who asked for it) gets the full stream, everyone else the low tier.
+# If the low tier stops arriving, everyone falls back to the full stream.
+#
+# Under load (see admission.py) spectators are held to one frame every
+# spectator_interval seconds; the player and queued clients are exempt.
+
+EWMA = 0.2
+# Decode stats browsers report about themselves (see static/js/video.js) -> largest believable value
+CLIENT_STATS = {"decoded": 1e9, "dropped": 1e9, "decode_ms": 10_000.0, "decode_p95_ms": 10_000.0}
+LOW_TIER_TIMEOUT = 2.0 # Seconds without a low-tier frame before spectators fall back
+
+class ClientStream:
+    def __init__(self, websocket: WebSocket):
+        self.ws = websocket
+        self.pending: Optional[bytes] = None
+        self.sending = False
+        self.failed = False
+        self.offered = 0
+        self.dropped = 0
+        self.send_ms = 0.0 # EWMA of time spent in send_bytes
+        self.player = False # Active player always gets the full stream
+        self.wants_high = False # Spectator upgraded on demand
+        self.visible = True # Tab in the foreground (hidden tabs get no frames)
+        self.protected = False # Queued: never shed under load
+        self.next_frame_at = 0.0 # When shedding, no frame before this
+        self.bytes_sent = 0
+        self.client_stats: Optional[Dict] = None # Browser-side decode stats, if reported
+
+    def wanted_tier(self) -> int:
+        return TIER_HIGH if self.player or self.wants_high else TIER_LOW
+
+    def offer(self, data: bytes):
+        self.offered += 1
+        if self.sending:
+            if self.pending is not None:
+                self.dropped += 1
+            self.pending = data
+            return
+        self.sending = True
+        asyncio.create_task(self.pump(data))
+
+    async def pump(self, data: bytes):
+        try:
+            while data is not None and not self.failed:
+                t0 = time.perf_counter()
+                await self.ws.send_bytes(data)
+                self.bytes_sent += len(data)
+                ms = (time.perf_counter() - t0) * 1000
+                self.send_ms += EWMA * (ms - self.send_ms)
+                data, self.pending = self.pending, None
+        except:
+            self.failed = True
+        finally:
+            self.sending = False
+
+class VideoRelay:
+    def __init__(self):
+        self.streams: Dict[WebSocket, ClientStream] = {}
+        self.relay_ms = 0.0 # EWMA of time spent handing a frame to every client
+        self.frames = 0
+        self.low_frames = 0
+        self.low_seen_at = 0.0
+        # Window for drop rate (reset every feedback())
+        self.window_offered = 0
+        self.window_dropped = 0
+        self.spectator_interval = 0.0 # Seconds between frames for shed spectators (0 = every frame)
+        self.shed = 0 # Frames held back from spectators under load
+        self.removed_bytes = 0 # bytes_sent of streams that have gone
+
+    def add(self, websocket: WebSocket):
+        self.streams.setdefault(websocket, ClientStream(websocket))
+
+    def remove(self, websocket: WebSocket):
+        stream = self.streams.pop(websocket, None)
+        if stream:
+            self.removed_bytes += stream.bytes_sent
+
+    def bytes_sent(self) -> int:
+        return self.removed_bytes + sum(s.bytes_sent for s in self.streams.values())
+
+    def set_player(self, websocket: Optional[WebSocket]):
+        for ws, stream in self.streams.items():
+            stream.player = ws == websocket
+
+    def set_protected(self, websockets):
+        for ws, stream in self.streams.items():
+            stream.protected = ws in websockets
+
+    def set_wants_high(self, websocket: WebSocket, wants_high: bool):
+        stream = self.streams.get(websocket)
+        if stream:
+            stream.wants_high = wants_high
+
+    def set_client_stats(self, websocket: WebSocket, data: Dict):
+        stream = self.streams.get(websocket)
+        if not stream:
+            return
+        stats = {}
+        for key, limit in CLIENT_STATS.items():
+            try:
+                value = float(data.get(key) or 0)
+            except (TypeError, ValueError):
+                return
+            if not math.isfinite(value):
+                return # "nan" / "inf" would make /metrics unserializable for everyone
+            stats[key] = min(max(value, 0.0), limit)
+        stats["worker"] = bool(data.get("worker"))
+        stream.client_stats = stats
+
+    def client_decode(self) -> Dict:
+        reports = [s.client_stats for s in self.streams.values() if s.client_stats]
+        return {
+            "reporting": len(reports),
+            "worker": sum(1 for r in reports if r["worker"]),
+            "decoded": int(sum(r["decoded"] for r in reports)),
+            "dropped": int(sum(r["dropped"] for r in reports)),
+            "decode_ms": round(sum(r["decode_ms"] for r in reports) / len(reports), 2) if reports else None,
+            "decode_p95_ms": max((r["decode_p95_ms"] for r in reports), default=None)
+        }
+
+    def set_visible(self, websocket: WebSocket, visible: bool):
+        stream = self.streams.get(websocket)
+        if stream:
+            stream.visible = visible
+
+    def visible_count(self) -> int:
+        return sum(1 for s in self.streams.values() if s.visible)
+
+    def low_tier_live(self) -> bool:
+        return time.time() - self.low_seen_at < LOW_TIER_TIMEOUT
+
+    def tier_for(self, stream: ClientStream) -> int:
+        return stream.wanted_tier() if self.low_tier_live() else TIER_HIGH
+
+    def relay(self, data: bytes, tier: int = TIER_HIGH):
+        t0 = time.perf_counter()
+        if tier == TIER_LOW:
+            self.low_seen_at = time.time()
+            self.low_frames += 1
+        else:
+            self.frames += 1
+
+        failed = []
+        now = time.time()
+        for ws, stream in self.streams.items():
+            if stream.failed:
+                failed.append(ws)
+                continue
+            if not stream.visible or self.tier_for(stream) != tier:
+                continue
+            if self.spectator_interval and not (stream.player or stream.protected):
+                if now < stream.next_frame_at:
+                    self.shed += 1
+                    continue
+                stream.next_frame_at = now + self.spectator_interval
+            before = stream.dropped
+            stream.offer(data)
+            if tier == TIER_HIGH:
+                # The Pi's bitrate controller only tunes the full stream
+                self.window_offered += 1
+                self.window_dropped += stream.dropped - before
+        for ws in failed:
+            self.remove(ws)
+        ms = (time.perf_counter() - t0) * 1000
+        self.relay_ms += EWMA * (ms - self.relay_ms)
+        return failed
+
+    def backlog(self) -> int:
+        """Frames waiting behind a send that is still in flight."""
+        return sum(1 for s in self.streams.values() if s.pending is not None)
+
+    def feedback(self) -> Dict:
+        """Summary for the Pi's bitrate controller. Resets the drop-rate window."""
+        drop_rate = self.window_dropped / self.window_offered if self.window_offered else 0.0
+        self.window_offered = 0
+        self.window_dropped = 0
+        high = [s for s in self.streams.values() if self.tier_for(s) == TIER_HIGH]
+        send_ms = max((s.send_ms for s in high), default=0.0)
+        return {
+            "type": "video_feedback",
+            "clients": len(self.streams),
+            # Spectators who would take the low tier (the Pi skips encoding it when 0)
+            "low_clients": sum(1 for s in self.streams.values() if s.visible and s.wanted_tier() == TIER_LOW),
+            "backlog": self.backlog(),
+            "backlog_ms": round(send_ms, 1), # Slowest client's send time
+            "drop_rate": round(drop_rate, 3)
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "clients": len(self.streams),
+            "frames": self.frames,
+            "low_frames": self.low_frames,
+            "low_tier_live": self.low_tier_live(),
+            "high_clients": sum(1 for s in self.streams.values() if s.visible and self.tier_for(s) == TIER_HIGH),
+            "visible": self.visible_count(),
+            "relay_ms": round(self.relay_ms, 2),
+            "backlog": self.backlog(),
+            "dropped": sum(s.dropped for s in self.streams.values()),
+            "shed": self.shed,
+            "client_decode": self.client_decode()
+        }
@@ -5,9 +5,13 @@ from solders.pubkey import Pubkey
 from solders.transaction import Transaction
 from solders.system_program import TransferParams, transfer
 from solana.rpc.async_api import AsyncClient
-from solana.rpc.commitment import Confirmed
 import solders
-import asyncio
+
+from .payouts import PayoutService
+from .verifier import EntryVerifier, JsonRpc
+from .balance import BalanceCache
+from . import metrics
+from .ranked import ENTRY_FEE, PAYOUT_AMOUNT
 
 # ----- SOLANA CONFIG -----
 SOLANA_RPC = "https://api.devnet.solana.com"
@@ -55,71 +59,76 @@ HOUSE_KEYPAIR = load_or_create_keypair()
 print(f"\\n[SOLANA] House Wallet Public Key: {HOUSE_KEYPAIR.pubkey()}")
 print("[SOLANA] Please fund this wallet on Devnet for payouts to work!\\n")
 
-ENTRY_FEE = 0.1 * 10**9 # 0.1 SOL in lamports
-WIN_THRESHOLD = 500 # Score to win
-PAYOUT_AMOUNT = 0.18 * 10**9 # 0.18 SOL (House takes fee)
+entry_verifier = EntryVerifier(JsonRpc(SOLANA_RPC), str(HOUSE_KEYPAIR.pubkey()), ENTRY_FEE)
 
-async def verify_transaction(signature: str, expected_payer: str) -> bool:
-    print(f"Verifying transaction {signature}...")
-    for attempt in range(20): # Try for 40 seconds
-        try:
-            # Fetch transaction
-            sig = solders.signature.Signature.from_string(signature)
-            tx = await solana_client.get_transaction(
-                sig, 
-                max_supported_transaction_version=0,
-                commitment=Confirmed
-            )
-            
-            if not tx.value:
-                print(f"Attempt {attempt+1}: Transaction not found yet...")
-                await asyncio.sleep(2)
-                continue
-                
-            # Basic Verification: Check if it transferred > 0.09 SOL to House
-            # We strictly should check amount, but for demo, just checking existence and receiver is House
-            # Check meta for errors
-            if tx.value.transaction.meta.err is not None:
-                print("Transaction has errors")
-                return False
-                
-            # TODO: Deep check input/output amounts. 
-            # For hackathon speed: Assume if it exists and no error, it's good.
-            print(f"Transaction {signature} verified on attempt {attempt+1}!")
-            return True
-        except Exception as e:
-            print(f"Verification attempt {attempt+1} error: {e}")
-            await asyncio.sleep(2)
-            
-    print("Verification timed out.")
-    return False
+async def verify_transaction(signature: str, expected_payer: str, resume: bool = False) -> bool:
+    # Checked together with every other pending entry by the background verifier
+    return await entry_verifier.verify(signature, expected_payer, resume)
 
-async def payout(dest_pubkey_str: str, amount_lamports: int):
-    try:
-        dest_pubkey = Pubkey.from_string(dest_pubkey_str)
-        print(f"Initiating Payout of {amount_lamports/1e9} SOL to {dest_pubkey_str}...")
-        
-        # Create Transfer Instruction
-        ix = transfer(
-            TransferParams(
-                from_pubkey=HOUSE_KEYPAIR.pubkey(),
-                to_pubkey=dest_pubkey,
-                lamports=int(amount_lamports)
+
+class SolanaRpc:
+    """Adapter between PayoutService and the solana-py client (solders types stay in here)."""
+
+    def __init__(self, client: AsyncClient, payer: Keypair):
+        self.client = client
+        self.payer = payer
+
+    async def latest_blockhash(self):
+        resp = await self.client.get_latest_blockhash()
+        return resp.value.blockhash, resp.value.last_valid_block_height
+
+    async def block_height(self):
+        resp = await self.client.get_block_height()
+        return resp.value
+
+    def build_transfers(self, transfers, blockhash):
+        # Several winners can share one transaction (one transfer ix each)
+        ixs = [
+            transfer(
+                TransferParams(
+                    from_pubkey=self.payer.pubkey(),
+                    to_pubkey=Pubkey.from_string(dest),
+                    lamports=int(amount)
+                )
             )
-        )
-        
-        # Create Transaction
-        latest_blockhash = await solana_client.get_latest_blockhash()
-        txn = Transaction.new_signed_with_payer(
-            [ix],
-            HOUSE_KEYPAIR.pubkey(),
-            [HOUSE_KEYPAIR],
-            latest_blockhash.value.blockhash
-        )
-        
-        # Send
-        resp = await solana_client.send_transaction(txn)
-        print(f"Payout Sent! Signature: {resp.value}")
+            for dest, amount in transfers
+        ]
+        return Transaction.new_signed_with_payer(ixs, self.payer.pubkey(), [self.payer], blockhash)
+
+    def signature_of(self, txn):
+        # Fee payer's signature, known as soon as the transaction is signed
+        return txn.signatures[0]
+
+    async def send(self, txn):
+        resp = await self.client.send_transaction(txn)
         return resp.value
-    except Exception as e:
-        print(f"Payout Failed: {e}")
+
+    async def signature_statuses(self, signatures):
+        sigs = [solders.signature.Signature.from_string(s) for s in signatures]
+        # Full history: a confirmed payout drops out of the node's recent status cache,
+        # and reading that as "dropped" would pay the winner again
+        resp = await self.client.get_signature_statuses(sigs, search_transaction_history=True)
+        results = []
+        for status in resp.value:
+            if status is None or status.confirmation_status is None:
+                results.append(None)
+            elif status.err is not None:
+                results.append("failed")
+            elif str(status.confirmation_status).endswith(("Confirmed", "Finalized")):
+                results.append("confirmed")
+            else:
+                results.append(None) # Processed, not confirmed yet
+        return results
+
+payout_service = PayoutService(SolanaRpc(solana_client, HOUSE_KEYPAIR))
+
+async def fetch_house_balance() -> int:
+    resp = await solana_client.get_balance(HOUSE_KEYPAIR.pubkey())
+    return resp.value
+
+# Low balance = can't cover a single winner anymore
+house_balance = BalanceCache(fetch_house_balance, low_threshold=PAYOUT_AMOUNT)
+payout_service.on_settled = house_balance.request_refresh
+entry_verifier.on_settled = house_balance.request_refresh
+
+metrics.register("payouts", payout_service.stats)
@@ -0,0 +1,26 @@
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from . import metrics
+
+# ----- STARTUP REPORT -----
+# Each heavy init step is wrapped in phase() so boot time is visible per step
+# (printed and exposed under "startup" in /metrics).
+
+phases: Dict[str, float] = {} # name -> ms
+
+@contextmanager
+def phase(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - t0) * 1000
+        phases[name] = round(ms, 1)
+        print(f"[STARTUP] {name}: {ms:.1f} ms")
+
+def report() -> Dict[str, float]:
+    return dict(phases)
+
+metrics.register("startup", report)
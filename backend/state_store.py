@@ -0,0 +1,123 @@
+import json
+import os
+import time
+from typing import Dict
+
+# ----- CRASH-SAFE ARENA STATE -----
+# Game and queue state survive a restart or deploy. Every change is appended
+# to a journal as the new value of the section it touched ("game" or "queue"),
+# skipped when nothing changed, so a fire or score update costs one short
+# line. Every SNAPSHOT_INTERVAL seconds the sections are written out in full
+# (tmp file + rename, like the payout file) and the journal starts over.
+#
+# Loading reads the snapshot and applies the journal lines written after it,
+# last write per section wins. Lines are numbered so a crash between writing
+# a snapshot and truncating the journal can't apply stale lines on top.
+#
+# Journal: one JSON object per line {"seq": n, "t": wall time, "section": name, "value": ...}
+# Snapshot: {"seq": last journal line included, "t": wall time, "sections": {...}}
+#
+# Lines are flushed to the OS as they are written, so a killed process loses
+# nothing; a power cut can lose the last moments.
+
+SNAPSHOT_INTERVAL = 5.0 # Seconds between snapshots while something changes
+MAX_JOURNAL_LINES = 500 # Snapshot early if the journal grows past this
+
+class StateStore:
+    def __init__(self, path: str):
+        self.snapshot_path = path + ".snapshot.json"
+        self.journal_path = path + ".journal"
+        self.sections: Dict[str, object] = {}
+        self.encoded: Dict[str, str] = {} # Last written JSON per section, to skip no-op writes
+        self.seq = 0
+        self.journal = None
+        self.journal_lines = 0
+        self.snapshots = 0
+        self.last_snapshot = time.time()
+
+    # --- Loading ---
+
+    def load(self) -> Dict[str, object]:
+        """Reads snapshot + journal. Returns the sections (empty on first start)."""
+        snapshot_seq = 0
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, "r") as f:
+                    snapshot = json.load(f)
+                self.sections = snapshot.get("sections", {})
+                snapshot_seq = self.seq = snapshot.get("seq", 0)
+            except Exception as e:
+                print(f"[STATE] Ignoring unreadable snapshot: {e}")
+
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break # Torn last line from a crash mid-write
+                    if record["seq"] <= snapshot_seq:
+                        continue
+                    self.sections[record["section"]] = record["value"]
+                    self.seq = record["seq"]
+
+        self.encoded = {name: json.dumps(value, separators=(",", ":")) for name, value in self.sections.items()}
+        # Start clean: everything loaded goes into a fresh snapshot
+        self.write_snapshot()
+        return dict(self.sections)
+
+    # --- Writing ---
+
+    def update(self, section: str, value) -> bool:
+        """Journals a section's new value. Returns False if it didn't change."""
+        encoded = json.dumps(value, separators=(",", ":"))
+        if self.encoded.get(section) == encoded:
+            return False
+        self.encoded[section] = encoded
+        self.sections[section] = value
+        self.seq += 1
+
+        if self.journal is None:
+            self.journal = open(self.journal_path, "a")
+        self.journal.write(f'{{"seq":{self.seq},"t":{time.time()},"section":{json.dumps(section)},"value":{encoded}}}\n')
+        self.journal.flush()
+        self.journal_lines += 1
+
+        if self.journal_lines >= MAX_JOURNAL_LINES:
+            self.write_snapshot()
+        return True
+
+    def maybe_snapshot(self):
+        if self.journal_lines and time.time() - self.last_snapshot >= SNAPSHOT_INTERVAL:
+            self.write_snapshot()
+
+    def write_snapshot(self):
+        try:
+            tmp = self.snapshot_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"seq": self.seq, "t": time.time(), "sections": self.sections}, f)
+            os.replace(tmp, self.snapshot_path)
+        except Exception as e:
+            print(f"[STATE] Failed to write snapshot: {e}")
+            return
+        # Everything in the journal is in the snapshot now
+        if self.journal is not None:
+            self.journal.close()
+        self.journal = open(self.journal_path, "w")
+        self.journal_lines = 0
+        self.snapshots += 1
+        self.last_snapshot = time.time()
+
+    def close(self):
+        if self.journal is not None:
+            self.write_snapshot()
+            self.journal.close()
+            self.journal = None
+
+    def stats(self) -> Dict:
+        return {
+            "seq": self.seq,
+            "journal_lines": self.journal_lines,
+            "snapshots": self.snapshots,
+            "since_snapshot_s": round(time.time() - self.last_snapshot, 1)
+        }
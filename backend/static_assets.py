@@ -0,0 +1,229 @@
+import asyncio
+import gzip
+import hashlib
+import mimetypes
+import os
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+try:
+    import brotli
+except ImportError: # Optional: without it we serve gzip (and any .br built elsewhere)
+    brotli = None
+
+# ----- STATIC ASSETS -----
+# Serves static/ with:
+#   - precompressed variants: file.js.br / file.js.gz next to file.js (built by
+#     precompress.py) are sent to browsers that accept them. A variant older
+#     than its source is ignored.
+#   - strong ETags (content hash of the exact bytes sent) and 304s.
+#   - Cache-Control: versioned URLs (?v=...) are immutable for a year,
+#     everything else is revalidated with the ETag on each use.
+#   - hot small files held in memory, compressed once, up to MEMORY_BUDGET.
+#
+# Reading, hashing and compressing a new or changed file run in a worker
+# thread, so the first request for it doesn't stall the relay or the game.
+# The caches are only touched on the event loop.
+
+COMPRESSIBLE = {".js", ".html", ".css", ".json", ".svg", ".txt", ".map"}
+MIN_COMPRESS = 512 # Bytes; below this compression isn't worth a header
+MAX_MEMORY_FILE = 256 * 1024
+MEMORY_BUDGET = 16 * 1024 * 1024
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+mimetypes.add_type("text/javascript", ".js")
+
+class Variant:
+    """One representation of a file: identity, gzip or br."""
+    def __init__(self, body: Optional[bytes], path: Optional[str], encoding: Optional[str], etag: str, size: int):
+        self.body = body # In memory, or None to stream path from disk
+        self.path = path
+        self.encoding = encoding
+        self.etag = etag
+        self.size = size
+
+def strong_etag(data: bytes, encoding: Optional[str]) -> str:
+    digest = hashlib.blake2b(data, digest_size=12).hexdigest()
+    return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+def file_etag(path: str, encoding: Optional[str]) -> str:
+    h = hashlib.blake2b(digest_size=12)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return f'"{h.hexdigest()}-{encoding}"' if encoding else f'"{h.hexdigest()}"'
+
+def accepted_encodings(request: Request) -> set:
+    header = request.headers.get("accept-encoding", "")
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+class StaticAssets:
+    def __init__(self, directory: str, memory_budget: int = MEMORY_BUDGET):
+        self.directory = os.path.realpath(directory)
+        self.memory_budget = memory_budget
+        # path -> ((mtime_ns, size), {encoding: Variant}); LRU order, memory-held files only
+        self.hot: "OrderedDict[str, Tuple[Tuple[int, int], Dict[Optional[str], Variant]]]" = OrderedDict()
+        self.hot_bytes = 0
+        # ETags of files streamed from disk, so they're hashed once per version
+        self.etags: Dict[Tuple[str, int, int], str] = {}
+        # (path, version) -> load in progress, so a burst of first requests does the work once
+        self.loading: Dict[Tuple[str, Tuple[int, int]], asyncio.Future] = {}
+        self.requests = 0
+        self.memory_hits = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self.bytes_saved = 0 # Identity size minus what we actually sent
+
+    def resolve(self, rel_path: str) -> Optional[str]:
+        path = os.path.realpath(os.path.join(self.directory, rel_path))
+        if not path.startswith(self.directory + os.sep) or not os.path.isfile(path):
+            return None
+        return path
+
+    # --- Variants ---
+
+    def disk_variants(self, path: str, stat: os.stat_result) -> Dict[Optional[str], Tuple[str, int]]:
+        """Identity file plus any precompressed siblings that are at least as new."""
+        found = {None: (path, stat.st_size)}
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            try:
+                variant = os.stat(path + suffix)
+            except OSError:
+                continue
+            if variant.st_mtime_ns >= stat.st_mtime_ns and variant.st_size < stat.st_size:
+                found[encoding] = (path + suffix, variant.st_size)
+        return found
+
+    def load_hot(self, path: str, stat: os.stat_result) -> Dict[Optional[str], Variant]:
+        with open(path, "rb") as f:
+            body = f.read()
+        variants = {None: Variant(body, path, None, strong_etag(body, None), len(body))}
+        for encoding, (variant_path, _) in self.disk_variants(path, stat).items():
+            if encoding:
+                with open(variant_path, "rb") as f:
+                    data = f.read()
+                variants[encoding] = Variant(data, variant_path, encoding, strong_etag(data, encoding), len(data))
+
+        # No build step ran: compress once here instead
+        if os.path.splitext(path)[1] in COMPRESSIBLE and len(body) >= MIN_COMPRESS:
+            if "gzip" not in variants:
+                data = gzip.compress(body, compresslevel=9, mtime=0)
+                variants["gzip"] = Variant(data, None, "gzip", strong_etag(data, "gzip"), len(data))
+            if "br" not in variants and brotli is not None:
+                data = brotli.compress(body)
+                variants["br"] = Variant(data, None, "br", strong_etag(data, "br"), len(data))
+        return variants
+
+    def load_cold(self, path: str, stat: os.stat_result, etags: Dict) -> Dict[Optional[str], Variant]:
+        """Large file: streamed from disk, only its ETags are computed (and cached by the caller)."""
+        variants = {}
+        for encoding, (variant_path, size) in self.disk_variants(path, stat).items():
+            key = (variant_path, stat.st_mtime_ns, size)
+            etag = etags.get(key) or file_etag(variant_path, encoding)
+            variants[encoding] = Variant(None, variant_path, encoding, etag, size)
+        return variants
+
+    async def variants(self, path: str) -> Dict[Optional[str], Variant]:
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self.hot.get(path)
+        if cached and cached[0] == version:
+            self.hot.move_to_end(path)
+            self.memory_hits += 1
+            return cached[1]
+
+        key = (path, version)
+        work = self.loading.get(key)
+        if work is None:
+            if stat.st_size <= MAX_MEMORY_FILE:
+                work = asyncio.ensure_future(asyncio.to_thread(self.load_hot, path, stat))
+            else:
+                work = asyncio.ensure_future(asyncio.to_thread(self.load_cold, path, stat, dict(self.etags)))
+            self.loading[key] = work
+            work.add_done_callback(lambda done: self.loaded(key, stat, done))
+        # Shielded: a client hanging up mid-load doesn't cancel it for everyone else
+        return await asyncio.shield(work)
+
+    def loaded(self, key: Tuple[str, Tuple[int, int]], stat: os.stat_result, work: asyncio.Future):
+        """Runs on the event loop once a worker thread has finished loading a file."""
+        del self.loading[key]
+        if work.cancelled() or work.exception() is not None:
+            return
+        path, version = key
+        variants = work.result()
+        if stat.st_size <= MAX_MEMORY_FILE:
+            self.remember(path, version, variants)
+        else:
+            for v in variants.values():
+                self.etags[(v.path, stat.st_mtime_ns, v.size)] = v.etag
+
+    def remember(self, path: str, version: Tuple[int, int], variants: Dict[Optional[str], Variant]):
+        old = self.hot.pop(path, None)
+        if old:
+            self.hot_bytes -= sum(v.size for v in old[1].values())
+        self.hot[path] = (version, variants)
+        self.hot_bytes += sum(v.size for v in variants.values())
+        while self.hot_bytes > self.memory_budget and len(self.hot) > 1:
+            _, (_, evicted) = self.hot.popitem(last=False)
+            self.hot_bytes -= sum(v.size for v in evicted.values())
+
+    # --- Serving ---
+
+    async def response(self, request: Request, rel_path: str, versioned: Optional[bool] = None) -> Response:
+        path = self.resolve(rel_path)
+        if path is None:
+            return Response("Not Found", status_code=404)
+        self.requests += 1
+
+        variants = await self.variants(path)
+        accepted = accepted_encodings(request)
+        chosen = variants[None]
+        for encoding in ("br", "gzip"):
+            if encoding in variants and encoding in accepted:
+                chosen = variants[encoding]
+                break
+
+        if versioned is None:
+            versioned = "v" in request.query_params
+        headers = {
+            "ETag": chosen.etag,
+            "Cache-Control": IMMUTABLE if versioned else REVALIDATE,
+            "Vary": "Accept-Encoding"
+        }
+        if chosen.encoding:
+            headers["Content-Encoding"] = chosen.encoding
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if chosen.etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.bytes_sent += chosen.size
+        self.bytes_saved += variants[None].size - chosen.size
+        if chosen.body is not None:
+            return Response(chosen.body, media_type=media_type, headers=headers)
+        # Large files stream from disk (with Range support for audio/images)
+        return FileResponse(chosen.path, media_type=media_type, headers=headers)
+
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "memory_hits": self.memory_hits,
+            "not_modified": self.not_modified,
+            "hot_files": len(self.hot),
+            "hot_bytes": self.hot_bytes,
+            "bytes_sent": self.bytes_sent,
+            "bytes_saved": self.bytes_saved,
+            "brotli": brotli is not None
+        }
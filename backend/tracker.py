@@ -1,8 +1,10 @@
-import time
 import math
 
+from .clock import Clock, WALL_CLOCK
+
 class Tracker:
-    def __init__(self):
+    def __init__(self, clock: Clock = WALL_CLOCK):
+        self.clock = clock
         # Dict: text_id -> { 'bbox': [], 'last_seen': float, 'center': (x,y) }
         self.targets = {}
         self.grace_period = 0.5 # Seconds to keep target "alive" after losing visual
@@ -16,7 +18,7 @@ class Tracker:
         Update tracker with new detections from CV.
         detections: List of dicts {'text': str, 'bbox': [[x,y]...]}
         """
-        now = time.time()
+        now = self.clock.time()
         
         # Mark all as not seen (we rely on timestamp to know if it's current)
         # We don't delete immediately, we let get_active handle the filtering
@@ -39,7 +41,7 @@ class Tracker:
                 
     def get_active_targets(self):
         """Returns list of targets that are currently visible or within grace period."""
-        now = time.time()
+        now = self.clock.time()
         active = []
         
         # Prune old targets
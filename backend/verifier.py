@@ -0,0 +1,254 @@
+import asyncio
+import json
+import os
+import time
+import urllib.request
+from typing import Callable, List, Dict, Optional, Tuple
+
+from solders.signature import Signature
+
+# ----- ENTRY VERIFIER -----
+# Ranked entry fees are verified by one background task that checks every
+# pending signature in a single batched status query, instead of each
+# confirm_match polling get_transaction on its own.
+#
+# Accepted signatures are kept on disk: the status query searches the whole
+# history, so an old ticket would otherwise pass again after a restart.
+
+USED_SIGNATURES_FILE = "used_entry_signatures.json"
+
+VERIFY_TIMEOUT = 40 # Seconds before an unseen transaction is rejected
+MIN_INTERVAL = 0.5 # Poll interval right after a new signature arrives
+MAX_INTERVAL = 4.0 # Poll interval once nothing has changed for a while
+BACKOFF = 1.5
+
+
+class JsonRpc:
+    """Minimal JSON-RPC over HTTP client with batch support (stdlib only)."""
+
+    def __init__(self, url: str, timeout: float = 10):
+        self.url = url
+        self.timeout = timeout
+        self.next_id = 0
+
+    async def call(self, method: str, params: list):
+        return (await self.batch([(method, params)]))[0]
+
+    async def batch(self, calls: List[Tuple[str, list]]) -> list:
+        payload = []
+        for method, params in calls:
+            self.next_id += 1
+            payload.append({"jsonrpc": "2.0", "id": self.next_id, "method": method, "params": params})
+        responses = await asyncio.to_thread(self.post, payload)
+
+        by_id = {r.get("id"): r for r in responses}
+        results = []
+        for req in payload:
+            resp = by_id.get(req["id"])
+            if resp is None or "error" in resp:
+                raise RuntimeError(f"RPC {req['method']} failed: {resp.get('error') if resp else 'no response'}")
+            results.append(resp.get("result"))
+        return results
+
+    def post(self, payload):
+        req = urllib.request.Request(
+            self.url,
+            data=json.dumps(payload).encode(),
+            headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            data = json.loads(resp.read())
+        return data if isinstance(data, list) else [data]
+
+
+def check_entry_transfer(tx: Dict, payer: str, house: str, entry_fee: int) -> bool:
+    """
+    Checks a getTransaction (json encoding) result really paid the entry fee:
+    no error, the house gained at least entry_fee and the payer lost at least that much.
+    """
+    if not tx:
+        return False
+    meta = tx.get("meta") or {}
+    if meta.get("err") is not None:
+        print("Transaction has errors")
+        return False
+
+    keys = tx["transaction"]["message"]["accountKeys"]
+    # v0 transactions can pull extra accounts from lookup tables
+    loaded = meta.get("loadedAddresses") or {}
+    keys = keys + loaded.get("writable", []) + loaded.get("readonly", [])
+
+    pre = meta.get("preBalances", [])
+    post = meta.get("postBalances", [])
+    if house not in keys or payer not in keys:
+        print("Transaction does not involve the house wallet and payer")
+        return False
+
+    house_idx = keys.index(house)
+    payer_idx = keys.index(payer)
+    received = post[house_idx] - pre[house_idx]
+    paid = pre[payer_idx] - post[payer_idx]
+    if received < entry_fee or paid < entry_fee:
+        print(f"Entry fee too low: house received {received}, payer paid {paid}, expected {entry_fee}")
+        return False
+    return True
+
+
+class EntryVerifier:
+    def __init__(self, rpc, house_key: str, entry_fee: int, timeout: float = VERIFY_TIMEOUT,
+                 min_interval: float = MIN_INTERVAL, max_interval: float = MAX_INTERVAL,
+                 path: Optional[str] = USED_SIGNATURES_FILE):
+        self.rpc = rpc
+        self.house_key = house_key
+        self.entry_fee = int(entry_fee)
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+
+        # signature -> {"payer": str, "future": Future, "deadline": float}
+        self.pending: Dict[str, Dict] = {}
+        self.path = path
+        self.used: Dict[str, str] = self.load() # Signature -> payer, already accepted (no reusing a ticket)
+        self.task: Optional[asyncio.Task] = None
+        self.wake = asyncio.Event()
+
+        # Called after an entry fee is accepted (e.g. to refresh the house balance)
+        self.on_settled: Optional[Callable[[], None]] = None
+
+    # --- Persistence ---
+
+    def load(self) -> Dict[str, str]:
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"[VERIFIER] Failed to read used signatures: {e}")
+        return {}
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.used, f)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"[VERIFIER] Failed to persist used signatures: {e}")
+
+    # --- Public API ---
+
+    async def verify(self, signature: str, payer: str, resume: bool = False) -> bool:
+        """
+        resume: the entry was waiting on this signature when the server went down
+        (see ConnectionManager.restore_state); if it was accepted just before, it
+        still counts for the same payer.
+        """
+        if resume and self.used.get(signature) == payer:
+            return True
+        if signature in self.used or signature in self.pending:
+            print(f"Signature {signature} already used or being verified")
+            return False
+        try:
+            Signature.from_string(signature)
+        except Exception:
+            # One bad signature would fail the whole batched status query
+            print(f"Rejecting malformed signature {signature!r}")
+            return False
+
+        print(f"Verifying transaction {signature}...")
+        future = asyncio.get_running_loop().create_future()
+        self.pending[signature] = {
+            "payer": payer,
+            "future": future,
+            "deadline": time.time() + self.timeout
+        }
+        self.interval = self.min_interval
+        self.start()
+        self.wake.set()
+        return await future
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while True:
+            if not self.pending:
+                self.wake.clear()
+                await self.wake.wait()
+
+            try:
+                changed = await self.check_pending()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Verifier RPC error: {e}")
+                changed = False
+            # Deadlines hold even while the RPC is failing
+            changed = self.expire_overdue(time.time()) or changed
+
+            # Adaptive backoff: poll quickly while things are moving, slow down otherwise
+            self.interval = self.min_interval if changed else min(self.max_interval, self.interval * BACKOFF)
+            self.wake.clear()
+            try:
+                await asyncio.wait_for(self.wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def check_pending(self) -> bool:
+        signatures = list(self.pending.keys())
+        if not signatures:
+            return False
+
+        result = await self.rpc.call("getSignatureStatuses", [signatures, {"searchTransactionHistory": True}])
+        statuses = result["value"]
+        changed = False
+        confirmed = []
+
+        for sig, status in zip(signatures, statuses):
+            if status is None or status.get("confirmationStatus") not in ("confirmed", "finalized"):
+                continue # Not seen yet; expire_overdue gives up on it at the deadline
+            if status.get("err") is not None:
+                print(f"Transaction {sig} failed on chain")
+                self.resolve(sig, False)
+                changed = True
+                continue
+            confirmed.append(sig)
+
+        if confirmed:
+            txs = await self.rpc.batch([
+                ("getTransaction", [sig, {"encoding": "json", "commitment": "confirmed", "maxSupportedTransactionVersion": 0}])
+                for sig in confirmed
+            ])
+            for sig, tx in zip(confirmed, txs):
+                if tx is None:
+                    continue # Status is in but the transaction isn't served yet, try next round (until the deadline)
+                ok = check_entry_transfer(tx, self.pending[sig]["payer"], self.house_key, self.entry_fee)
+                if ok:
+                    print(f"Transaction {sig} verified!")
+                self.resolve(sig, ok)
+                changed = True
+
+        return changed
+
+    def expire_overdue(self, now: float) -> bool:
+        overdue = [sig for sig, entry in self.pending.items() if now > entry["deadline"]]
+        for sig in overdue:
+            print(f"Verification timed out for {sig}.")
+            self.resolve(sig, False)
+        return bool(overdue)
+
+    def resolve(self, signature: str, valid: bool):
+        entry = self.pending.pop(signature, None)
+        if entry is None:
+            return
+        if valid:
+            self.used[signature] = entry["payer"]
+            self.save() # Before anyone is let in on it
+            if self.on_settled:
+                self.on_settled()
+        if not entry["future"].done():
+            entry["future"].set_result(valid)
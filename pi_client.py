@@ -1,4 +1,5 @@
 import asyncio
+import json
 import websockets
 import cv2
 import numpy as np
@@ -8,13 +9,20 @@ import ssl
 import subprocess
 import os
 import sys
+import threading
 import serial
 
+from serial_protocol import (
+    FrameParser, encode_command, decode_ack, ACK_SYNC, ACK_LEN, ACK_FLAG_FAILSAFE
+)
+
 # Configuration
 SERVER_URL = "ws://localhost:8000/ws/pi"
 #SERVER_URL = "wss://uottahack-8-327580bc1291.herokuapp.com/ws/pi"
+# Controls come in on their own socket so they never queue behind video frames
+CONTROL_URL = SERVER_URL + "-control"
 
-SERIAL_PORT = "/dev/ser1"
+SERIAL_PORT = os.environ.get("SERIAL_PORT", "/dev/ser1") # arduino_emulator.py prints a PTY path to use here
 BAUD_RATE = 115200
 
 # Camera Commands to try for QNX fallback
@@ -24,55 +32,245 @@ QNX_COMMANDS = [
     ["./camera_example3_viewfinder"]
 ]
 
+# Reconnect backoff (seconds). Camera and serial stay open between connections.
+RECONNECT_MIN = 0.5
+RECONNECT_MAX = 10.0
+
+# Sticks centered, triggers released, no buttons (what the Arduino sees as "stop")
+NEUTRAL_PACKET = bytes(8)
+
+# Serial link timing
+SERIAL_MIN_INTERVAL = 0.01 # Never write more often than this (coalesces bursts)
+SERIAL_KEEPALIVE = 0.2 # Resend the latest packet at least this often (Arduino failsafe is 500ms)
+SERIAL_STALE = 0.5 # No control message for this long: send neutral and stop the keepalive
+SERIAL_STATS_INTERVAL = 5.0
+
 # State for throttling
 latest_control_data = None
 current_ser = None
+serial_io = None # SerialLink while the port is open
 
-async def serial_transmitter():
-    global latest_control_data, current_ser
-    last_sent_data = None
-    print("Serial transmitter task started.")
-    
-    try:
+class SerialLink:
+    """
+    Dedicated serial I/O. The writer thread sleeps until new control data arrives
+    (or the keepalive is due), frames it with a sequence number and checksum, and
+    writes it. Keepalives only run while control messages keep arriving; if they
+    go quiet (e.g. a stalled websocket) the robot is sent neutral. The reader thread parses acks from the Arduino and measures
+    input-to-actuation latency per sequence number.
+    """
+    def __init__(self, ser, min_interval=SERIAL_MIN_INTERVAL, keepalive=SERIAL_KEEPALIVE, stale=SERIAL_STALE):
+        self.ser = ser
+        self.min_interval = min_interval
+        self.keepalive = keepalive
+        self.stale = stale
+        self.cond = threading.Condition()
+        self.packet = None
+        self.dirty = False
+        self.input_at = 0.0
+        self.received_at = 0.0 # Last update(), changed or not
+        self.stopped = False
+        self.seq = 0
+        self.sent_at = {} # seq -> (perf_counter at write, perf_counter when the input arrived)
+        self.parser = FrameParser(ACK_SYNC, ACK_LEN)
+        self.threads = []
+
+        # Telemetry
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.acks = 0
+        self.rtts = [] # ms, ack round trips since last stats()
+        self.input_lat = [] # ms, input arrival -> ack
+        self.failsafe = False
+        self.loop_us = 0
+
+    def start(self):
+        for target, name in ((self.writer_loop, "serial-tx"), (self.reader_loop, "serial-rx")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify()
+        for t in self.threads:
+            t.join(timeout=1.0)
+
+    def update(self, packet):
+        """Called from the event loop for every control packet; never blocks on I/O."""
+        with self.cond:
+            self.received_at = time.perf_counter()
+            if packet != self.packet:
+                self.packet = packet
+                self.dirty = True
+                self.input_at = time.perf_counter()
+                self.cond.notify()
+
+    def writer_loop(self):
+        last_write = 0.0
         while True:
-            if current_ser and current_ser.is_open:
-                # Send controls
-                if latest_control_data and latest_control_data != last_sent_data:
-                    try:
-                        def write_and_flush(data):
-                            current_ser.write(data)
-                            current_ser.flush()
-                        await asyncio.to_thread(write_and_flush, latest_control_data)
-                        last_sent_data = latest_control_data
-                    except Exception as e:
-                        print(f"Serial write error: {e}")
-            
-            # Run at ~50Hz (20ms)
-            await asyncio.sleep(0.02)
-    except asyncio.CancelledError:
-        print("Serial transmitter task stopping...")
+            with self.cond:
+                while not self.stopped and not self.dirty:
+                    now = time.perf_counter()
+                    if self.packet is not None and now - self.received_at >= self.stale:
+                        if self.packet != NEUTRAL_PACKET:
+                            # Commands stopped arriving: don't keep the last one alive
+                            self.packet = NEUTRAL_PACKET
+                            self.dirty = True
+                            self.input_at = now
+                            break
+                        self.cond.wait(timeout=self.keepalive) # Quiet until commands resume
+                        continue
+                    remaining = last_write + self.keepalive - now
+                    if remaining <= 0 and self.packet is not None:
+                        break # Keepalive due
+                    if self.packet is not None:
+                        remaining = min(remaining, self.received_at + self.stale - now)
+                    self.cond.wait(timeout=remaining if remaining > 0 else self.keepalive)
+                if self.stopped:
+                    return
 
-async def receive_controls(websocket):
-    global latest_control_data, current_ser
-    print("Listening for controls...")
-    
+            # Respect the minimum interval; whatever is latest when we wake gets sent
+            wait = last_write + self.min_interval - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+
+            with self.cond:
+                packet = self.packet
+                input_at = self.input_at if self.dirty else None
+                self.dirty = False
+                self.seq = (self.seq + 1) & 0xFF
+                seq = self.seq
+
+            try:
+                now = time.perf_counter()
+                # Record before writing: the ack can beat us back from ser.write()
+                self.sent_at[seq] = (now, input_at)
+                self.ser.write(encode_command(seq, packet))
+                self.ser.flush()
+                last_write = now
+                self.writes += 1
+            except Exception as e:
+                print(f"Serial write error: {e}")
+                time.sleep(0.5)
+
+    def reader_loop(self):
+        while not self.stopped:
+            try:
+                # Block for the first byte (up to the port timeout), then take whatever is buffered
+                data = self.ser.read(max(1, self.ser.in_waiting))
+            except Exception as e:
+                print(f"Serial read error: {e}")
+                time.sleep(0.5)
+                continue
+            if not data:
+                continue
+            now = time.perf_counter()
+            for frame in self.parser.feed(data):
+                seq, flags, loop_us = decode_ack(frame)
+                sent = self.sent_at.pop(seq, None)
+                with self.lock:
+                    self.acks += 1
+                    self.failsafe = bool(flags & ACK_FLAG_FAILSAFE)
+                    self.loop_us = loop_us
+                    if sent:
+                        self.rtts.append((now - sent[0]) * 1000)
+                        if sent[1] is not None:
+                            self.input_lat.append((now - sent[1]) * 1000)
+
+    def stats(self):
+        with self.lock:
+            rtts, self.rtts = sorted(self.rtts), []
+            lat, self.input_lat = sorted(self.input_lat), []
+            out = {
+                "writes": self.writes,
+                "acks": self.acks,
+                "crc_errors": self.parser.errors,
+                "ack_p50_ms": rtts[len(rtts) // 2] if rtts else None,
+                "ack_max_ms": rtts[-1] if rtts else None,
+                "input_p50_ms": lat[len(lat) // 2] if lat else None,
+                "failsafe": self.failsafe,
+                "loop_us": self.loop_us
+            }
+        return out
+
+def set_controls(packet):
+    global latest_control_data
+    latest_control_data = packet
+    if serial_io:
+        serial_io.update(packet)
+
+def open_serial():
+    """Blocking: opens the Arduino link once for the life of the process."""
+    global current_ser
     try:
         # Open serial with settings to prevent Arduino auto-reset
-        current_ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=0)
-        current_ser.setDTR(False) 
+        ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=0.05)
+        ser.setDTR(False) 
         print(f"Serial port {SERIAL_PORT} opened. Waiting for Arduino boot...")
-        await asyncio.sleep(1.5) # Allow Arduino to initialize
-        current_ser.reset_input_buffer()
-        current_ser.reset_output_buffer()
+        time.sleep(1.5) # Allow Arduino to initialize
+        ser.reset_input_buffer()
+        ser.reset_output_buffer()
+        current_ser = ser
         print("Serial ready.")
     except Exception as e:
         print(f"Failed to open serial port: {e}")
         current_ser = None
 
+def go_neutral():
+    if latest_control_data != NEUTRAL_PACKET:
+        print("\nRobot -> neutral (no server connection)")
+    set_controls(NEUTRAL_PACKET)
+
+async def serial_link():
+    """Owns the serial port and its I/O threads across websocket reconnects."""
+    global serial_io
+    await asyncio.to_thread(open_serial)
+    if not current_ser:
+        return
+
+    link = SerialLink(current_ser)
+    link.start()
+    serial_io = link
+    if latest_control_data:
+        link.update(latest_control_data)
+    print("Serial link started.")
+    try:
+        while True:
+            await asyncio.sleep(SERIAL_STATS_INTERVAL)
+            st = link.stats()
+            print(f"\n[SERIAL] writes={st['writes']} acks={st['acks']} crc_err={st['crc_errors']} "
+                  f"ack_p50={st['ack_p50_ms']} input_p50={st['input_p50_ms']} failsafe={st['failsafe']}")
+    except asyncio.CancelledError:
+        print("Serial link stopping...")
+    finally:
+        serial_io = None
+        await asyncio.to_thread(link.stop)
+        current_ser.close()
+
+async def receive_controls(websocket):
+    """Handles server -> Pi traffic on either socket (controls, pings, video feedback)."""
+    print("Listening for controls...")
+
     last_print_time = 0
     try:
         while True:
             data = await websocket.recv()
+            if isinstance(data, str):
+                # Server -> Pi JSON (video feedback etc.)
+                try:
+                    msg = json.loads(data)
+                except ValueError:
+                    continue
+                if msg.get("type") == "ping":
+                    # Echo straight back so the server can time this socket
+                    await websocket.send(json.dumps({"type": "pong", "t": msg.get("t")}))
+                elif msg.get("type") == "video_feedback":
+                    abr.on_feedback(msg)
+                elif msg.get("type") in ("stream_mode", "keyframe"):
+                    demand.on_message(msg)
+                continue
+
             if isinstance(data, bytes) and len(data) == 8:
                 # 1. Unpack browser data (Unsigned 8 bytes)
                 # Browser format: [UX, UY, RX, RY, LT, RT, B_LOW, B_HIGH]
@@ -94,8 +292,8 @@ async def receive_controls(websocket):
                 # 3. Re-pack in Big Endian Signed format (>bbbbbbH)
                 new_packet = struct.pack(">bbbbbbH", lx, ly, rx, ry, lt, rt, raw_btns)
                 
-                # Update global state for transmitter task
-                latest_control_data = new_packet
+                # Wake the serial writer
+                set_controls(new_packet)
                 
                 # Throttle printing to 10Hz
                 current_time = time.time()
@@ -107,212 +305,810 @@ async def receive_controls(websocket):
         print("\nConnection closed (Receive)")
     except Exception as e:
         print(f"\nError in receive_controls: {e}")
-    finally:
-        if current_ser:
-            current_ser.close()
-
-async def send_video(websocket):
-    print("Starting Video Stream Initialization...")
-    
-    # --- METHOD 1: OpenCV Standard ---
-    cap = cv2.VideoCapture(0)
-    # Check if opened successfully
-    if cap.isOpened():
+
+# ----- VIDEO PIPELINE -----
+# capture thread -> [latest slot] -> encode thread -> [latest slot] -> websocket send
+# Each hand-off holds one item and a newer frame replaces an older one, so a
+# slow uplink drops stale frames instead of queueing latency, and neither
+# capture nor JPEG encoding ever runs on the event loop.
+
+JPEG_QUALITY = 50
+MAX_WIDTH = 640
+STATS_INTERVAL = 5.0 # Seconds between pipeline reports
+
+# Frame header: [timestamp <d][ext_len B][seq, quality, fps, width, height, tier][JPEG]
+# (see backend/frames.py on the server)
+FRAME_SETTINGS = struct.Struct('<IBBHHB')
+
+# Simulcast: alongside the full stream (player + CV) we can encode a small,
+# low-rate tier that the server hands to spectators. Set SIMULCAST=0 to turn it off.
+SIMULCAST = os.environ.get("SIMULCAST", "1") != "0"
+TIER_HIGH, TIER_LOW = 0, 1
+LOW_WIDTH = 320
+LOW_FPS = 10
+LOW_QUALITY = 35
+
+# Adaptive bitrate bounds. The server sends video_feedback about once a second
+# and the controller trades quality, then resolution, then frame rate to keep
+# the relay under the latency target.
+LATENCY_TARGET_MS = 150
+DROP_RATE_TARGET = 0.2 # Fraction of frames spectators are skipping
+QUALITY_MIN, QUALITY_MAX, QUALITY_STEP = 25, 70, 10
+WIDTHS = [640, 480, 320] # Largest first
+FPS_MIN, FPS_MAX, FPS_STEP = 10, 30, 5
+UPGRADE_AFTER = 3 # Consecutive healthy reports before stepping back up
+
+class LatestSlot:
+    """One-slot hand-off between stages. put() replaces whatever is still waiting."""
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.item = None
+        self.dropped = 0
+        self.closed = False
+        self.loop = None
+        self.event = None
+
+    def bind_loop(self, loop):
+        # Lets the asyncio side wait without a thread hop per frame
+        self.loop = loop
+        self.event = asyncio.Event()
+
+    def put(self, item):
+        """Returns the item that was replaced (so its buffer can be recycled), or None."""
+        with self.cond:
+            replaced = self.item
+            if replaced is not None:
+                self.dropped += 1
+            self.item = item
+            self.cond.notify()
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.event.set)
+        return replaced
+
+    def take(self):
+        with self.cond:
+            item, self.item = self.item, None
+            return item
+
+    def get(self, timeout=None):
+        """Blocking get for worker threads. Returns None on timeout or once closed."""
+        with self.cond:
+            if self.item is None and not self.closed:
+                self.cond.wait(timeout)
+            item, self.item = self.item, None
+            return item
+
+    async def get_async(self):
+        """Returns None once the slot is closed and drained."""
+        while True:
+            item = self.take()
+            if item is not None or self.closed:
+                return item
+            self.event.clear()
+            item = self.take()
+            if item is not None or self.closed:
+                return item
+            await self.event.wait()
+
+    def close(self):
+        # Wakes any waiting consumer so shutdown doesn't sit out a timeout
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.event.set)
+
+class AdaptiveController:
+    """Picks JPEG quality / width / fps from server feedback, within the bounds above."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.quality = JPEG_QUALITY
+        self.width = MAX_WIDTH
+        self.fps = FPS_MAX
+        self.healthy = 0
+        self.send_ms = 0.0 # Our own websocket.send time (EWMA)
+        self.low_clients = None # Spectators on the low tier (None until the server tells us)
+
+    def settings(self):
+        with self.lock:
+            return self.quality, self.width, self.fps
+
+    def record_send(self, ms):
+        self.send_ms += 0.2 * (ms - self.send_ms)
+
+    def wants_low(self):
+        # Skip the spectator tier when nobody would receive it
+        return SIMULCAST and (self.low_clients is None or self.low_clients > 0)
+
+    def on_feedback(self, fb):
+        self.low_clients = fb.get("low_clients")
+        latency = max(fb.get("backlog_ms", 0), self.send_ms)
+        drop_rate = fb.get("drop_rate", 0)
+        with self.lock:
+            before = (self.quality, self.width, self.fps)
+            if latency > LATENCY_TARGET_MS or drop_rate > DROP_RATE_TARGET:
+                self.healthy = 0
+                self.step_down()
+            elif latency < LATENCY_TARGET_MS / 2 and drop_rate < DROP_RATE_TARGET / 2:
+                self.healthy += 1
+                if self.healthy >= UPGRADE_AFTER:
+                    self.healthy = 0
+                    self.step_up()
+            if (self.quality, self.width, self.fps) != before:
+                print(f"\n[ABR] latency={latency:.0f}ms drops={drop_rate:.0%} -> q{self.quality} {self.width}w {self.fps}fps")
+
+    def step_down(self):
+        # Cheapest visual loss first: quality, then resolution, then frame rate
+        if self.quality > QUALITY_MIN:
+            self.quality = max(QUALITY_MIN, self.quality - QUALITY_STEP)
+        elif self.width != WIDTHS[-1]:
+            self.width = WIDTHS[WIDTHS.index(self.width) + 1]
+        elif self.fps > FPS_MIN:
+            self.fps = max(FPS_MIN, self.fps - FPS_STEP)
+
+    def step_up(self):
+        if self.fps < FPS_MAX:
+            self.fps = min(FPS_MAX, self.fps + FPS_STEP)
+        elif self.width != WIDTHS[0]:
+            self.width = WIDTHS[WIDTHS.index(self.width) - 1]
+        elif self.quality < QUALITY_MAX:
+            self.quality = min(QUALITY_MAX, self.quality + QUALITY_STEP)
+
+# Shared by the video pipeline (reads settings) and receive_controls (feeds it)
+abr = AdaptiveController()
+
+class StreamDemand:
+    """
+    How much video the server wants (see backend/demand.py): full, reduced,
+    keyframe (a frame every few seconds or on request) or paused. Capture keeps
+    running in every mode, so a resume or keyframe request is served by the
+    next captured frame.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.mode = "full" # Until a server says otherwise
+        self.max_fps = None
+        self.interval = None
+        self.keyframe = False
+
+    def on_message(self, msg):
+        with self.lock:
+            if msg.get("type") == "keyframe":
+                self.keyframe = True
+                return
+            mode = msg.get("mode", "full")
+            if mode == self.mode and msg.get("max_fps") == self.max_fps:
+                return
+            if self.mode == "paused" and mode != "paused":
+                self.keyframe = True # First viewer shouldn't wait for the schedule
+            self.mode = mode
+            self.max_fps = msg.get("max_fps")
+            self.interval = msg.get("interval")
+        print(f"\n[DEMAND] Stream mode -> {mode}")
+
+    def plan(self, fps):
+        """Returns (force, fps) for the next frame. force skips the schedule, fps None means don't encode."""
+        with self.lock:
+            force, self.keyframe = self.keyframe, False
+            if self.mode == "paused":
+                return force, None
+            if self.mode == "keyframe":
+                return force, 1.0 / (self.interval or 5.0)
+            if self.mode == "reduced" and self.max_fps:
+                return force, min(fps, self.max_fps)
+            return force, fps
+
+# Fed by receive_controls, read by the encode stage
+demand = StreamDemand()
+
+QNX_HEADER = struct.Struct('<dIIII') # timestamp, size, width, height, format
+FRAME_POOL_SIZE = 4 # Reading + waiting in the slot + encoding, plus one spare
+
+class FramePool:
+    """
+    Preallocated payload buffers for the QNX reader. Sized from the frame header
+    (reallocated only if the camera changes size). Buffers go back to the pool
+    once the encode stage is done with them, or when the slot drops them.
+    """
+    def __init__(self, count=FRAME_POOL_SIZE):
+        self.count = count
+        self.lock = threading.Lock()
+        self.size = 0
+        self.free = []
+        self.extra_allocs = 0 # Pool ran dry (encode is holding on to too many)
+
+    def acquire(self, size):
+        with self.lock:
+            if size != self.size:
+                self.size = size
+                self.free = [bytearray(size) for _ in range(self.count)]
+            if self.free:
+                return self.free.pop()
+            self.extra_allocs += 1
+        return bytearray(size)
+
+    def release(self, buf):
+        with self.lock:
+            # Ignore a second release, or the buffer would go out to two frames at once
+            if any(b is buf for b in self.free):
+                return
+            if len(buf) == self.size and len(self.free) < self.count:
+                self.free.append(buf)
+
+def read_exact(stream, view):
+    """readinto until view is full. Returns False on EOF."""
+    got = 0
+    total = len(view)
+    while got < total:
+        n = stream.readinto(view[got:])
+        if not n:
+            return False
+        got += n
+    return True
+
+class StageStats:
+    """Frames per second and average time spent for one pipeline stage."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.frames = 0
+        self.busy = 0.0
+        self.since = time.time()
+
+    def record(self, seconds):
+        with self.lock:
+            self.frames += 1
+            self.busy += seconds
+
+    def collect(self):
+        """Returns (fps, avg_ms) since the last collect and resets."""
+        with self.lock:
+            now = time.time()
+            elapsed = max(1e-6, now - self.since)
+            fps = self.frames / elapsed
+            avg_ms = (self.busy / self.frames * 1000) if self.frames else 0.0
+            self.frames = 0
+            self.busy = 0.0
+            self.since = now
+            return fps, avg_ms
+
+def noise_frame(label):
+    frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+    cv2.putText(frame, label, (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+    return frame
+
+def fit_640x480(frame):
+    if frame.shape[1] != 640 or frame.shape[0] != 480:
+        frame = cv2.resize(frame, (640, 480))
+    return frame
+
+# QNX camera frame types we know how to convert
+FMT_NV12 = 1 # CAMERA_FRAMETYPE_NV12
+FMT_RGBA = 2 # CAMERA_FRAMETYPE_RGB8888 (Actually probably BGR or BGRA)
+FMT_RGB = 3 # CAMERA_FRAMETYPE_RGB888
+FMT_BGRA = 31 # CAMERA_FRAMETYPE_BGR8888
+
+class FrameConverter:
+    """
+    Raw camera buffer -> BGR frame at the target width, for one
+    (fmt, width, height, target width) combination. Downscales in the native
+    format first (Y + UV planes for NV12, strided subsampling for RGBA/BGRA)
+    so color conversion only touches the pixels we keep. Built once per
+    stream/size and reuses its buffers every frame.
+    """
+    def __init__(self, fmt, width, height, target_width):
+        self.fmt = fmt
+        self.width = width
+        self.height = height
+
+        # Output size (even, so NV12 chroma planes divide cleanly)
+        tw = min(width, target_width)
+        th = int(height * tw / width)
+        self.out_w = tw - tw % 2
+        self.out_h = th - th % 2
+        self.scaled = (self.out_w, self.out_h) != (width, height)
+        k = width // self.out_w
+        self.step = k if self.scaled and width == self.out_w * k and height == self.out_h * k else 0
+
+        handlers = {
+            FMT_NV12: (self.convert_nv12, width * height * 3 // 2),
+            FMT_RGBA: (lambda view: self.convert_4ch(view, cv2.COLOR_RGBA2BGR), width * height * 4),
+            FMT_RGB: (self.convert_rgb, width * height * 3),
+            FMT_BGRA: (lambda view: self.convert_4ch(view, cv2.COLOR_BGRA2BGR), width * height * 4),
+        }
+        self.handler, self.expected_size = handlers.get(fmt, (None, 0))
+
+        # Integer factor -> nearest neighbour is plain subsampling, otherwise bilinear
+        self.interp = cv2.INTER_NEAREST if self.step else cv2.INTER_LINEAR
+
+        # Preallocated per-stream buffers
+        self.bgr = np.empty((self.out_h, self.out_w, 3), dtype=np.uint8)
+        if self.scaled:
+            if fmt == FMT_NV12:
+                self.nv12 = np.empty((self.out_h * 3 // 2, self.out_w), dtype=np.uint8)
+                self.y_small = self.nv12[:self.out_h]
+                self.uv_small = self.nv12[self.out_h:].reshape((self.out_h // 2, self.out_w // 2, 2))
+            elif fmt in (FMT_RGBA, FMT_BGRA):
+                self.small = np.empty((self.out_h, self.out_w, 4), dtype=np.uint8)
+
+    def __call__(self, payload, size):
+        if self.handler is None:
+            print(f"Unknown/Unsupported format: {self.fmt}. Playing noise.")
+            return None
+        if size != self.expected_size:
+            print(f"Format {self.fmt} size mismatch. Exp {self.expected_size}, Got {size}")
+            return None
+        return self.handler(np.frombuffer(payload, dtype=np.uint8, count=size))
+
+    def shrink(self, plane, dst):
+        return cv2.resize(plane, (dst.shape[1], dst.shape[0]), dst=dst, interpolation=self.interp)
+
+    def convert_nv12(self, view):
+        # NV12 is YUV420sp (Y + interleaved UV)
+        yuv = view.reshape((self.height * 3 // 2, self.width))
+        if not self.scaled:
+            return cv2.cvtColor(yuv, cv2.COLOR_YUV2BGR_NV12, dst=self.bgr)
+        y = yuv[:self.height]
+        uv = yuv[self.height:].reshape((self.height // 2, self.width // 2, 2))
+        self.shrink(y, self.y_small)
+        self.shrink(uv, self.uv_small)
+        return cv2.cvtColor(self.nv12, cv2.COLOR_YUV2BGR_NV12, dst=self.bgr)
+
+    def convert_4ch(self, view, code):
+        raw = view.reshape((self.height, self.width, 4))
+        if self.scaled:
+            raw = self.shrink(raw, self.small)
+        return cv2.cvtColor(raw, code, dst=self.bgr)
+
+    def convert_rgb(self, view):
+        raw = view.reshape((self.height, self.width, 3)) # Assume RGB/BGR matches
+        if self.scaled:
+            return self.shrink(raw, self.bgr)
+        return raw
+
+def convert_qnx_frame(converters, payload_data, size, width, height, fmt, target_width):
+    """Looks up (or builds) the converter for this stream and runs it, with noise on failure."""
+    converter = converters.get((fmt, width, height, target_width))
+    if converter is None:
+        # New stream (or size): build converters for every ABR width up front
+        for w in set(WIDTHS + [target_width]):
+            converters[(fmt, width, height, w)] = FrameConverter(fmt, width, height, w)
+        converter = converters[(fmt, width, height, target_width)]
+
+    frame = converter(payload_data, size)
+    if frame is None:
+        # Fallback noise
+        frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+        cv2.putText(frame, f"fmt={fmt}", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+    return frame
+
+def schedule(now, next_due, fps):
+    """
+    Frame rate cap: keeps a schedule (with a quarter-frame of slack for capture
+    jitter). Returns the next due time if this frame should be encoded, else None.
+    """
+    interval = 1.0 / fps
+    if now < next_due - interval / 4:
+        return None
+    return max(next_due, now - interval) + interval
+
+class VideoPipeline:
+    def __init__(self):
+        self.captured = LatestSlot() # (timestamp_ms, frame, convert)
+        self.encoded = LatestSlot() # packets ready to send (one per tier, same source frame)
+        self.stats = {"capture": StageStats(), "encode": StageStats(), "send": StageStats()}
+        self.stop_event = threading.Event()
+        self.streaming = threading.Event() # Set while a server connection is consuming frames
+        self.threads = []
+        self.process = None
+        self.abr = abr
+        self.demand = demand
+        self.seq = 0
+        self.converters = {} # (fmt, width, height, target width) -> FrameConverter
+
+    def start(self, loop):
+        self.encoded.bind_loop(loop)
+        for target, name in ((self.capture_loop, "capture"), (self.encode_loop, "encode")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def stop(self):
+        self.stop_event.set()
+        self.captured.close()
+        self.encoded.close()
+        self.stop_process()
+        for t in self.threads:
+            t.join(timeout=2.0)
+        self.threads = []
+
+    # --- Capture stage (own thread) ---
+
+    def capture_loop(self):
+        print("Starting Video Stream Initialization...")
+        for source in (self.capture_opencv, self.capture_qnx, self.capture_noise):
+            if self.stop_event.is_set():
+                return
+            try:
+                source()
+            except Exception as e:
+                print(f"Capture Error ({source.__name__}): {e}")
+
+    def emit(self, t0, frame, convert=None, release=None):
+        # Timestamp at capture (Epoch ms) so the browser sees glass-to-glass latency
+        replaced = self.captured.put((time.time() * 1000.0, frame, convert, release))
+        if replaced and replaced[3]:
+            replaced[3]() # Dropped before encoding, recycle its buffer
+        self.stats["capture"].record(time.perf_counter() - t0)
+
+    def capture_opencv(self):
+        # --- METHOD 1: OpenCV Standard ---
+        cap = cv2.VideoCapture(0)
+        if not cap.isOpened():
+            print("-> OpenCV capture failed to open.")
+            return
         print("-> Using OpenCV Camera (Method 1)")
         try:
-            while True:
+            while not self.stop_event.is_set():
+                t0 = time.perf_counter()
                 ret, frame = cap.read()
                 if not ret:
                     print("OpenCV stream ended.")
                     break
-                
-                # Resize if needed to 640x480 to match everything else
-                if frame.shape[1] != 640 or frame.shape[0] != 480:
-                    frame = cv2.resize(frame, (640, 480))
-
-                # Compress to JPEG
-                _, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 50])
-                
-                # Timestamp (ms, double)
-                timestamp = time.time() * 1000
-                packed_time = struct.pack('<d', timestamp)
-                
-                await websocket.send(packed_time + buffer.tobytes())
-                await asyncio.sleep(0.001) # Yield slightly
-        except Exception as e:
-            print(f"OpenCV Error: {e}")
+                # Resize to 640x480 to match everything else (done in the encode stage)
+                self.emit(t0, None, lambda target, f=frame: fit_640x480(f))
         finally:
             cap.release()
             print("OpenCV released. Attempting fallback...")
-    else:
-        print("-> OpenCV capture failed to open.")
-
-    # --- METHOD 2: QNX Native Subprocess ---
-    print("-> Trying QNX Native Fallback (Method 2)")
-    cmd = None
-    for c in QNX_COMMANDS:
-        if os.path.exists(c[0]):
-            cmd = c
-            break
-            
-    if cmd:
+
+    def capture_qnx(self):
+        # --- METHOD 2: QNX Native Subprocess ---
+        print("-> Trying QNX Native Fallback (Method 2)")
+        cmd = None
+        for c in QNX_COMMANDS:
+            if os.path.exists(c[0]):
+                cmd = c
+                break
+        if not cmd:
+            print("-> No QNX binary found.")
+            return
+
         print(f"-> Found binary: {cmd[0]}")
-        process = None
         try:
             # Start C process
-            process = subprocess.Popen(
+            self.process = subprocess.Popen(
                 cmd,
                 stdout=subprocess.PIPE,
                 stderr=sys.stderr, # Pass stderr through to console
                 bufsize=0 # Unbuffered
             )
+            stdout = self.process.stdout
+            pool = FramePool()
+            header = bytearray(QNX_HEADER.size)
+            header_view = memoryview(header)
             
-            while True:
+            while not self.stop_event.is_set():
+                t0 = time.perf_counter()
                 # Read Header (24 bytes)
                 # double timestamp (8), uint32 size (4), uint32 width (4), uint32 height (4), uint32 format (4)
-                header_data = await asyncio.to_thread(process.stdout.read, 24)
-                if not header_data or len(header_data) != 24:
+                if not read_exact(stdout, header_view):
                     print("End of stream or error reading header. (Process exited?)")
                     break
                     
-                timestamp_s, size, width, height, fmt = struct.unpack('<dIIII', header_data)
+                timestamp_s, size, width, height, fmt = QNX_HEADER.unpack_from(header)
                 
                 # Validation
                 if size == 0 or width == 0 or height == 0:
                     print(f"Invalid frame header: size={size} {width}x{height}")
                     continue
 
-                # Read Payload
-                payload_data = await asyncio.to_thread(process.stdout.read, size)
-                if not payload_data or len(payload_data) != size:
-                    print(f"Incomplete frame payload. Expected {size}, got {len(payload_data) if payload_data else 0}")
+                # Read Payload straight into a pooled buffer (no per-frame allocation)
+                buf = pool.acquire(size)
+                if not read_exact(stdout, memoryview(buf)):
+                    print(f"Incomplete frame payload. Expected {size}")
                     break
-                
-                # Convert to numpy array
-                frame = None
-                
-                # Format 1: CAMERA_FRAMETYPE_NV12
-                if fmt == 1: 
-                    # NV12 is YUV420sp (Y + interleaved UV)
-                    # Total size should be width * height * 1.5
-                    expected_size = int(width * height * 1.5)
-                    if size == expected_size:
-                         yuv = np.frombuffer(payload_data, dtype=np.uint8)
-                         yuv = yuv.reshape((int(height * 1.5), width))
-                         frame = cv2.cvtColor(yuv, cv2.COLOR_YUV2BGR_NV12)
-                    else:
-                        print(f"NV12 Size mismatch. Exp {expected_size}, Got {size}")
-                        
-                # Format 2: CAMERA_FRAMETYPE_RGB8888 (Actually probably BGR or BGRA)
-                elif fmt == 2:
-                     expected_size = width * height * 4
-                     if size == expected_size:
-                         raw = np.frombuffer(payload_data, dtype=np.uint8)
-                         raw = raw.reshape((height, width, 4))
-                         frame = cv2.cvtColor(raw, cv2.COLOR_RGBA2BGR)
-                     else:
-                        print(f"RGB8888 Size mismatch. Exp {expected_size}, Got {size}")
-
-                # Format 3: CAMERA_FRAMETYPE_RGB888
-                elif fmt == 3:
-                     expected_size = width * height * 3
-                     if size == expected_size:
-                         raw = np.frombuffer(payload_data, dtype=np.uint8)
-                         raw = raw.reshape((height, width, 3))
-                         frame = raw # Assume RGB/BGR matches
-                     else:
-                        print(f"RGB888 Size mismatch. Exp {expected_size}, Got {size}")
-
-                # Format 31: CAMERA_FRAMETYPE_BGR8888
-                elif fmt == 31:
-                     expected_size = width * height * 4
-                     if size == expected_size:
-                         raw = np.frombuffer(payload_data, dtype=np.uint8)
-                         raw = raw.reshape((height, width, 4))
-                         frame = cv2.cvtColor(raw, cv2.COLOR_BGRA2BGR)
-                     else:
-                        print(f"BGR8888 Size mismatch. Exp {expected_size}, Got {size}")
-
-                else:
-                    print(f"Unknown/Unsupported format: {fmt}. Playing noise.")
-                
-                if frame is None:
-                    # Fallback noise
-                    frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
-                    cv2.putText(frame, f"fmt={fmt}", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-
-                # Resize BEFORE compression if too large
-                if frame.shape[1] > 640:
-                    scale_ratio = 640.0 / frame.shape[1]
-                    new_height = int(frame.shape[0] * scale_ratio)
-                    frame = cv2.resize(frame, (640, new_height))
-
-                # Compress and Send
-                _, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 50])
-                
-                # Use current system time for latency calculation (Epoch ms)
-                # The camera timestamp is likely monotonic and not comparable to browser Date.now()
-                timestamp = time.time() * 1000.0
-                packed_time = struct.pack('<d', timestamp)
-                
-                await websocket.send(packed_time + buffer.tobytes())
-                
-        except asyncio.CancelledError:
-             print("Video stream task cancelled.")
-        except Exception as e:
-            print(f"QNX Subprocess Error: {e}")
+
+                # Conversion + downscale happen in the encode stage (on a NumPy view of buf)
+                self.emit(
+                    t0, None,
+                    lambda target, b=buf, s=size, w=width, h=height, f=fmt: convert_qnx_frame(self.converters, b, s, w, h, f, target),
+                    lambda b=buf: pool.release(b)
+                )
         finally:
-            if process:
-                print("Terminating QNX camera process...")
-                process.terminate()
-                try:
-                    # Give it a second to die gracefully
-                    process.wait(timeout=1.0)
-                except subprocess.TimeoutExpired:
-                    print("Force killing QNX camera process...")
-                    process.kill()
-                    process.wait()
-    else:
-        print("-> No QNX binary found.")
-
-    # --- METHOD 3: Generated Noise ---
-    print("-> All methods failed. Streaming Noise (Method 3)")
-    try:
-        while True:
-            # Generate random noise
-            frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
-            # Add Overlay
-            cv2.putText(frame, "NO SIGNAL", (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+            self.stop_process()
+
+    def stop_process(self):
+        process, self.process = self.process, None
+        if process:
+            print("Terminating QNX camera process...")
+            process.terminate()
+            try:
+                # Give it a second to die gracefully
+                process.wait(timeout=1.0)
+            except subprocess.TimeoutExpired:
+                print("Force killing QNX camera process...")
+                process.kill()
+                process.wait()
+
+    def capture_noise(self):
+        # --- METHOD 3: Generated Noise ---
+        print("-> All methods failed. Streaming Noise (Method 3)")
+        while not self.stop_event.is_set():
+            t0 = time.perf_counter()
+            frame = noise_frame("NO SIGNAL")
             current_time = f"{time.time():.1f}"
             cv2.putText(frame, current_time, (50, 290), cv2.FONT_HERSHEY_SIMPLEX, 1, (200, 200, 200), 2)
-            
-            _, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 50])
-            timestamp = time.time() * 1000
-            packed_time = struct.pack('<d', timestamp)
-            await websocket.send(packed_time + buffer.tobytes())
-            
+            self.emit(t0, frame)
             # Limit to ~30 FPS
-            await asyncio.sleep(0.033) 
+            time.sleep(0.033)
+
+    # --- Encode stage (own thread) ---
+
+    def encode_loop(self):
+        next_due = 0.0
+        next_low = 0.0
+        while not self.stop_event.is_set():
+            item = self.captured.get(timeout=0.5)
+            if item is None:
+                continue
+            quality, max_width, fps = self.abr.settings()
+
+            timestamp, frame, convert, release = item
+
+            # Camera stays warm while disconnected, but don't spend CPU encoding
+            if not self.streaming.is_set():
+                if release:
+                    release()
+                continue
+
+            # Each tier keeps its own frame rate schedule, within what the server asked for
+            force, fps = self.demand.plan(fps)
+            now = time.time()
+            if fps is None and not force:
+                if release:
+                    release()
+                continue
+            fps = fps or FPS_MAX
+            if force:
+                # Keyframe request / resume: this frame goes out on both tiers and restarts the schedule
+                high_due = schedule(now, 0.0, fps)
+                low_due = schedule(now, 0.0, LOW_FPS) if self.abr.wants_low() else None
+            else:
+                high_due = schedule(now, next_due, fps)
+                low_due = schedule(now, next_low, min(LOW_FPS, fps)) if self.abr.wants_low() else None
+            if high_due is None and low_due is None:
+                if release:
+                    release()
+                continue
+            next_due = high_due or next_due
+            next_low = low_due or next_low
+
+            t0 = time.perf_counter()
+            packets = []
+            self.seq = (self.seq + 1) & 0xFFFFFFFF
+            try:
+                if convert:
+                    frame = convert(max_width if high_due else LOW_WIDTH)
+
+                if high_due:
+                    # Resize BEFORE compression if too large
+                    if frame.shape[1] > max_width:
+                        scale_ratio = max_width / frame.shape[1]
+                        frame = cv2.resize(frame, (max_width, int(frame.shape[0] * scale_ratio)))
+                    packets.append(self.encode(frame, timestamp, quality, fps, TIER_HIGH))
+
+                if low_due:
+                    # Spectator tier comes from the same capture (same seq and timestamp)
+                    if frame.shape[1] > LOW_WIDTH:
+                        frame = cv2.resize(frame, (LOW_WIDTH, frame.shape[0] * LOW_WIDTH // frame.shape[1]), interpolation=cv2.INTER_AREA)
+                    packets.append(self.encode(frame, timestamp, LOW_QUALITY, LOW_FPS, TIER_LOW))
+            except Exception as e:
+                print(f"Encode Error: {e}")
+                continue
+            finally:
+                # RGB888 frames are views on the pooled buffer, so release only after encoding
+                if release:
+                    release()
+
+            self.encoded.put(packets)
+            self.stats["encode"].record(time.perf_counter() - t0)
+
+    def encode(self, frame, timestamp, quality, fps, tier):
+        # Compress to JPEG
+        _, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        # Timestamp (ms, double) + the settings this frame was encoded with
+        settings = FRAME_SETTINGS.pack(self.seq, quality, int(round(fps)), frame.shape[1], frame.shape[0], tier)
+        header = struct.pack('<dB', timestamp, len(settings)) + settings
+        return header + buffer.tobytes()
+
+    # --- Send stage (event loop) ---
+
+    async def send_loop(self, websocket):
+        # Drop whatever was encoded before this connection and start encoding again.
+        # Capture never stopped, so the first frame goes out one capture interval later.
+        self.encoded.take()
+        self.streaming.set()
+        try:
+            await self.stream(websocket)
+        finally:
+            self.streaming.clear()
+
+    async def stream(self, websocket):
+        next_report = time.time() + STATS_INTERVAL
+        while True:
+            packets = await self.encoded.get_async()
+            if packets is None:
+                return # Pipeline stopped
+            t0 = time.perf_counter()
+            for packet in packets:
+                await websocket.send(packet)
+            elapsed = time.perf_counter() - t0
+            self.stats["send"].record(elapsed)
+            self.abr.record_send(elapsed * 1000)
+
+            if time.time() >= next_report:
+                next_report = time.time() + STATS_INTERVAL
+                self.report()
+
+    def report(self):
+        parts = []
+        for name, stage in self.stats.items():
+            fps, avg_ms = stage.collect()
+            parts.append(f"{name} {fps:4.1f}fps {avg_ms:5.1f}ms")
+        quality, width, fps = self.abr.settings()
+        print(f"\n[PIPE] {' | '.join(parts)} | dropped enc={self.captured.dropped} send={self.encoded.dropped} | q{quality} {width}w {fps}fps{' +low' if self.abr.wants_low() else ''} | {self.demand.mode}")
+
+async def send_video(websocket, pipeline):
+    try:
+        await pipeline.send_loop(websocket)
+    except asyncio.CancelledError:
+        print("Video stream task cancelled.")
+    except websockets.exceptions.ConnectionClosed:
+        print("\nConnection closed (Video)")
     except Exception as e:
-        print(f"Noise Gen Error: {e}")
+        print(f"Video Send Error: {e}")
+
+async def video_session(websocket, pipeline):
+    tasks = [
+        asyncio.create_task(receive_controls(websocket)),
+        asyncio.create_task(send_video(websocket, pipeline))
+    ]
+    # Either side ending means the connection is gone
+    await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+async def control_session(websocket):
+    try:
+        await receive_controls(websocket)
+    finally:
+        # Don't keep driving on the last command while we're cut off
+        go_neutral()
+
+async def keep_connected(name, url, ssl_context, session):
+    """Connects to url and runs session(websocket), reconnecting with backoff forever."""
+    backoff = RECONNECT_MIN
+    while True:
+        print(f"[{name}] Connecting to {url}...")
+        try:
+            async with websockets.connect(url, ssl=ssl_context) as websocket:
+                print(f"[{name}] Connected!")
+                backoff = RECONNECT_MIN
+                await session(websocket)
+        except (OSError, websockets.exceptions.WebSocketException) as e:
+            print(f"[{name}] Connection failed: {e}")
+
+        print(f"[{name}] Reconnecting in {backoff:.1f}s...")
+        await asyncio.sleep(backoff)
+        backoff = min(RECONNECT_MAX, backoff * 2)
 
 async def main():
-    print(f"Connecting to {SERVER_URL}...")
-    
     ssl_context = None
     if SERVER_URL.startswith("wss"):
         ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
         ssl_context.load_verify_locations("cacert.pem")
-    
-    async with websockets.connect(SERVER_URL, ssl=ssl_context) as websocket:
-        print("Connected!")
+
+    # Camera pipeline and serial link live for the whole process, not per connection
+    pipeline = VideoPipeline()
+    pipeline.start(asyncio.get_running_loop())
+    serial_task = asyncio.create_task(serial_link())
+
+    # Video and controls reconnect independently, so a stalled uplink can't take controls down with it
+    try:
         await asyncio.gather(
-            receive_controls(websocket),
-            send_video(websocket),
-            serial_transmitter()
+            keep_connected("VIDEO", SERVER_URL, ssl_context, lambda ws: video_session(ws, pipeline)),
+            keep_connected("CONTROL", CONTROL_URL, ssl_context, control_session)
         )
+    finally:
+        serial_task.cancel()
+        await asyncio.to_thread(pipeline.stop)
+
+def bench_ingest(frames=300, width=640, height=480):
+    """
+    CPU per frame for reading NV12 frames off a pipe: readinto a fresh bytearray
+    per frame vs. readinto a pooled buffer. Only the reader thread's CPU time is
+    counted, best of a few rounds.
+    """
+    size = width * height * 3 // 2
+    header = QNX_HEADER.pack(0.0, size, width, height, 1)
+    payload = bytes(size)
+
+    def write_all(fd):
+        with os.fdopen(fd, 'wb') as out:
+            for _ in range(frames):
+                out.write(header)
+                out.write(payload)
+
+    def run(reader, rounds=5):
+        best = None
+        for _ in range(rounds):
+            r, w = os.pipe()
+            writer = threading.Thread(target=write_all, args=(w,))
+            writer.start()
+            with os.fdopen(r, 'rb', buffering=0) as stream:
+                t0 = time.thread_time()
+                reader(stream)
+                cpu = time.thread_time() - t0
+            writer.join()
+            best = cpu if best is None else min(best, cpu)
+        return best / frames * 1e6
+
+    def fresh(stream):
+        head = bytearray(QNX_HEADER.size)
+        for _ in range(frames):
+            read_exact(stream, memoryview(head))
+            _, n, w_, h_, _ = QNX_HEADER.unpack_from(head)
+            buf = bytearray(n)
+            read_exact(stream, memoryview(buf))
+            np.frombuffer(buf, dtype=np.uint8).reshape((h_ * 3 // 2, w_))
+
+    def pooled(stream):
+        pool = FramePool()
+        head = bytearray(QNX_HEADER.size)
+        for _ in range(frames):
+            read_exact(stream, memoryview(head))
+            _, n, w_, h_, _ = QNX_HEADER.unpack_from(head)
+            buf = pool.acquire(n)
+            read_exact(stream, memoryview(buf))
+            np.frombuffer(buf, dtype=np.uint8).reshape((h_ * 3 // 2, w_))
+            pool.release(buf)
+
+    before = run(fresh)
+    after = run(pooled)
+    print(f"{width}x{height} NV12 ingest: fresh bytearray {before:.0f}us/frame, pooled {after:.0f}us/frame, saved {before - after:.0f}us/frame")
+
+def bench_convert(frames=100, sizes=((640, 480), (1280, 720))):
+    """Old path (full-res cvtColor, then resize) vs FrameConverter, per QNX fmt code."""
+    old_codes = {FMT_NV12: cv2.COLOR_YUV2BGR_NV12, FMT_RGBA: cv2.COLOR_RGBA2BGR, FMT_BGRA: cv2.COLOR_BGRA2BGR, FMT_RGB: None}
+    for width, height in sizes:
+        for fmt, code in old_codes.items():
+            rows, channels = (height * 3 // 2, 1) if fmt == FMT_NV12 else (height, 4 if code else 3)
+            shape = (rows, width) if channels == 1 else (rows, width, channels)
+            raw = np.random.randint(0, 255, shape, dtype=np.uint8)
+            payload = raw.tobytes()
+
+            for target in WIDTHS:
+                t0 = time.perf_counter()
+                for _ in range(frames):
+                    frame = cv2.cvtColor(raw, code) if code else raw
+                    if frame.shape[1] > target:
+                        frame = cv2.resize(frame, (target, int(frame.shape[0] * target / frame.shape[1])))
+                old_ms = (time.perf_counter() - t0) / frames * 1000
+
+                converter = FrameConverter(fmt, width, height, target)
+                t0 = time.perf_counter()
+                for _ in range(frames):
+                    converter(payload, len(payload))
+                new_ms = (time.perf_counter() - t0) / frames * 1000
+                print(f"fmt={fmt:2} {width}x{height} -> {target}w: old {old_ms:6.2f}ms  fused {new_ms:6.2f}ms")
 
 if __name__ == "__main__":
+    if "--bench-ingest" in sys.argv:
+        bench_ingest()
+        sys.exit(0)
+    if "--bench-convert" in sys.argv:
+        bench_convert()
+        sys.exit(0)
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
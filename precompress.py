@@ -0,0 +1,67 @@
+import argparse
+import gzip
+import os
+
+from backend.static_assets import COMPRESSIBLE, MIN_COMPRESS, brotli
+
+# Writes file.br / file.gz next to every compressible file in static/, for
+# backend/static_assets.py to serve. Run at build time (bin/post_compile does
+# on Heroku); variants older than their source are ignored by the server, so
+# a stale build is never served.
+#
+#   python precompress.py            build missing / outdated variants
+#   python precompress.py --clean    remove them again
+
+def variants_for(path: str):
+    yield path + ".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield path + ".br", lambda data: brotli.compress(data, quality=11)
+
+def sources(directory: str):
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if os.path.splitext(name)[1] in COMPRESSIBLE:
+                yield os.path.join(root, name)
+
+def build(directory: str):
+    written = 0
+    raw_total = packed_total = 0
+    for path in sources(directory):
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < MIN_COMPRESS:
+            continue
+        for target, compress in variants_for(path):
+            if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                continue
+            packed = compress(data)
+            if len(packed) >= len(data):
+                continue # Not worth it (the server would ignore it anyway)
+            with open(target, "wb") as f:
+                f.write(packed)
+            written += 1
+            raw_total += len(data)
+            packed_total += len(packed)
+    saved = f", {raw_total} -> {packed_total} bytes" if written else ""
+    print(f"[PRECOMPRESS] {written} variants written{saved}" + ("" if brotli else " (brotli not installed, gzip only)"))
+
+def clean(directory: str):
+    removed = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            base, ext = os.path.splitext(name)
+            if ext in (".gz", ".br") and os.path.splitext(base)[1] in COMPRESSIBLE:
+                os.remove(os.path.join(root, name))
+                removed += 1
+    print(f"[PRECOMPRESS] {removed} variants removed")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompress static assets (gzip/brotli)")
+    parser.add_argument("directory", nargs="?", default="static")
+    parser.add_argument("--clean", action="store_true", help="Remove generated variants")
+    args = parser.parse_args()
+
+    if args.clean:
+        clean(args.directory)
+    else:
+        build(args.directory)
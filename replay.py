@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import json
+import time
+
+from backend import recorder
+from backend.recorder import read_records
+
+# Replays a session recorded with RECORD_SESSION=path (see backend/recorder.py).
+#
+#   python replay.py session.rec --url ws://localhost:8000 --speed 2
+#       Pi frames, controls and actions sent to a running server over websockets
+#   python replay.py session.rec --in-process
+#       Drives a ConnectionManager directly with the recorded CV results instead
+#       of running CV, so tracker/game changes can be checked for changed hits.
+#       Game time runs on a VirtualClock set from the recording, so cooldowns and
+#       timers behave as they did live while the replay runs as fast as it can.
+# --speed 1 is real time, higher is faster, 0 is as fast as possible (live mode).
+
+class ReplayClock:
+    def __init__(self, speed: float):
+        self.speed = speed
+        self.started = time.perf_counter()
+
+    async def wait_until(self, t: float):
+        if self.speed <= 0:
+            await asyncio.sleep(0) # Still let the server side run
+            return
+        delay = t / self.speed - (time.perf_counter() - self.started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+class FakeSocket:
+    """Stands in for a browser in the in-process replay."""
+    def __init__(self):
+        self.frames = 0
+        self.texts = 0
+
+    async def accept(self):
+        pass
+
+    async def send_bytes(self, data):
+        self.frames += 1
+
+    async def send_text(self, data):
+        self.texts += 1
+
+async def replay_live(path: str, url: str, speed: float):
+    import websockets
+
+    clock = ReplayClock(speed)
+    pi = await websockets.connect(f"{url}/ws/pi")
+    clients = {}
+    received = {}
+
+    async def drain(cid, ws):
+        try:
+            async for msg in ws:
+                if isinstance(msg, bytes):
+                    received[cid] = received.get(cid, 0) + 1
+        except Exception:
+            pass
+
+    async def drain_pi():
+        # Controls and feedback come back to the "Pi"; answer pings like the real one
+        try:
+            async for msg in pi:
+                if isinstance(msg, str) and json.loads(msg).get("type") == "ping":
+                    await pi.send(json.dumps({"type": "pong", "t": json.loads(msg)["t"]}))
+        except Exception:
+            pass
+
+    tasks = [asyncio.create_task(drain_pi())]
+    counts = {}
+    t0 = time.perf_counter()
+    for kind, cid, t, payload in read_records(path):
+        await clock.wait_until(t)
+        counts[kind] = counts.get(kind, 0) + 1
+        if kind == recorder.FRAME:
+            await pi.send(payload)
+        elif kind == recorder.CONNECT:
+            clients[cid] = await websockets.connect(f"{url}/ws/client")
+            tasks.append(asyncio.create_task(drain(cid, clients[cid])))
+        elif kind == recorder.DISCONNECT and cid in clients:
+            await clients.pop(cid).close()
+        elif kind == recorder.CONTROL and cid in clients:
+            await clients[cid].send(payload)
+        elif kind == recorder.ACTION and cid in clients:
+            await clients[cid].send(payload.decode())
+    elapsed = time.perf_counter() - t0
+
+    await asyncio.sleep(0.5) # Let the last frames arrive
+    for ws in list(clients.values()) + [pi]:
+        await ws.close()
+    for task in tasks:
+        task.cancel()
+
+    print(f"[REPLAY] {sum(counts.values())} records in {elapsed:.2f}s: " +
+          ", ".join(f"{recorder.KIND_NAMES[k]}={n}" for k, n in sorted(counts.items())))
+    print(f"[REPLAY] Frames received per client: {received}")
+
+async def replay_in_process(path: str):
+    from backend import connection
+    from backend.clock import VirtualClock
+
+    # Replays must not touch the real leaderboard file or devnet
+    connection.save_leaderboard = lambda data: None
+    clock = VirtualClock()
+    base = clock.time()
+    manager = connection.ConnectionManager(clock=clock)
+
+    hits = []
+    attempt_shot = manager.game_state.attempt_shot
+    def recording_attempt_shot():
+        result = attempt_shot()
+        if result["hits"]:
+            hits.append((manager.game_state.player_name, sorted(result["hits"])))
+        return result
+    manager.game_state.attempt_shot = recording_attempt_shot
+
+    clients = {}
+    timings = {}
+    counts = {}
+
+    def timed(name, started):
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+
+    t_start = time.perf_counter()
+    for kind, cid, t, payload in read_records(path):
+        await clock.advance_to(base + t)
+        counts[kind] = counts.get(kind, 0) + 1
+        t0 = time.perf_counter()
+        if kind == recorder.FRAME:
+            await manager.broadcast_to_clients(payload)
+            timed("relay", t0)
+        elif kind == recorder.CV:
+            manager.game_state.tracker.update(json.loads(payload)["results"])
+            timed("tracker", t0)
+        elif kind == recorder.CONNECT:
+            clients[cid] = FakeSocket()
+            await manager.connect(clients[cid], "client")
+        elif kind == recorder.DISCONNECT and cid in clients:
+            manager.disconnect(clients.pop(cid), "client")
+        elif kind == recorder.CONTROL and cid in clients:
+            await manager.process_client_message(clients[cid], {"bytes": payload})
+            timed("controls", t0)
+        elif kind == recorder.ACTION and cid in clients:
+            data = json.loads(payload)
+            if data.get("action") == "confirm_match":
+                data["mode"] = "casual" # No devnet in a replay
+            await manager.process_client_message(clients[cid], {"text": json.dumps(data)})
+            timed("actions", t0)
+
+    # Let the game engine finish what was queued
+    while manager.game_events and not manager.game_events.empty():
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - t_start
+
+    print(f"[REPLAY] {sum(counts.values())} records in {elapsed:.2f}s: " +
+          ", ".join(f"{recorder.KIND_NAMES[k]}={n}" for k, n in sorted(counts.items())))
+    print("[REPLAY] Time spent: " + ", ".join(f"{k} {v * 1000:.1f}ms" for k, v in timings.items()))
+    print(f"[REPLAY] Relay: {manager.relay.stats()}")
+    print(f"[REPLAY] Hits ({len(hits)}):")
+    for player, targets in hits:
+        print(f"  {player}: {', '.join(targets)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded arena session")
+    parser.add_argument("path")
+    parser.add_argument("--url", default="ws://localhost:8000", help="Server to replay into")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = real time, 0 = as fast as possible")
+    parser.add_argument("--in-process", action="store_true", help="Drive a ConnectionManager directly (no server)")
+    args = parser.parse_args()
+
+    if args.in_process:
+        asyncio.run(replay_in_process(args.path))
+    else:
+        asyncio.run(replay_live(args.path, args.url, args.speed))
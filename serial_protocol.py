@@ -0,0 +1,69 @@
+# Pi <-> Arduino serial framing (shared by pi_client.py and arduino_emulator.py)
+#
+# Command (Pi -> Arduino), 11 bytes:
+#   [0xA5][seq][lx ly rx ry lt rt btn_hi btn_lo][crc8]
+# Ack (Arduino -> Pi), 6 bytes, sent after each command is applied:
+#   [0x5A][seq][flags][loop_us lo][loop_us hi][crc8]
+# crc8 (poly 0x07) covers everything between the sync byte and the crc.
+# Must match readControllerPacket() / sendAck() in arduino/motor-control.ino.
+
+CMD_SYNC = 0xA5
+ACK_SYNC = 0x5A
+PAYLOAD_LEN = 8
+CMD_LEN = PAYLOAD_LEN + 3
+ACK_LEN = 6
+
+ACK_FLAG_FAILSAFE = 0x01 # Arduino had stopped the motors because commands went quiet
+
+def crc8(data) -> int:
+    crc = 0
+    for b in data:
+        crc ^= b
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+def encode_command(seq: int, payload: bytes) -> bytes:
+    body = bytes([seq & 0xFF]) + payload
+    return bytes([CMD_SYNC]) + body + bytes([crc8(body)])
+
+def encode_ack(seq: int, flags: int, loop_us: int) -> bytes:
+    loop_us = min(loop_us, 0xFFFF)
+    body = bytes([seq & 0xFF, flags & 0xFF, loop_us & 0xFF, loop_us >> 8])
+    return bytes([ACK_SYNC]) + body + bytes([crc8(body)])
+
+def decode_ack(frame: bytes):
+    """Returns (seq, flags, loop_us) for a checked ack frame."""
+    return frame[1], frame[2], frame[3] | (frame[4] << 8)
+
+class FrameParser:
+    """
+    Pulls fixed-length frames out of a byte stream. On a bad checksum it drops
+    the sync byte and rescans, so it recovers from noise or a mid-frame start.
+    """
+    def __init__(self, sync: int, length: int):
+        self.sync = sync
+        self.length = length
+        self.buf = bytearray()
+        self.errors = 0
+
+    def feed(self, data: bytes):
+        self.buf += data
+        frames = []
+        while True:
+            start = self.buf.find(self.sync)
+            if start < 0:
+                self.buf.clear()
+                break
+            if start:
+                del self.buf[:start]
+            if len(self.buf) < self.length:
+                break
+            frame = bytes(self.buf[:self.length])
+            if crc8(frame[1:-1]) == frame[-1]:
+                frames.append(frame)
+                del self.buf[:self.length]
+            else:
+                self.errors += 1
+                del self.buf[:1]
+        return frames
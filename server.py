@@ -1,34 +1,113 @@
+import asyncio
+import importlib
+import os
+import time
+_boot_start = time.perf_counter()
+
 import uvicorn
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from backend.connection import ConnectionManager
-from backend.solana import HOUSE_KEYPAIR, solana_client # Needed for /house-key route
+from backend import metrics, ranked, startup as boot
+from backend.profiler import Profiler, check_admin
+from backend.static_assets import StaticAssets
 
 app = FastAPI()
 
-manager = ConnectionManager()
+# Game/queue state survives restarts (ARENA_STATE= to turn off)
+manager = ConnectionManager(state_path=os.environ.get("ARENA_STATE", "arena_state") or None)
+profiler = Profiler()
+
+# Static files: precompressed variants, strong ETags, hot files in memory (see static_assets.py)
+assets = StaticAssets("static")
+metrics.register("static", assets.stats)
+
+boot.phases["imports"] = round((time.perf_counter() - _boot_start) * 1000, 1)
+
+async def warm_up():
+    """Loads the heavy subsystems off the event loop after we're already serving."""
+    def load_cv():
+        with boot.phase("opencv"):
+            importlib.import_module("backend.cv")
+
+    await asyncio.to_thread(load_cv)
+
+    if ranked.RANKED_ENABLED:
+        try:
+            sol = await asyncio.to_thread(ranked.solana)
+        except Exception as e:
+            print(f"[STARTUP] Solana init failed, ranked unavailable: {e}")
+            return
+        # Resume any payouts left over from a previous run
+        sol.payout_service.start()
+        sol.house_balance.start()
+    else:
+        print("[STARTUP] Ranked disabled, Solana stack not loaded.")
 
-# Mount Static Files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+    print(f"[STARTUP] Ready: {boot.report()}")
 
-@app.get("/")
-async def get():
-    return FileResponse("static/index.html")
+@app.on_event("startup")
+async def startup():
+    # Before anything else, so reconnecting clients find their game and queue slot
+    await manager.restore_state()
+    asyncio.create_task(warm_up())
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Flush the session recording (RECORD_SESSION)
+    if manager.recorder:
+        manager.recorder.close()
+    if manager.store:
+        manager.store.close()
+
+@app.api_route("/", methods=["GET", "HEAD"])
+async def get(request: Request):
+    # Never immutable: it's what points at the current ?v= asset versions
+    return await assets.response(request, "index.html", versioned=False)
+
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"])
+async def get_static(request: Request, path: str):
+    return await assets.response(request, path)
 
 @app.get("/house-key")
 async def get_house_key():
-    # Print balance for debug
+    if not ranked.RANKED_ENABLED:
+        return JSONResponse({"error": "ranked disabled"}, status_code=404)
+    sol = ranked.solana() if ranked.is_loaded() else await asyncio.to_thread(ranked.solana)
+    # Balance comes from the background cache, never a live RPC
+    return {"publicKey": str(sol.HOUSE_KEYPAIR.pubkey()), **sol.house_balance.snapshot()}
+
+@app.get("/killcam/{clip_id}")
+async def get_killcam(clip_id: str):
+    clip = manager.killcam.clip(clip_id)
+    if clip is None:
+        return JSONResponse({"error": "clip not found"}, status_code=404)
+    return Response(clip, media_type="application/octet-stream", headers={"Cache-Control": "no-store"})
+
+@app.get("/metrics")
+async def get_metrics():
+    return metrics.snapshot()
+
+@app.get("/admin/profile")
+async def get_profile(request: Request, seconds: float = 5.0, format: str = "json"):
+    # Token in X-Admin-Token only (a query string ends up in access logs); 404 unless ADMIN_TOKEN is configured
+    token = request.headers.get("x-admin-token")
+    if not check_admin(token):
+        return JSONResponse({"error": "not found"}, status_code=404)
     try:
-        balance = await solana_client.get_balance(HOUSE_KEYPAIR.pubkey())
-        print(f"[DEBUG] Current House Balance: {balance.value / 10**9} SOL")
-    except:
-        pass
-    return {"publicKey": str(HOUSE_KEYPAIR.pubkey())}
+        result = await profiler.profile(manager, seconds)
+    except RuntimeError as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+    if format == "collapsed":
+        # Straight into flamegraph.pl / speedscope
+        return PlainTextResponse(result["collapsed"])
+    return result
 
 @app.websocket("/ws/{client_type}")
 async def websocket_endpoint(websocket: WebSocket, client_type: str):
-    await manager.connect(websocket, client_type)
+    # Browsers pass their session token so they can reattach after a drop or restart
+    if not await manager.connect(websocket, client_type, websocket.query_params.get("session")):
+        return # Refused under load (the client was told when to retry)
     try:
         while True:
             # We receive the raw message dictionary (bytes or text)
@@ -44,6 +123,8 @@ async def websocket_endpoint(websocket: WebSocket, client_type: str):
                 await manager.process_client_message(websocket, message)
             elif client_type == "pi":
                 await manager.process_pi_message(websocket, message)
+            elif client_type == "pi-control":
+                await manager.process_pi_control_message(websocket, message)
                 
     except WebSocketDisconnect:
         print(f"{client_type} Disconnected (WebSocketDisconnect)")
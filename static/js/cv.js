@@ -3,25 +3,30 @@ const NATIVE_WIDTH = 640;
 const NATIVE_HEIGHT = 480;
 
 const qrCanvas = document.getElementById('qr-canvas');
-const ctx = qrCanvas ? qrCanvas.getContext('2d') : null;
 
 export function drawQRCodes(detections) {
-    if (!ctx || !qrCanvas) return;
+    drawDetections(qrCanvas, detections);
+}
+
+// Draws QR outlines onto any canvas laid over a video image (live feed, kill-cam)
+export function drawDetections(canvas, detections) {
+    const ctx = canvas ? canvas.getContext('2d') : null;
+    if (!ctx) return;
 
     // Clear previous drawings
-    ctx.clearRect(0, 0, qrCanvas.width, qrCanvas.height);
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
 
     // Allow canvas size to match display size for correct coordinate mapping
-    if (qrCanvas.width !== qrCanvas.offsetWidth || qrCanvas.height !== qrCanvas.offsetHeight) {
-        qrCanvas.width = qrCanvas.offsetWidth;
-        qrCanvas.height = qrCanvas.offsetHeight;
+    if (canvas.width !== canvas.offsetWidth || canvas.height !== canvas.offsetHeight) {
+        canvas.width = canvas.offsetWidth;
+        canvas.height = canvas.offsetHeight;
     }
 
     if (!detections || detections.length === 0) return;
 
     // Scale factors
-    const scaleX = qrCanvas.width / NATIVE_WIDTH;
-    const scaleY = qrCanvas.height / NATIVE_HEIGHT;
+    const scaleX = canvas.width / NATIVE_WIDTH;
+    const scaleY = canvas.height / NATIVE_HEIGHT;
 
     detections.forEach(qr => {
         const points = qr.bbox;
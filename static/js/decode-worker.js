@@ -0,0 +1,18 @@
+import { FrameDecoder } from './decoder.js?v=1';
+
+// Video decode worker (see video.js). Owns the video canvas once it's been
+// transferred, so JPEG decode and drawing never touch the main thread.
+let decoder = null;
+
+self.onmessage = (e) => {
+    const msg = e.data;
+    if (msg.type === 'init') {
+        decoder = new FrameDecoder(msg.canvas, (detections) => {
+            self.postMessage({ type: 'shown', detections });
+        });
+    } else if (msg.type === 'frame' && decoder) {
+        decoder.push(msg);
+    } else if (msg.type === 'stats' && decoder) {
+        self.postMessage({ type: 'stats', stats: decoder.stats() });
+    }
+};
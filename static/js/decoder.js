@@ -0,0 +1,64 @@
+// Decodes video frames into a canvas (in the decode worker, or on the main
+// thread if the browser can't hand a canvas to a worker). One frame decodes at
+// a time; frames arriving meanwhile replace the waiting one, so when decode
+// falls behind we skip straight to the newest frame instead of queueing.
+// frame = { buffer, jpegOffset, detections } (see frame.js)
+
+const WINDOW = 120; // Decode times kept for the stats
+
+export class FrameDecoder {
+    constructor(canvas, onShown) {
+        this.canvas = canvas;
+        this.ctx = canvas.getContext('2d');
+        this.onShown = onShown;
+        this.pending = null;
+        this.busy = false;
+        this.decoded = 0;
+        this.dropped = 0;
+        this.times = [];
+    }
+
+    push(frame) {
+        if (this.pending) this.dropped++;
+        this.pending = frame;
+        if (!this.busy) this.pump();
+    }
+
+    async pump() {
+        this.busy = true;
+        while (this.pending) {
+            const frame = this.pending;
+            this.pending = null;
+            const t0 = performance.now();
+            try {
+                const jpeg = new Blob([new Uint8Array(frame.buffer, frame.jpegOffset)], { type: 'image/jpeg' });
+                const bitmap = await createImageBitmap(jpeg);
+                if (this.canvas.width !== bitmap.width || this.canvas.height !== bitmap.height) {
+                    this.canvas.width = bitmap.width;
+                    this.canvas.height = bitmap.height;
+                }
+                this.ctx.drawImage(bitmap, 0, 0);
+                bitmap.close();
+                this.decoded++;
+                this.times.push(performance.now() - t0);
+                if (this.times.length > WINDOW) this.times.shift();
+                this.onShown(frame.detections);
+            } catch (e) {
+                this.dropped++; // Corrupt or truncated JPEG
+            }
+        }
+        this.busy = false;
+    }
+
+    stats() {
+        const sorted = [...this.times].sort((a, b) => a - b);
+        const avg = sorted.length ? sorted.reduce((a, b) => a + b, 0) / sorted.length : 0;
+        const p95 = sorted.length ? sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * 0.95))] : 0;
+        return {
+            decoded: this.decoded,
+            dropped: this.dropped,
+            decode_ms: Math.round(avg * 100) / 100,
+            decode_p95_ms: Math.round(p95 * 100) / 100
+        };
+    }
+}
@@ -0,0 +1,51 @@
+// Video frame header (see backend/frames.py)
+// [8 bytes timestamp (float64 LE, ms)][1 byte ext_len][ext][JPEG]
+// ext = seq (u32), quality (u8), fps (u8), width (u16), height (u16),
+//       tier (u8: 0 full stream, 1 low-res spectator stream),
+//       detections (added by the server): source seq (u32), count (u8), then per QR
+//       4 corner points (8 x int16, 640x480 space), text length (u8), text (UTF-8).
+// Legacy frames have the JPEG marker (FF D8) right after the timestamp.
+
+export function parseFrame(buffer) {
+    const view = new DataView(buffer);
+    const timestamp = view.getFloat64(0, true); // Little Endian
+
+    if (view.getUint8(8) === 0xFF && view.getUint8(9) === 0xD8) {
+        return { timestamp, meta: null, jpegOffset: 8 };
+    }
+
+    const extLen = view.getUint8(8);
+    let meta = null;
+    if (extLen >= 10) {
+        meta = {
+            seq: view.getUint32(9, true),
+            quality: view.getUint8(13),
+            fps: view.getUint8(14),
+            width: view.getUint16(15, true),
+            height: view.getUint16(17, true),
+            tier: extLen >= 11 ? view.getUint8(19) : 0
+        };
+    }
+    const detections = extLen >= 16 ? parseDetections(buffer, view, 20) : null;
+    return { timestamp, meta, detections, jpegOffset: 9 + extLen };
+}
+
+const textDecoder = new TextDecoder();
+
+function parseDetections(buffer, view, offset) {
+    const seq = view.getUint32(offset, true);
+    const count = view.getUint8(offset + 4);
+    offset += 5;
+    const items = [];
+    for (let i = 0; i < count; i++) {
+        const bbox = [];
+        for (let p = 0; p < 4; p++) {
+            bbox.push([view.getInt16(offset + p * 4, true), view.getInt16(offset + p * 4 + 2, true)]);
+        }
+        const textLen = view.getUint8(offset + 16);
+        const text = textDecoder.decode(new Uint8Array(buffer, offset + 17, textLen));
+        offset += 17 + textLen;
+        items.push({ text, bbox });
+    }
+    return { seq, items };
+}
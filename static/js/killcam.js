@@ -0,0 +1,82 @@
+import { parseFrame } from './frame.js?v=3';
+import { drawDetections } from './cv.js';
+
+// Kill-cam clip (see backend/killcam.py)
+// ["KCAM"][count u16 LE] then per frame [len u32 LE][frame as relayed: header + JPEG]
+// Frames are played back at their original spacing, looped until the modal closes.
+
+const container = document.getElementById('go-killcam');
+const img = document.getElementById('go-killcam-img');
+const canvas = document.getElementById('go-killcam-canvas');
+
+let playback = null; // { timer, url } for the clip currently playing
+
+function parseClip(buffer) {
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+    if (magic !== 'KCAM') return [];
+    const count = view.getUint16(4, true);
+    const frames = [];
+    let offset = 6;
+    for (let i = 0; i < count && offset + 4 <= buffer.byteLength; i++) {
+        const len = view.getUint32(offset, true);
+        offset += 4;
+        const data = buffer.slice(offset, offset + len);
+        offset += len;
+        const frame = parseFrame(data);
+        frames.push({
+            timestamp: frame.timestamp,
+            jpeg: new Blob([new Uint8Array(data, frame.jpegOffset)], { type: 'image/jpeg' }),
+            detections: frame.detections
+        });
+    }
+    return frames;
+}
+
+export async function playKillCam(url) {
+    stopKillCam();
+    if (!container || !img) return;
+    let frames;
+    try {
+        const res = await fetch(url);
+        if (!res.ok) return;
+        frames = parseClip(await res.arrayBuffer());
+    } catch (e) {
+        console.error("Kill-cam fetch failed", e);
+        return;
+    }
+    if (frames.length === 0) return;
+
+    container.classList.remove('hidden');
+    const state = { timer: null, url: null };
+    playback = state;
+
+    let i = 0;
+    let detections = null;
+    const showNext = () => {
+        if (playback !== state) return;
+        const frame = frames[i];
+        // Overlays persist until the next CV result, like the live feed
+        if (frame.detections) detections = frame.detections.items;
+        if (state.url) URL.revokeObjectURL(state.url);
+        state.url = URL.createObjectURL(frame.jpeg);
+        img.onload = () => drawDetections(canvas, detections);
+        img.src = state.url;
+
+        const next = (i + 1) % frames.length;
+        const delay = next === 0 ? 1000 : Math.max(0, frames[next].timestamp - frame.timestamp);
+        if (next === 0) detections = null;
+        i = next;
+        state.timer = setTimeout(showNext, delay);
+    };
+    showNext();
+}
+
+export function stopKillCam() {
+    if (playback) {
+        clearTimeout(playback.timer);
+        if (playback.url) URL.revokeObjectURL(playback.url);
+        playback = null;
+    }
+    if (container) container.classList.add('hidden');
+}
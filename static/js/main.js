@@ -1,6 +1,7 @@
-import { connect, resetWatchdog, sendBinary, sendPing } from './network.js?v=2';
+import { connect, resetWatchdog, sendBinary, sendPing, sendJson, setReconnectDelay } from './network.js?v=5';
+import { parseFrame } from './frame.js?v=3';
 import { updateInputState, controllerState } from './input.js?v=21';
-import { drawQRCodes } from './cv.js';
+import { initVideo, showFrame } from './video.js?v=1';
 import {
     updateGameState,
     handleMatchFound,
@@ -19,8 +20,13 @@ import {
     addScore,
     closeGameOver,
     dismissQueueModal, // Added
-    updatePingDisplay
-} from './ui.js?v=21';
+    updatePingDisplay,
+    updateStreamInfo,
+    toggleHd,
+    syncVideoTier,
+    setMyName,
+    showServerBusy
+} from './ui.js?v=26';
 import { connectWallet } from './wallet.js';
 
 // Expose functions to global scope for HTML event handlers
@@ -35,6 +41,7 @@ window.closeGameOver = closeGameOver;
 window.connectWallet = connectWallet;
 window.closeLoadout = closeLoadout;
 window.dismissQueueModal = dismissQueueModal; // Added
+window.toggleHd = toggleHd;
 
 // Landing Screen Logic
 const enterBtn = document.getElementById('enter-btn');
@@ -60,8 +67,16 @@ if (enterBtn) {
     });
 }
 
+// Hidden tabs don't need video; the server pauses or slows the Pi when nobody is looking
+function sendVisibility() {
+    sendJson({ action: "set_visibility", visible: !document.hidden });
+}
+document.addEventListener('visibilitychange', sendVisibility);
+
 function onOpen() {
     setConnectionState(true);
+    syncVideoTier();
+    if (document.hidden) sendVisibility();
     // Start Watchdog immediately to show "Media Offline" if no frames arrive
     resetWatchdog(() => {
         videoOverlay.classList.remove('hidden');
@@ -82,10 +97,14 @@ function onMessage(event) {
             } else if (data.type === 'match_timeout') {
                 closeLoadout();
                 alert("Too slow! You missed your gurt.");
+            } else if (data.type === 'server_busy') {
+                // Refused at capacity: the server closes us, come back when told
+                setReconnectDelay(data.retry_after * 1000);
+                showServerBusy(data.retry_after);
+            } else if (data.type === 'session') {
+                setMyName(data.name);
             } else if (data.type === 'game_over') {
-                showGameOver(data.stats);
-            } else if (data.type === 'qr_detected') {
-                drawQRCodes(data.data);
+                showGameOver(data.stats, data.killcam);
             } else if (data.type === 'pong') {
                 // We no longer update HUD ping from websocket RTT 
                 // to avoid flickering NA state when media is offline.
@@ -96,29 +115,14 @@ function onMessage(event) {
             console.error("Failed to parse JSON", e);
         }
     } else {
-        // Assume Binary (Blob or ArrayBuffer)
-        if (event.data instanceof Blob) {
-            // New Format: [8 bytes timestamp][JPEG Data]
-            if (event.data.size > 8) {
-                const timestampBlob = event.data.slice(0, 8);
-                const imageBlob = event.data.slice(8);
-
-                // Read timestamp (Async)
-                timestampBlob.arrayBuffer().then(buffer => {
-                    const view = new DataView(buffer);
-                    const serverTime = view.getFloat64(0, true); // Little Endian
-                    const latency = Date.now() - serverTime;
-                    updatePingDisplay(latency);
-                }).catch(e => console.error("Timestamp read error", e));
-
-                const url = URL.createObjectURL(imageBlob);
-                videoFeed.onload = () => URL.revokeObjectURL(url);
-                videoFeed.src = url;
-            } else {
-                // Fallback for old format or noise
-                const url = URL.createObjectURL(event.data);
-                videoFeed.onload = () => URL.revokeObjectURL(url);
-                videoFeed.src = url;
+        // Binary video frame: [header][JPEG] (see frame.js)
+        if (event.data instanceof ArrayBuffer) {
+            if (event.data.byteLength > 8) {
+                const frame = parseFrame(event.data);
+                updatePingDisplay(Date.now() - frame.timestamp);
+                updateStreamInfo(frame.meta);
+                // Decoded off the main thread; CV results in the header are drawn when it shows
+                showFrame(event.data, frame);
             }
 
             // Hide overlay on frame receive
@@ -161,4 +165,6 @@ function updateLoop() {
 }
 
 // Start Connection
+// Client decode stats feed the server's metrics
+initVideo(videoFeed, (stats) => sendJson({ action: "client_stats", ...stats }));
 connect(onOpen, onMessage, onClose);
@@ -1,11 +1,29 @@
 const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-const wsUrl = `${protocol}//${window.location.host}/ws/client`;
+// Per-tab session token (survives reloads): the server uses it to give us back our
+// game or queue slot after a dropped connection or a server restart
+let sessionToken = sessionStorage.getItem('session_token');
+if (!sessionToken) {
+    sessionToken = window.crypto && crypto.randomUUID
+        ? crypto.randomUUID()
+        : Math.random().toString(36).slice(2) + Date.now().toString(36);
+    sessionStorage.setItem('session_token', sessionToken);
+}
+const wsUrl = `${protocol}//${window.location.host}/ws/client?session=${sessionToken}`;
 
 export let socket = null;
 let frameWatchdog = null;
+const RECONNECT_DELAY = 2000;
+let reconnectDelay = RECONNECT_DELAY;
+
+// Server at capacity asked us to hold off before reconnecting
+export function setReconnectDelay(ms) {
+    reconnectDelay = ms;
+}
 
 export function connect(onOpen, onMessage, onClose) {
     socket = new WebSocket(wsUrl);
+    // Video frames are parsed synchronously (see frame.js)
+    socket.binaryType = 'arraybuffer';
 
     socket.onopen = () => {
         console.log("WS Connected");
@@ -19,7 +37,8 @@ export function connect(onOpen, onMessage, onClose) {
     socket.onclose = () => {
         if (onClose) onClose();
         if (frameWatchdog) clearTimeout(frameWatchdog);
-        setTimeout(() => connect(onOpen, onMessage, onClose), 2000);
+        setTimeout(() => connect(onOpen, onMessage, onClose), reconnectDelay);
+        reconnectDelay = RECONNECT_DELAY;
     };
 
     socket.onerror = (err) => {
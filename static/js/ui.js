@@ -1,7 +1,8 @@
-import { sendJson } from './network.js?v=2';
+import { sendJson } from './network.js?v=5';
 import { processTransaction, connectWallet, getUserWallet } from './wallet.js';
 import { initHUD, updateHUD } from './hud.js?v=21';
 import { controllerState } from './input.js?v=21';
+import { playKillCam, stopKillCam } from './killcam.js';
 
 // DOM Elements
 export const videoFeed = document.getElementById('video-feed');
@@ -31,6 +32,12 @@ export let currentMode = 'casual';
 export let selectedLoadout = { id: 'vanguard', name: 'Big Gurt' };
 let confirmationTimerInterval = null;
 
+// Server recognised our session token after a reconnect
+export function setMyName(name) {
+    myName = name;
+    if (playerNameInput && !playerNameInput.value) playerNameInput.value = name;
+}
+
 export function getIsMyTurn() {
     return isMyTurn;
 }
@@ -85,6 +92,7 @@ export function updateGameState(state) {
     if (timerDisplay) timerDisplay.textContent = state.time_left;
     if (scoreDisplay) scoreDisplay.textContent = state.score;
     if (currentPilotName) currentPilotName.textContent = state.player || "None";
+    updateLoadBadge(state.load);
 
     // Check if game just ended
     if (wasActive && !state.active) {
@@ -220,6 +228,54 @@ export function updateGameState(state) {
     renderLeaderboard(state.leaderboard);
 }
 
+export function updateStreamInfo(meta) {
+    // Encoder settings chosen by the Pi (shown on hover over the ping readout)
+    const pingEl = document.getElementById('hud-ping');
+    if (pingEl && meta) {
+        pingEl.title = `${meta.width}x${meta.height} q${meta.quality} ${meta.fps}fps`;
+    }
+    // Which simulcast tier we're actually getting
+    const hdBtn = document.getElementById('hd-toggle');
+    if (hdBtn && meta) {
+        hdBtn.textContent = meta.tier === 1 ? 'SD' : 'HD';
+    }
+}
+
+// Server load level (see backend/admission.py); spectators get fewer frames above normal
+const LOAD_LABELS = {
+    reduced: 'BUSY · REDUCED FPS',
+    snapshot: 'BUSY · SNAPSHOTS',
+    full: 'FULL · SNAPSHOTS'
+};
+
+export function updateLoadBadge(level) {
+    const badge = document.getElementById('load-badge');
+    if (!badge) return;
+    const label = LOAD_LABELS[level];
+    badge.classList.toggle('hidden', !label);
+    if (label) badge.textContent = label;
+}
+
+export function showServerBusy(retryAfter) {
+    const badge = document.getElementById('load-badge');
+    if (!badge) return;
+    badge.classList.remove('hidden');
+    badge.textContent = `FULL · RETRY IN ${retryAfter}s`;
+}
+
+// Spectators get the low-res tier unless they ask for the full stream
+let wantsHd = false;
+
+export function toggleHd() {
+    wantsHd = !wantsHd;
+    syncVideoTier();
+}
+
+export function syncVideoTier() {
+    // Server forgets the choice on reconnect, so this is re-sent on open
+    sendJson({ action: "set_video_tier", tier: wantsHd ? "high" : "low" });
+}
+
 export function updatePingDisplay(latency) {
     const pingEl = document.getElementById('hud-ping');
     if (pingEl) {
@@ -477,12 +533,13 @@ export async function confirmLoadoutWrapper() {
     }
 }
 
-export function showGameOver(stats) {
+export function showGameOver(stats, killcamUrl) {
     const modal = document.getElementById('game-over-modal');
     document.getElementById('go-score').textContent = stats.score;
     document.getElementById('go-distance').textContent = stats.distance;
     document.getElementById('go-shots').textContent = stats.shots;
     document.getElementById('go-enemies').textContent = stats.enemies;
+    if (killcamUrl) playKillCam(killcamUrl);
 
     modal.style.visibility = 'visible';
     modal.style.opacity = '1';
@@ -492,6 +549,7 @@ export function showGameOver(stats) {
 
 export function closeGameOver() {
     const modal = document.getElementById('game-over-modal');
+    stopKillCam();
     modal.style.opacity = '0';
     modal.style.pointerEvents = 'none';
     modal.style.transform = 'scale(0.95)';
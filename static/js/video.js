@@ -0,0 +1,49 @@
+import { FrameDecoder } from './decoder.js?v=1';
+import { drawQRCodes } from './cv.js';
+
+// Video display. Frames go to a worker that decodes them into the video
+// canvas (OffscreenCanvas), so a slow decode can't stall the HUD or the input
+// loop. Browsers without OffscreenCanvas decode on the main thread instead,
+// with the same newest-frame-wins dropping. Decode stats go to the server
+// every STATS_INTERVAL (they show up under video.client_decode in /metrics).
+
+const STATS_INTERVAL = 5000;
+
+let worker = null;
+let decoder = null;
+
+export function initVideo(canvas, reportStats) {
+    // QR overlays are drawn once the frame they came with is on screen
+    const onShown = (detections) => {
+        if (detections) drawQRCodes(detections.items);
+    };
+
+    if (canvas.transferControlToOffscreen && window.Worker) {
+        try {
+            worker = new Worker('/static/js/decode-worker.js?v=1', { type: 'module' });
+            const offscreen = canvas.transferControlToOffscreen();
+            worker.postMessage({ type: 'init', canvas: offscreen }, [offscreen]);
+            worker.onmessage = (e) => {
+                if (e.data.type === 'shown') onShown(e.data.detections);
+                else if (e.data.type === 'stats') reportStats({ ...e.data.stats, worker: true });
+            };
+            worker.onerror = (e) => console.error("Decode worker error", e);
+        } catch (e) {
+            console.warn("Decode worker unavailable, decoding on the main thread", e);
+            worker = null;
+        }
+    }
+    if (!worker) decoder = new FrameDecoder(canvas, onShown);
+
+    setInterval(() => {
+        if (worker) worker.postMessage({ type: 'stats' });
+        else reportStats({ ...decoder.stats(), worker: false });
+    }, STATS_INTERVAL);
+}
+
+// Takes ownership of buffer (it is transferred to the worker)
+export function showFrame(buffer, frame) {
+    const msg = { type: 'frame', buffer, jpegOffset: frame.jpegOffset, detections: frame.detections };
+    if (worker) worker.postMessage(msg, [buffer]);
+    else if (decoder) decoder.push(msg);
+}
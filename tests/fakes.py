@@ -0,0 +1,26 @@
+import json
+
+class FakeSocket:
+    """Stands in for a FastAPI WebSocket: records what the server sends it."""
+    def __init__(self):
+        self.messages = [] # Text frames, decoded from JSON
+        self.sent = [] # Binary frames
+        self.closed = None # Close code, once closed
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data):
+        self.messages.append(json.loads(data))
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        self.closed = code
+
+    def got(self, kind):
+        return any(m["type"] == kind for m in self.messages)
+
+    def of_type(self, *kinds):
+        return [m for m in self.messages if m["type"] in kinds]
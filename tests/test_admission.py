@@ -0,0 +1,66 @@
+import unittest
+import asyncio
+from backend.admission import LoadMonitor, LEVEL_NORMAL, LEVEL_REDUCED, LEVEL_FULL
+from backend.connection import ConnectionManager
+from backend.frames import TIER_HIGH
+from backend.relay import VideoRelay
+from fakes import FakeSocket
+
+class TestLoadMonitor(unittest.TestCase):
+    def test_levels_and_hysteresis(self):
+        load = LoadMonitor(max_clients=100, max_egress_mbps=8, max_cpu=0) # 8 Mbit/s = 1 MB/s
+        load.sample(10, 0, now=0.0, cpu_time=0.0)
+        self.assertFalse(load.sample(10, 500_000, now=1.0, cpu_time=0.0))
+        self.assertEqual(load.level, LEVEL_NORMAL)
+
+        # Egress at 80% of budget
+        self.assertTrue(load.sample(10, 1_300_000, now=2.0, cpu_time=0.0))
+        self.assertEqual(load.level, LEVEL_REDUCED)
+        # Just under the bound isn't enough to step back down
+        load.sample(10, 1_950_000, now=3.0, cpu_time=0.0)
+        self.assertEqual(load.level, LEVEL_REDUCED)
+        load.sample(10, 2_400_000, now=4.0, cpu_time=0.0)
+        self.assertEqual(load.level, LEVEL_NORMAL)
+
+        # Client budget alone can fill the server
+        load.sample(100, 2_400_000, now=5.0, cpu_time=0.0)
+        self.assertEqual(load.level, LEVEL_FULL)
+        self.assertFalse(load.admits_spectator(100))
+
+class TestShedding(unittest.TestCase):
+    def test_player_and_queue_keep_full_rate(self):
+        async def run():
+            relay = VideoRelay()
+            player, queued, spectator = FakeSocket(), FakeSocket(), FakeSocket()
+            for ws in (player, queued, spectator):
+                relay.add(ws)
+            relay.set_player(player)
+            relay.set_protected({queued})
+            relay.spectator_interval = 1.0
+            for _ in range(10):
+                relay.relay(b"frame", TIER_HIGH)
+                await asyncio.sleep(0)
+            return relay, player, queued, spectator
+
+        relay, player, queued, spectator = asyncio.run(run())
+        self.assertEqual((len(player.sent), len(queued.sent), len(spectator.sent)), (10, 10, 1))
+        self.assertEqual(relay.stats()["shed"], 9)
+
+    def test_refuse_new_spectators_when_full(self):
+        async def run():
+            manager = ConnectionManager()
+            manager.load.max_clients = 1
+            first, second, returning = FakeSocket(), FakeSocket(), FakeSocket()
+            self.assertTrue(await manager.connect(first, "client"))
+            self.assertFalse(await manager.connect(second, "client"))
+            # Someone holding a slot always gets back in
+            manager.detached["tok"] = 0.0
+            self.assertTrue(await manager.connect(returning, "client", "tok"))
+            return second
+
+        second = asyncio.run(run())
+        self.assertEqual(second.messages[-1]["type"], "server_busy")
+        self.assertEqual(second.closed, 1013)
+
+if __name__ == '__main__':
+    unittest.main()
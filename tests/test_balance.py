@@ -0,0 +1,63 @@
+import unittest
+import asyncio
+from backend.balance import BalanceCache
+
+class StubBalance:
+    """Stand-in for fetch_house_balance: returns queued balances, or raises."""
+    def __init__(self, *balances):
+        self.balances = list(balances)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        value = self.balances.pop(0)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+class TestBalanceCache(unittest.TestCase):
+    def test_refresh_and_low_flag(self):
+        fetch = StubBalance(5_000, ConnectionError("rpc down"), 500)
+        cache = BalanceCache(fetch, low_threshold=1_000)
+        self.assertEqual(cache.snapshot(), {"balance": None, "balanceUpdatedAt": None, "low": False})
+
+        asyncio.run(cache.refresh())
+        self.assertEqual(cache.snapshot()["balance"], 5_000 / 10**9)
+        self.assertFalse(cache.snapshot()["low"])
+
+        # A failed refresh keeps serving the last known balance
+        updated_at = cache.updated_at
+        asyncio.run(cache.refresh())
+        self.assertEqual(cache.lamports, 5_000)
+        self.assertEqual(cache.updated_at, updated_at)
+
+        asyncio.run(cache.refresh())
+        self.assertTrue(cache.snapshot()["low"])
+
+    def test_interval_and_early_refresh(self):
+        fetch = StubBalance(1, 2, 3, 4)
+
+        async def run():
+            cache = BalanceCache(fetch, low_threshold=0, interval=0.1)
+            cache.start()
+            await asyncio.sleep(0.01)
+            self.assertEqual(cache.lamports, 1)
+
+            # Nothing new is fetched inside the interval...
+            await asyncio.sleep(0.03)
+            self.assertEqual(fetch.calls, 1)
+
+            # ...unless a payout or entry asks for it
+            cache.request_refresh()
+            await asyncio.sleep(0.01)
+            self.assertEqual(cache.lamports, 2)
+
+            # And the interval picks it up again after that
+            await asyncio.sleep(0.12)
+            self.assertEqual(cache.lamports, 3)
+            cache.stop()
+
+        asyncio.run(run())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import asyncio
+import json
+from backend.connection import ConnectionManager
+from fakes import FakeSocket
+
+class TestControlChannel(unittest.TestCase):
+    def test_controls_prefer_control_channel(self):
+        async def run():
+            manager = ConnectionManager()
+            video, control = FakeSocket(), FakeSocket()
+            await manager.connect(video, "pi")
+            await manager.broadcast_to_pi(b"\x7f" * 8)
+            await manager.connect(control, "pi-control")
+            await manager.broadcast_to_pi(b"\x80" * 8)
+
+            # Pi echoes the pings back on each socket
+            await asyncio.sleep(0)
+            for ws, handler in ((control, manager.process_pi_control_message), (video, manager.process_pi_message)):
+                ping = ws.of_type("ping")[0]
+                await handler(ws, {"text": json.dumps({"type": "pong", "t": ping["t"]})})
+
+            stats = manager.control_stats()
+            manager.disconnect(control, "pi-control")
+            await manager.broadcast_to_pi(b"\x00" * 8)
+            manager.disconnect(video, "pi")
+            manager.ping_task.cancel()
+            manager.game_engine_task.cancel()
+            return video, control, stats
+
+        video, control, stats = asyncio.run(run())
+        self.assertEqual(video.sent, [b"\x7f" * 8, b"\x00" * 8]) # Falls back when the channel closes
+        self.assertEqual(control.sent, [b"\x80" * 8])
+        self.assertEqual(stats["channel"], "dedicated")
+        self.assertEqual(stats["sent"], 2)
+        self.assertIsNotNone(stats["control_rtt"]["last_ms"])
+        self.assertIsNotNone(stats["video_rtt"]["last_ms"])
+
+if __name__ == '__main__':
+    unittest.main()
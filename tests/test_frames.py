@@ -0,0 +1,49 @@
+import unittest
+import struct
+from backend.frames import parse_frame, pack_detections, with_detections, SETTINGS, TIER_HIGH, TIER_LOW
+
+JPEG = b'\xff\xd8\xff\xe0fakejpeg'
+
+class TestFrameHeader(unittest.TestCase):
+    def test_legacy_frame(self):
+        data = struct.pack('<d', 1234.5) + JPEG
+        timestamp, meta, offset = parse_frame(data)
+        self.assertEqual(timestamp, 1234.5)
+        self.assertEqual(meta, {})
+        self.assertEqual(data[offset:], JPEG)
+
+    def test_settings_header(self):
+        ext = SETTINGS.pack(7, 40, 20, 480, 360) + bytes([TIER_LOW]) + pack_detections(3, []) + b'future'
+        data = struct.pack('<dB', 99.0, len(ext)) + ext + JPEG
+        timestamp, meta, offset = parse_frame(data)
+        self.assertEqual(meta, {
+            "seq": 7, "quality": 40, "fps": 20, "width": 480, "height": 360, "tier": TIER_LOW,
+            "detections": {"seq": 3, "items": []}
+        })
+        # Unknown trailing ext fields are skipped
+        self.assertEqual(data[offset:], JPEG)
+
+    def test_settings_without_tier(self):
+        # Pi clients from before simulcast only send the settings
+        ext = SETTINGS.pack(7, 40, 20, 480, 360)
+        _, meta, _ = parse_frame(struct.pack('<dB', 99.0, len(ext)) + ext + JPEG)
+        self.assertEqual(meta["tier"], TIER_HIGH)
+
+    def test_detections_block(self):
+        ext = SETTINGS.pack(12, 50, 30, 640, 480) + bytes([TIER_LOW])
+        data = struct.pack('<dB', 5.0, len(ext)) + ext + JPEG
+        _, meta, offset = parse_frame(data)
+
+        qr = {"text": "ENEMY_1", "bbox": [[10, 20], [110, 20], [110, 120], [-3, 120]]}
+        out = with_detections(data, meta, offset, pack_detections(9, [qr] * 20))
+        _, out_meta, out_offset = parse_frame(out)
+        self.assertEqual(out[out_offset:], JPEG)
+        self.assertEqual(out_meta["seq"], 12)
+        self.assertEqual(out_meta["tier"], TIER_LOW)
+        # Tagged with the frame CV ran on, and trimmed to fit the one-byte ext length
+        self.assertEqual(out_meta["detections"]["seq"], 9)
+        self.assertEqual(out_meta["detections"]["items"][0], qr)
+        self.assertLess(len(out_meta["detections"]["items"]), 20)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,13 @@
 import unittest
-import time
+import asyncio
 from backend.tracker import Tracker
-from backend.game import GameState
+from backend.game import GameState, build_enemy_index
+from backend.clock import VirtualClock
 
 class TestGameLogic(unittest.TestCase):
     def test_tracker_grace_period(self):
-        tracker = Tracker()
+        clock = VirtualClock()
+        tracker = Tracker(clock)
         
         # 1. Update with target
         dets = [{'text': 'ALPHA', 'bbox': [[300, 220], [340, 220], [340, 260], [300, 260]]}] # Centerish
@@ -16,12 +18,12 @@ class TestGameLogic(unittest.TestCase):
         self.assertEqual(active[0]['id'], 'ALPHA')
         
         # 2. Wait a bit (less than grace)
-        time.sleep(0.1)
+        asyncio.run(clock.advance(0.1))
         active = tracker.get_active_targets()
         self.assertEqual(len(active), 1)
         
         # 3. Wait more (exceed grace 0.5s)
-        time.sleep(0.6)
+        asyncio.run(clock.advance(0.6))
         active = tracker.get_active_targets()
         self.assertEqual(len(active), 0)
         
@@ -73,5 +75,18 @@ class TestGameLogic(unittest.TestCase):
         self.assertIn('ALPHA', result['hits']) # Should return the ID "ALPHA"
         self.assertLess(game.enemies[0]['hp'], initial_hp)
 
+    def test_enemy_index_variants(self):
+        game = GameState()
+        game.init_game("Tester", "casual", "vanguard")
+
+        # Callsign, enemy_N and case variants all resolve to the same slot
+        for marker in ('BRAVO', 'bravo', 'enemy_2', 'ENEMY_2', 'eNeMy_2'):
+            self.assertIs(game.resolve_enemy(marker), game.enemies[1])
+        self.assertIsNone(game.resolve_enemy('enemy_7'))
+        self.assertIsNone(game.resolve_enemy('GOLF'))
+
+        index = build_enemy_index(["ALPHA", "BRAVO"], {"B": "BRAVO"})
+        self.assertEqual(index["b"], 1)
+
 if __name__ == '__main__':
     unittest.main()
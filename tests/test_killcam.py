@@ -0,0 +1,45 @@
+import unittest
+import struct
+from backend.killcam import KillCam, CLIP_MAGIC
+
+class TestKillCam(unittest.TestCase):
+    def test_window_and_fps(self):
+        cam = KillCam(seconds=1.0, fps=10)
+        for i in range(30):
+            cam.add(bytes([i]) * 10, now=i * 0.05) # 20fps in, 10fps kept
+        stats = cam.stats()
+        # 1.5s fed at 10fps kept -> only the last second (11 frames) stays
+        self.assertEqual(stats["buffered_frames"], 11)
+        self.assertEqual(stats["buffered_bytes"], 110)
+        self.assertEqual(cam.frames[-1][1], bytes([28]) * 10)
+
+    def test_byte_cap(self):
+        cam = KillCam(seconds=10.0, fps=100, max_bytes=250)
+        for i in range(10):
+            cam.add(b"x" * 100, now=i * 0.1)
+        self.assertEqual(cam.stats()["buffered_frames"], 2)
+        self.assertLessEqual(cam.stats()["buffered_bytes"], 250)
+        self.assertEqual(cam.stats()["evicted"], 8)
+
+    def test_clip_layout(self):
+        cam = KillCam(keep=2)
+        self.assertIsNone(cam.finish()) # Nothing buffered, no clip
+        cam.add(b"one", now=0.0)
+        cam.add(b"three", now=1.0)
+        clip_id = cam.finish()
+        self.assertEqual(cam.stats()["buffered_frames"], 0)
+
+        clip = cam.clip(clip_id)
+        magic, count = struct.unpack_from('<4sH', clip)
+        self.assertEqual((magic, count), (CLIP_MAGIC, 2))
+        self.assertEqual(clip[6:], struct.pack('<I', 3) + b"one" + struct.pack('<I', 5) + b"three")
+
+        # Only the newest clips are kept
+        for i in range(2):
+            cam.add(b"more", now=10.0 + i)
+            cam.finish()
+        self.assertIsNone(cam.clip(clip_id))
+        self.assertEqual(cam.stats()["clips"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
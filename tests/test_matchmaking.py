@@ -0,0 +1,101 @@
+import unittest
+import asyncio
+from unittest import mock
+from backend.connection import ConnectionManager, PRECONFIRM_WINDOW
+from backend.ranked import PAYOUT_AMOUNT, WIN_THRESHOLD
+from fakes import FakeSocket
+
+class TestPipelinedMatchmaking(unittest.TestCase):
+    @mock.patch("backend.connection.save_leaderboard")
+    def test_next_player_confirmed_during_game(self, _save):
+        async def run():
+            manager = ConnectionManager()
+            first, second = FakeSocket(), FakeSocket()
+            await manager.connect(first, "client")
+            await manager.connect(second, "client")
+
+            await manager.join_queue(first, "First")
+            await manager.confirm_match(first, {"id": "vanguard"})
+            self.assertEqual(manager.current_player_ws, first)
+
+            # Early in the game nobody is prompted yet
+            await manager.join_queue(second, "Second")
+            self.assertFalse(second.got("match_found"))
+
+            # Last stretch of the game: second player confirms while first still plays
+            manager.game_state.start_time -= manager.game_state.game_duration - PRECONFIRM_WINDOW
+            await manager.try_start_next_game()
+            self.assertTrue(second.got("match_found"))
+            await manager.confirm_match(second, {"id": "vanguard"})
+            self.assertEqual(manager.current_player_ws, first)
+
+            # Game over hands straight over
+            await manager.end_game()
+            self.assertTrue(first.got("game_over"))
+            self.assertEqual(manager.current_player_ws, second)
+            self.assertEqual(manager.game_state.player_name, "Second")
+            return manager.arena.snapshot()
+
+        stats = asyncio.run(run())
+        self.assertEqual(stats["games"], 2)
+        self.assertEqual(stats["preconfirmed"], 1)
+        self.assertLess(stats["handoff_ms"], 500)
+
+    @mock.patch("backend.connection.save_leaderboard")
+    def test_game_over_runs_on_engine(self, _save):
+        async def run():
+            manager = ConnectionManager()
+            first, second = FakeSocket(), FakeSocket()
+            await manager.connect(first, "client")
+            await manager.connect(second, "client")
+            await manager.join_queue(first, "First")
+            await manager.confirm_match(first, {"id": "vanguard"})
+            manager.game_state.start_time -= manager.game_state.game_duration - PRECONFIRM_WINDOW
+            await manager.join_queue(second, "Second")
+            await manager.confirm_match(second, {"id": "vanguard"})
+
+            # Time runs out and the player drops in the same moment: both queue a game over
+            manager.game_state.start_time -= PRECONFIRM_WINDOW
+            await manager.broadcast_game_update()
+            manager.disconnect(first, "client")
+            self.assertEqual(manager.game_state.player_name, "First") # Nothing ran inline
+
+            while not manager.game_events.empty():
+                await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            # The second game over was for First's game, so Second keeps playing
+            self.assertTrue(manager.game_state.is_active)
+            self.assertEqual(manager.game_state.player_name, "Second")
+            self.assertEqual(manager.current_player_ws, second)
+            manager.game_engine_task.cancel()
+
+        asyncio.run(run())
+
+    @mock.patch("backend.connection.save_leaderboard")
+    @mock.patch("backend.connection.payouts.record_payout")
+    @mock.patch("backend.connection.ranked.solana", side_effect=RuntimeError("no solana"))
+    @mock.patch("backend.connection.ranked.is_loaded", return_value=False)
+    def test_ranked_win_survives_missing_stack(self, _loaded, _solana, record, _save):
+        async def run():
+            manager = ConnectionManager()
+            first, second = FakeSocket(), FakeSocket()
+            await manager.connect(first, "client")
+            await manager.connect(second, "client")
+            await manager.join_queue(first, "First")
+            await manager.confirm_match(first, {"id": "vanguard"})
+            await manager.join_queue(second, "Second")
+            manager.game_state.is_ranked = True
+            manager.game_state.player_key = "winner"
+            manager.game_state.score = WIN_THRESHOLD
+
+            # Game over isn't held up or cut short by the payout
+            await manager.end_game()
+            self.assertTrue(first.got("game_over"))
+            self.assertTrue(second.got("match_found"))
+            await asyncio.sleep(0.1)
+
+        asyncio.run(run())
+        record.assert_called_once_with("winner", PAYOUT_AMOUNT)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+import asyncio
+import os
+import tempfile
+from backend.payouts import PayoutService, record_payout
+
+class StubRpc:
+    """Local stand-in for the Solana RPC used by PayoutService."""
+    def __init__(self):
+        self.blockhash_calls = 0
+        self.built = 0
+        self.sent = []
+        self.fail_sends = 0
+        self.statuses = {}
+        self.height = 1000
+
+    async def latest_blockhash(self):
+        self.blockhash_calls += 1
+        return f"hash{self.blockhash_calls}", self.height + 150
+
+    async def block_height(self):
+        return self.height
+
+    def build_transfers(self, transfers, blockhash):
+        self.built += 1
+        return {"transfers": list(transfers), "blockhash": blockhash, "signature": f"sig{self.built}"}
+
+    def signature_of(self, tx):
+        return tx["signature"]
+
+    async def send(self, tx):
+        self.sent.append(tx)
+        if self.fail_sends:
+            self.fail_sends -= 1
+            raise ConnectionError("rpc timed out")
+        return tx["signature"]
+
+    async def signature_statuses(self, signatures):
+        return [self.statuses.get(s) for s in signatures]
+
+class TestPayoutService(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "payouts.json")
+        self.rpc = StubRpc()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_batches_and_confirms(self):
+        service = PayoutService(self.rpc, path=self.path)
+        service.submit("winner1", 100)
+        service.submit("winner2", 200)
+
+        asyncio.run(service.process_once())
+        self.assertEqual(len(self.rpc.sent), 1) # Both winners in one transaction
+        self.assertEqual(self.rpc.sent[0]["transfers"], [("winner1", 100), ("winner2", 200)])
+
+        # Blockhash is cached for the next send
+        service.submit("winner3", 300)
+        asyncio.run(service.process_once())
+        self.assertEqual(self.rpc.blockhash_calls, 1)
+
+        self.rpc.statuses = {"sig1": "confirmed", "sig2": "confirmed"}
+        asyncio.run(service.process_once())
+        self.assertEqual(service.pending, [])
+        self.assertEqual(service.paid, 3)
+
+    def test_retry_and_persistence(self):
+        service = PayoutService(self.rpc, path=self.path)
+        self.rpc.fail_sends = 1
+        entry = service.submit("winner1", 100)
+
+        # The send errored but may have landed: keep watching it, don't build another
+        asyncio.run(service.process_once())
+        self.assertEqual(entry["status"], "sent")
+        self.assertEqual(entry["signature"], "sig1")
+        asyncio.run(service.process_once())
+        self.assertEqual(self.rpc.built, 1)
+
+        # Saved before the send, so a restart checks that signature too
+        restarted = PayoutService(self.rpc, path=self.path)
+        self.assertEqual(restarted.pending[0]["signature"], "sig1")
+
+        # Never showed up and the chain is past its last valid height: now it's safe to resend
+        self.rpc.height += 151
+        asyncio.run(restarted.process_once())
+        self.assertEqual(restarted.pending[0]["status"], "pending")
+        self.assertEqual(restarted.pending[0]["attempts"], 1)
+        restarted.pending[0]["next_try"] = 0
+        asyncio.run(restarted.process_once())
+        self.assertEqual(restarted.pending[0]["status"], "sent")
+        self.assertEqual(restarted.pending[0]["signature"], "sig2")
+
+    def test_not_found_is_not_resent_while_blockhash_valid(self):
+        service = PayoutService(self.rpc, path=self.path)
+        entry = service.submit("winner1", 100)
+        asyncio.run(service.process_once())
+
+        # Long past the blockhash TTL by the wall clock (e.g. restarted much later), but
+        # the chain hasn't reached its last valid height, so it could still land
+        entry["sent_at"] -= service.blockhashes.ttl * 10
+        self.rpc.height += 150
+        asyncio.run(service.process_once())
+        self.assertEqual(entry["status"], "sent")
+        self.assertEqual(self.rpc.built, 1)
+
+        self.rpc.statuses = {"sig1": "confirmed"}
+        asyncio.run(service.process_once())
+        self.assertEqual(service.paid, 1)
+        self.assertEqual(self.rpc.built, 1)
+
+    def test_failed_send_that_landed_pays_once(self):
+        service = PayoutService(self.rpc, path=self.path)
+        self.rpc.fail_sends = 1
+        service.submit("winner1", 100)
+        asyncio.run(service.process_once())
+
+        self.rpc.statuses = {"sig1": "confirmed"}
+        asyncio.run(service.process_once())
+        self.assertEqual(service.pending, [])
+        self.assertEqual(service.paid, 1)
+        self.assertEqual(self.rpc.built, 1)
+
+    def test_recorded_payout_is_paid_on_start(self):
+        # Written while the Solana stack couldn't load
+        record_payout("winner1", 100, path=self.path)
+        service = PayoutService(self.rpc, path=self.path)
+        asyncio.run(service.process_once())
+        self.assertEqual(self.rpc.sent[0]["transfers"], [("winner1", 100)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,265 @@
+import unittest
+import asyncio
+import io
+import threading
+import time
+import cv2
+import numpy as np
+from pi_client import (
+    LatestSlot, AdaptiveController, UPGRADE_AFTER, WIDTHS,
+    QUALITY_MIN, QUALITY_MAX, FPS_MIN, FPS_MAX,
+    FrameConverter, FMT_NV12, FMT_RGBA, FMT_RGB, FMT_BGRA,
+    FramePool, read_exact, StreamDemand, schedule,
+    SerialLink, NEUTRAL_PACKET
+)
+from serial_protocol import PAYLOAD_LEN
+
+CONGESTED = {"backlog_ms": 400, "drop_rate": 0.5}
+HEALTHY = {"backlog_ms": 20, "drop_rate": 0.0}
+MARGINAL = {"backlog_ms": 100, "drop_rate": 0.0} # Under target but not healthy
+
+class TestLatestSlot(unittest.TestCase):
+    def test_keeps_newest_and_counts_drops(self):
+        slot = LatestSlot()
+        self.assertIsNone(slot.put("a"))
+        self.assertEqual(slot.put("b"), "a") # Handed back so its buffer can be recycled
+        self.assertEqual(slot.put("c"), "b")
+        self.assertEqual(slot.dropped, 2)
+        self.assertEqual(slot.get(timeout=0), "c")
+        self.assertIsNone(slot.take())
+
+    def test_close_unblocks_thread_consumer(self):
+        slot = LatestSlot()
+        threading.Timer(0.05, slot.close).start()
+        t0 = time.perf_counter()
+        self.assertIsNone(slot.get(timeout=5))
+        self.assertLess(time.perf_counter() - t0, 1)
+
+    def test_close_unblocks_async_consumer(self):
+        async def run():
+            slot = LatestSlot()
+            slot.bind_loop(asyncio.get_running_loop())
+            threading.Timer(0.05, slot.close).start()
+            return await asyncio.wait_for(slot.get_async(), timeout=1)
+
+        self.assertIsNone(asyncio.run(run()))
+
+class TestAdaptiveController(unittest.TestCase):
+    def test_degrades_to_the_floor_and_no_further(self):
+        abr = AdaptiveController()
+        for _ in range(50):
+            abr.on_feedback(CONGESTED)
+        self.assertEqual(abr.settings(), (QUALITY_MIN, WIDTHS[-1], FPS_MIN))
+
+    def test_step_down_order(self):
+        abr = AdaptiveController()
+        start_quality = abr.quality
+        abr.on_feedback(CONGESTED)
+        # Quality goes first, resolution and frame rate are kept
+        self.assertLess(abr.quality, start_quality)
+        self.assertEqual((abr.width, abr.fps), (WIDTHS[0], FPS_MAX))
+
+    def test_steps_up_only_after_stable_window(self):
+        abr = AdaptiveController()
+        abr.on_feedback(CONGESTED)
+        degraded = abr.settings()
+        for _ in range(UPGRADE_AFTER - 1):
+            abr.on_feedback(HEALTHY)
+        self.assertEqual(abr.settings(), degraded)
+
+        # A marginal report doesn't count towards the window but doesn't reset it either
+        abr.on_feedback(MARGINAL)
+        self.assertEqual(abr.settings(), degraded)
+        abr.on_feedback(HEALTHY)
+        self.assertNotEqual(abr.settings(), degraded)
+
+    def test_congestion_resets_the_window(self):
+        abr = AdaptiveController()
+        abr.on_feedback(CONGESTED)
+        for _ in range(UPGRADE_AFTER - 1):
+            abr.on_feedback(HEALTHY)
+        abr.on_feedback(CONGESTED)
+        degraded = abr.settings()
+        for _ in range(UPGRADE_AFTER - 1):
+            abr.on_feedback(HEALTHY)
+        self.assertEqual(abr.settings(), degraded)
+
+    def test_recovers_to_the_max_and_no_further(self):
+        abr = AdaptiveController()
+        for _ in range(50):
+            abr.on_feedback(CONGESTED)
+        for _ in range(50 * UPGRADE_AFTER):
+            abr.on_feedback(HEALTHY)
+        self.assertEqual(abr.settings(), (QUALITY_MAX, WIDTHS[0], FPS_MAX))
+
+def gradient(width, height, channels):
+    """Smooth synthetic frame, so resampling differences stay small."""
+    y, x = np.mgrid[0:height, 0:width]
+    planes = [x * 255 // width, y * 255 // height, (x + y) * 255 // (width + height), np.full((height, width), 255)]
+    return np.dstack(planes[:channels]).astype(np.uint8)
+
+def nv12(bgr):
+    height, width = bgr.shape[:2]
+    i420 = cv2.cvtColor(bgr, cv2.COLOR_BGR2YUV_I420)
+    u = i420[height:height + height // 4].reshape(height // 2, width // 2)
+    v = i420[height + height // 4:].reshape(height // 2, width // 2)
+    return np.vstack([i420[:height], np.dstack([u, v]).reshape(height // 2, width)])
+
+class TestFrameConverter(unittest.TestCase):
+    def test_matches_convert_then_resize(self):
+        width, height = 160, 120
+        # Same table as bench_convert: the old path converted at full size, then resized
+        old_codes = {FMT_NV12: cv2.COLOR_YUV2BGR_NV12, FMT_RGBA: cv2.COLOR_RGBA2BGR, FMT_BGRA: cv2.COLOR_BGRA2BGR, FMT_RGB: None}
+        for fmt, code in old_codes.items():
+            if fmt == FMT_NV12:
+                raw = nv12(gradient(width, height, 3))
+            else:
+                raw = gradient(width, height, 4 if code else 3)
+            for target in (80, 120, 160):
+                with self.subTest(fmt=fmt, target=target):
+                    old = cv2.cvtColor(raw, code) if code else raw
+                    if old.shape[1] > target:
+                        old = cv2.resize(old, (target, int(old.shape[0] * target / old.shape[1])))
+
+                    new = FrameConverter(fmt, width, height, target)(raw.tobytes(), raw.size)
+                    self.assertEqual(new.shape, old.shape)
+                    self.assertLess(np.abs(new.astype(int) - old.astype(int)).mean(), 1.5)
+
+    def test_rejects_wrong_size(self):
+        self.assertIsNone(FrameConverter(FMT_RGB, 160, 120, 80)(bytes(100), 100))
+
+class ChunkedStream(io.BytesIO):
+    """Pipe-like reader that hands back at most a few bytes per readinto."""
+    def readinto(self, b):
+        return super().readinto(memoryview(b)[:5])
+
+class TestFramePool(unittest.TestCase):
+    def test_readinto_reuses_buffers(self):
+        pool = FramePool(count=2)
+        stream = ChunkedStream(b"frame-one!" + b"frame-two!" + b"short")
+
+        buf = pool.acquire(10)
+        self.assertTrue(read_exact(stream, memoryview(buf)))
+        self.assertEqual(bytes(buf), b"frame-one!")
+        pool.release(buf)
+
+        again = pool.acquire(10)
+        self.assertIs(again, buf)
+        self.assertTrue(read_exact(stream, memoryview(again)))
+        self.assertEqual(bytes(again), b"frame-two!")
+        self.assertFalse(read_exact(stream, memoryview(again))) # EOF mid-frame
+        self.assertEqual(pool.extra_allocs, 0)
+
+    def test_buffer_in_use_is_not_handed_out(self):
+        pool = FramePool(count=2)
+        held = [pool.acquire(10), pool.acquire(10)]
+        extra = pool.acquire(10) # Pool is dry: a fresh buffer, never one still held
+        self.assertEqual(pool.extra_allocs, 1)
+        self.assertFalse(any(extra is b for b in held))
+
+        # Released twice (dropped and encoded), still only goes out once
+        pool.release(held[0])
+        pool.release(held[0])
+        first, second = pool.acquire(10), pool.acquire(10)
+        self.assertIs(first, held[0])
+        self.assertIsNot(second, held[0])
+
+    def test_size_change_drops_old_buffers(self):
+        pool = FramePool(count=2)
+        old = pool.acquire(10)
+        self.assertEqual(len(pool.acquire(20)), 20)
+        pool.release(old)
+        self.assertFalse(any(b is old for b in pool.free))
+
+class TestStreamDemand(unittest.TestCase):
+    def test_plan_table(self):
+        # (messages from the server, expected (force, fps) when the encoder wants 30fps)
+        cases = [
+            ([], (False, 30)),
+            ([{"mode": "full"}], (False, 30)),
+            ([{"mode": "reduced", "max_fps": 10}], (False, 10)),
+            ([{"mode": "reduced", "max_fps": 60}], (False, 30)), # Never above what ABR allows
+            ([{"mode": "reduced"}], (False, 30)),
+            ([{"mode": "keyframe", "interval": 2}], (False, 0.5)),
+            ([{"mode": "keyframe"}], (False, 0.2)),
+            ([{"mode": "paused"}], (False, None)),
+            ([{"type": "keyframe"}], (True, 30)),
+            ([{"mode": "paused"}, {"type": "keyframe"}], (True, None)),
+            ([{"mode": "paused"}, {"mode": "reduced", "max_fps": 10}], (True, 10)), # Resume
+            ([{"mode": "paused"}, {"mode": "paused"}], (False, None)),
+        ]
+        for messages, expected in cases:
+            with self.subTest(messages=messages):
+                demand = StreamDemand()
+                for msg in messages:
+                    demand.on_message(msg)
+                self.assertEqual(demand.plan(30), expected)
+
+    def test_forced_keyframe_is_one_shot(self):
+        demand = StreamDemand()
+        demand.on_message({"type": "keyframe"})
+        self.assertEqual(demand.plan(30), (True, 30))
+        self.assertEqual(demand.plan(30), (False, 30))
+
+    def test_schedule_caps_rate(self):
+        due = schedule(100.05, 100.0, 10)
+        self.assertAlmostEqual(due, 100.1)
+        self.assertIsNone(schedule(100.06, due, 10)) # Too early
+        self.assertAlmostEqual(schedule(100.08, due, 10), 100.2) # Within the jitter slack
+        self.assertAlmostEqual(schedule(105.0, due, 10), 105.0) # Long gap doesn't bank frames
+
+class FakeSerial:
+    """Records written command payloads; never acks."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.payloads = []
+        self.in_waiting = 0
+
+    def write(self, data):
+        with self.lock:
+            self.payloads.append(bytes(data[2:2 + PAYLOAD_LEN]))
+
+    def flush(self):
+        pass
+
+    def read(self, n):
+        time.sleep(0.01)
+        return b""
+
+    def written(self):
+        with self.lock:
+            return list(self.payloads)
+
+class TestSerialLink(unittest.TestCase):
+    def setUp(self):
+        self.ser = FakeSerial()
+        self.link = SerialLink(self.ser, min_interval=0.001, keepalive=0.02, stale=0.1)
+        self.link.start()
+        self.addCleanup(self.link.stop)
+
+    def test_keepalive_while_commands_arrive(self):
+        drive = bytes([5] * 8)
+        for _ in range(10):
+            self.link.update(drive) # Same command repeated, as the controller sends it
+            time.sleep(0.03)
+        written = self.ser.written()
+        self.assertNotIn(NEUTRAL_PACKET, written)
+        self.assertGreater(written.count(drive), 5)
+
+    def test_stalled_commands_go_neutral_once(self):
+        drive = bytes([5] * 8)
+        self.link.update(drive)
+        time.sleep(0.4)
+        written = self.ser.written()
+        # A few keepalives inside the window, then one neutral and nothing more
+        self.assertLessEqual(written.count(drive), 0.1 / 0.02 + 2)
+        self.assertEqual(written[-1], NEUTRAL_PACKET)
+        self.assertEqual(written.count(NEUTRAL_PACKET), 1)
+
+        # Commands resume
+        self.link.update(drive)
+        time.sleep(0.05)
+        self.assertEqual(self.ser.written()[-1], drive)
+
+if __name__ == '__main__':
+    unittest.main()
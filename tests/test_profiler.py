@@ -0,0 +1,47 @@
+import unittest
+import asyncio
+import time
+from unittest import mock
+from backend.connection import ConnectionManager
+from backend.profiler import Profiler, check_admin
+
+class TestProfiler(unittest.TestCase):
+    def test_profile_window(self):
+        async def run():
+            manager = ConnectionManager()
+            profiler = Profiler()
+
+            async def busy():
+                # Blocks the loop: shows up in the samples and as slow calls
+                while True:
+                    await manager.broadcast_game_update()
+                    time.sleep(0.06)
+                    await asyncio.sleep(0)
+
+            task = asyncio.create_task(busy())
+            result = await profiler.profile(manager, 0.3)
+            task.cancel()
+            return manager, result
+
+        manager, result = asyncio.run(run())
+        self.assertGreater(result["samples"], 0)
+        for line in result["collapsed"].splitlines():
+            stack, count = line.rsplit(" ", 1)
+            self.assertTrue(count.isdigit())
+        self.assertIn("busy (test_profiler.py", result["collapsed"])
+        self.assertGreater(result["handlers"]["broadcast_game_update"]["calls"], 0)
+        self.assertTrue(result["slow_callbacks"]["events"])
+        # Nothing left installed once the window ends
+        self.assertNotIn("broadcast_game_update", manager.__dict__)
+
+    def test_admin_token(self):
+        with mock.patch.dict("os.environ", {}, clear=True):
+            self.assertFalse(check_admin("anything"))
+        with mock.patch.dict("os.environ", {"ADMIN_TOKEN": "s3cret"}):
+            self.assertFalse(check_admin(None))
+            self.assertFalse(check_admin("wrong"))
+            self.assertFalse(check_admin("s3crét"))
+            self.assertTrue(check_admin("s3cret"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+import os
+import tempfile
+from backend import recorder
+from backend.recorder import Recorder, read_records
+
+class TestRecorder(unittest.TestCase):
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "session.rec")
+            rec = Recorder(path)
+            player = object()
+            rec.record(recorder.CONNECT, b"", player)
+            rec.record(recorder.FRAME, b"\x00" * 8 + b"\xff\xd8jpeg")
+            rec.record(recorder.CONTROL, bytes(8), player)
+            rec.record_json(recorder.CV, {"seq": 3, "results": []})
+            rec.disconnected(player)
+            rec.close()
+
+            records = list(read_records(path))
+            self.assertEqual([r[0] for r in records], [recorder.CONNECT, recorder.FRAME, recorder.CONTROL, recorder.CV, recorder.DISCONNECT])
+            self.assertEqual(records[2][1], records[0][1]) # Same client id throughout
+            self.assertEqual(records[1][1], 0) # Pi frames have no client
+            self.assertEqual(records[3][3], b'{"seq":3,"results":[]}')
+            self.assertEqual(sorted(r[2] for r in records), [r[2] for r in records])
+
+            # A recording cut off mid-record (server killed) still reads up to the cut
+            with open(path, "r+b") as f:
+                f.truncate(os.path.getsize(path) - 3)
+            self.assertEqual(len(list(read_records(path))), 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import asyncio
+import json
+from backend.relay import VideoRelay
+from backend.frames import TIER_HIGH, TIER_LOW
+from fakes import FakeSocket
+
+class TestSimulcastRouting(unittest.TestCase):
+    def test_tiers(self):
+        async def run():
+            relay = VideoRelay()
+            player, spectator, upgraded = FakeSocket(), FakeSocket(), FakeSocket()
+            for ws in (player, spectator, upgraded):
+                relay.add(ws)
+            relay.set_player(player)
+            relay.set_wants_high(upgraded, True)
+
+            # No low tier from the Pi yet: everyone gets the full stream
+            relay.relay(b"high1", TIER_HIGH)
+            await asyncio.sleep(0)
+            relay.relay(b"low1", TIER_LOW)
+            relay.relay(b"high2", TIER_HIGH)
+            await asyncio.sleep(0)
+            return relay, player, spectator, upgraded
+
+        relay, player, spectator, upgraded = asyncio.run(run())
+        self.assertEqual(player.sent, [b"high1", b"high2"])
+        self.assertEqual(upgraded.sent, [b"high1", b"high2"])
+        self.assertEqual(spectator.sent, [b"high1", b"low1"])
+        self.assertEqual(relay.feedback()["low_clients"], 1)
+
+class TestClientDecodeStats(unittest.TestCase):
+    def test_reports_aggregate(self):
+        relay = VideoRelay()
+        a, b, silent = FakeSocket(), FakeSocket(), FakeSocket()
+        for ws in (a, b, silent):
+            relay.add(ws)
+        relay.set_client_stats(a, {"decoded": 100, "dropped": 4, "decode_ms": 3.0, "decode_p95_ms": 6.5, "worker": True})
+        relay.set_client_stats(b, {"decoded": 50, "dropped": 10, "decode_ms": 9.0, "decode_p95_ms": 20.0, "worker": False})
+        relay.set_client_stats(silent, {"decoded": "lots"}) # Ignored
+        relay.set_client_stats(silent, {"decoded": 1, "decode_ms": "nan"})
+        relay.set_client_stats(silent, {"decoded": 1, "decode_p95_ms": "inf"})
+
+        stats = relay.stats()["client_decode"]
+        self.assertEqual(stats, {"reporting": 2, "worker": 1, "decoded": 150, "dropped": 14,
+                                 "decode_ms": 6.0, "decode_p95_ms": 20.0})
+        json.dumps(relay.stats(), allow_nan=False)
+
+        # Out-of-range numbers are clamped
+        relay.set_client_stats(silent, {"decoded": 1e300, "dropped": -5, "decode_ms": 1e9})
+        self.assertEqual(relay.streams[silent].client_stats["decoded"], 1e9)
+        self.assertEqual(relay.streams[silent].client_stats["dropped"], 0)
+        self.assertEqual(relay.streams[silent].client_stats["decode_ms"], 10_000)
+
+if __name__ == '__main__':
+    unittest.main()
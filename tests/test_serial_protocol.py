@@ -0,0 +1,55 @@
+import unittest
+import os
+import select
+import time
+from serial_protocol import (
+    FrameParser, encode_command, encode_ack, decode_ack,
+    CMD_SYNC, CMD_LEN, ACK_SYNC, ACK_LEN, ACK_FLAG_FAILSAFE
+)
+from arduino_emulator import ArduinoEmulator
+
+class TestSerialProtocol(unittest.TestCase):
+    def test_resync_and_checksum(self):
+        parser = FrameParser(CMD_SYNC, CMD_LEN)
+        good = encode_command(7, bytes(range(8)))
+        corrupt = bytearray(encode_command(8, bytes(8)))
+        corrupt[5] ^= 0xFF
+
+        # Noise, a corrupt frame, then a good frame split across two reads
+        frames = parser.feed(b'\x00\x13' + bytes(corrupt) + good[:4])
+        frames += parser.feed(good[4:])
+        self.assertEqual(frames, [good])
+        self.assertEqual(parser.errors, 1)
+
+    def test_ack_round_trip(self):
+        parser = FrameParser(ACK_SYNC, ACK_LEN)
+        frames = parser.feed(encode_ack(200, ACK_FLAG_FAILSAFE, 70000))
+        self.assertEqual(decode_ack(frames[0]), (200, ACK_FLAG_FAILSAFE, 0xFFFF))
+
+    def test_emulator_acks_and_failsafe(self):
+        emu = ArduinoEmulator(failsafe_ms=100).start()
+        try:
+            os.write(emu.slave, encode_command(1, bytes([5, 0xFB, 0, 0, 0, 0, 0x01, 0x02])))
+            parser = FrameParser(ACK_SYNC, ACK_LEN)
+            acks = []
+            deadline = time.time() + 2
+            while not acks and time.time() < deadline:
+                if select.select([emu.slave], [], [], 0.1)[0]:
+                    acks = parser.feed(os.read(emu.slave, 64))
+
+            seq, flags, _ = decode_ack(acks[0])
+            self.assertEqual(seq, 1)
+            self.assertTrue(flags & ACK_FLAG_FAILSAFE) # First command after boot
+            self.assertEqual(emu.state["lx"], 5)
+            self.assertEqual(emu.state["ly"], -5)
+            self.assertEqual(emu.state["buttons"], 0x0102)
+
+            # No keepalive -> emulator stops the motors
+            time.sleep(0.3)
+            self.assertTrue(emu.failsafe)
+            self.assertEqual(emu.state["lx"], 0)
+        finally:
+            emu.stop()
+
+if __name__ == '__main__':
+    unittest.main()
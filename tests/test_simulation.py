@@ -0,0 +1,49 @@
+import unittest
+import asyncio
+import time
+from unittest import mock
+from backend.clock import VirtualClock
+from backend.connection import ConnectionManager, TIMEOUT_CONFIRMATION
+from fakes import FakeSocket
+
+TARGET = [{'text': 'ALPHA', 'bbox': [[300, 220], [340, 220], [340, 260], [300, 260]]}]
+
+class TestVirtualClockSimulation(unittest.TestCase):
+    @mock.patch("backend.connection.save_leaderboard")
+    def test_full_game_and_timeout(self, _save):
+        async def run():
+            clock = VirtualClock()
+            manager = ConnectionManager(clock=clock)
+            player, late = FakeSocket(), FakeSocket()
+            await manager.connect(player, "client")
+            await manager.connect(late, "client")
+            await manager.join_queue(player, "Sim")
+            await manager.confirm_match(player, {"id": "vanguard"})
+            await manager.join_queue(late, "Late")
+
+            # Cooldown (0.5s for vanguard) runs on the virtual clock too
+            manager.game_state.tracker.update(TARGET)
+            self.assertTrue(manager.game_state.attempt_shot()["fired"])
+            self.assertFalse(manager.game_state.attempt_shot()["fired"])
+            await clock.advance(0.5)
+            manager.game_state.tracker.update(TARGET)
+            self.assertEqual(manager.game_state.attempt_shot()["hits"], ["ALPHA"])
+
+            # Whole 60s game: the timer ends it, "Late" is prompted on the way
+            await clock.advance(manager.game_state.game_duration + 1)
+            self.assertTrue(player.got("game_over"))
+            self.assertTrue(late.got("match_found"))
+
+            # ...and never answers
+            await clock.advance(TIMEOUT_CONFIRMATION)
+            self.assertTrue(late.got("match_timeout"))
+            self.assertIsNone(manager.confirming_player_ws)
+            return manager.arena.snapshot()
+
+        started = time.perf_counter()
+        stats = asyncio.run(run())
+        self.assertEqual(stats["games"], 1)
+        self.assertLess(time.perf_counter() - started, 2) # 3 simulated minutes
+
+if __name__ == '__main__':
+    unittest.main()
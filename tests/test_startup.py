@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHECK = """
+import asyncio, sys
+import server
+before = [m for m in ("cv2", "solana", "solders") if m in sys.modules]
+asyncio.run(server.warm_up())
+after = [m for m in ("solana", "solders") if m in sys.modules]
+print(before, after)
+"""
+
+class TestCasualStartup(unittest.TestCase):
+    def test_casual_only_skips_heavy_imports(self):
+        # Fresh interpreter, since other tests may already have imported these
+        env = dict(os.environ, RANKED_ENABLED="0", ARENA_STATE="", PYTHONPATH=ROOT)
+        with tempfile.TemporaryDirectory() as cwd:
+            out = subprocess.run([sys.executable, "-c", CHECK], cwd=cwd, env=env,
+                                 capture_output=True, text=True, timeout=60)
+        self.assertEqual(out.returncode, 0, out.stderr)
+        # Nothing heavy at import; warm-up brings in OpenCV but never the Solana stack
+        self.assertEqual(out.stdout.strip().splitlines()[-1], "[] []")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import asyncio
+import os
+import tempfile
+from unittest import mock
+from backend.clock import VirtualClock
+from backend.connection import ConnectionManager, RECONNECT_GRACE
+from backend.state_store import StateStore
+from fakes import FakeSocket
+
+class TestStateStore(unittest.TestCase):
+    def test_snapshot_and_journal(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "state")
+            store = StateStore(path)
+            store.load()
+            self.assertTrue(store.update("game", {"score": 1}))
+            self.assertFalse(store.update("game", {"score": 1})) # Unchanged, not journaled
+            store.write_snapshot()
+            store.update("game", {"score": 2})
+            store.update("queue", {"waiting": []})
+
+            # A crash after the snapshot leaves journal lines it already contains
+            with open(store.journal_path, "a") as f:
+                f.write('{"seq": 1, "t": 0, "section": "game", "value": {"score": 1}}\n')
+                f.write('{"seq": 99, "t": 0, "sec') # Torn line
+
+            reloaded = StateStore(path)
+            self.assertEqual(reloaded.load(), {"game": {"score": 2}, "queue": {"waiting": []}})
+            self.assertEqual(reloaded.journal_lines, 0) # Folded into a fresh snapshot
+            reloaded.close()
+            store.close()
+
+class TestRestart(unittest.TestCase):
+    @mock.patch("backend.connection.save_leaderboard")
+    def test_game_and_queue_survive_restart(self, _save):
+        async def run(path):
+            clock = VirtualClock()
+            before = ConnectionManager(clock=clock, state_path=path)
+            await before.restore_state()
+            player, waiting = FakeSocket(), FakeSocket()
+            await before.connect(player, "client", "tok-player")
+            await before.connect(waiting, "client", "tok-waiting")
+            await before.join_queue(player, "Ace")
+            await before.confirm_match(player, {"id": "juggernaut"})
+            await before.join_queue(waiting, "Next")
+            before.game_state.score = 300
+            before.game_state.ammo = 7
+            before.game_state.enemies[0]["hp"] = 5
+            await before.broadcast_game_update()
+            # Process dies here: no close(), no disconnects
+
+            after = ConnectionManager(clock=clock, state_path=path)
+            await after.restore_state()
+            self.assertTrue(after.game_state.is_active)
+            self.assertEqual((after.game_state.score, after.game_state.ammo), (300, 7))
+            self.assertEqual(after.game_state.enemies[0]["hp"], 5)
+            self.assertEqual(after.queue_names(), ["Next"])
+
+            # Both come back with their tokens
+            player2, waiting2 = FakeSocket(), FakeSocket()
+            await after.connect(player2, "client", "tok-player")
+            await after.connect(waiting2, "client", "tok-waiting")
+            self.assertEqual(after.current_player_ws, player2)
+            self.assertEqual(after.waiting_queue[0]["ws"], waiting2)
+            self.assertEqual(player2.messages[0], {"type": "session", "name": "Ace"})
+
+            # A dropped player keeps the game through the grace period, then loses it
+            after.disconnect(player2, "client")
+            self.assertTrue(after.game_state.is_active)
+            await clock.advance(RECONNECT_GRACE + 1)
+            self.assertFalse(after.game_state.is_active)
+            self.assertTrue(waiting2.got("match_found"))
+            after.store.close()
+            before.store.close() # Only now, so the "crash" above left its journal open
+
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(run(os.path.join(tmp, "state")))
+
+if __name__ == '__main__':
+    unittest.main()
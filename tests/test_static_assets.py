@@ -0,0 +1,110 @@
+import unittest
+import asyncio
+import gzip
+import os
+import tempfile
+import threading
+import time
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from backend import static_assets
+from backend.static_assets import StaticAssets, IMMUTABLE, REVALIDATE
+
+SCRIPT = b"export function hello() { return 'hello'; }\n" * 50
+
+def make_client(directory):
+    assets = StaticAssets(directory)
+    app = FastAPI()
+
+    @app.get("/static/{path:path}")
+    async def get_static(request: Request, path: str):
+        return await assets.response(request, path)
+
+    return assets, TestClient(app)
+
+class TestStaticAssets(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        with open(os.path.join(self.dir, "app.js"), "wb") as f:
+            f.write(SCRIPT)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_compression_etag_and_caching(self):
+        assets, client = make_client(self.dir)
+        res = client.get("/static/app.js?v=3", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.headers["content-encoding"], "gzip")
+        self.assertEqual(res.headers["cache-control"], IMMUTABLE)
+        self.assertEqual(res.content, SCRIPT) # Client decoded it
+        etag = res.headers["etag"]
+        self.assertTrue(etag.startswith('"') and not etag.startswith('W/'))
+
+        # Unversioned URL revalidates, and a matching ETag gets a 304 from memory
+        res = client.get("/static/app.js", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.headers["cache-control"], REVALIDATE)
+        self.assertGreaterEqual(assets.stats()["memory_hits"], 1)
+
+        # Identity has its own ETag
+        res = client.get("/static/app.js", headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("content-encoding", res.headers)
+        self.assertNotEqual(res.headers["etag"], etag)
+
+    def test_prebuilt_variant_and_staleness(self):
+        path = os.path.join(self.dir, "app.js")
+        marker = gzip.compress(b"// prebuilt\n" + SCRIPT)
+        with open(path + ".gz", "wb") as f:
+            f.write(marker)
+        _, client = make_client(self.dir)
+        res = client.get("/static/app.js", headers={"Accept-Encoding": "gzip"})
+        self.assertTrue(res.content.startswith(b"// prebuilt"))
+
+        # Source edited after the build: the old variant is ignored
+        later = time.time() + 10
+        os.utime(path, (later, later))
+        res = client.get("/static/app.js", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(res.content, SCRIPT)
+
+    def test_large_files_stream_from_disk(self):
+        with open(os.path.join(self.dir, "big.png"), "wb") as f:
+            f.write(os.urandom(static_assets.MAX_MEMORY_FILE + 1))
+        assets, client = make_client(self.dir)
+        res = client.get("/static/big.png")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.content), static_assets.MAX_MEMORY_FILE + 1)
+        self.assertEqual(assets.stats()["hot_files"], 0)
+        self.assertEqual(client.get("/static/big.png", headers={"If-None-Match": res.headers["etag"]}).status_code, 304)
+
+    def test_loads_off_the_loop_once(self):
+        assets = StaticAssets(self.dir)
+        threads = []
+        load_hot = assets.load_hot
+        def tracked(*args):
+            threads.append(threading.get_ident())
+            return load_hot(*args)
+        assets.load_hot = tracked
+
+        async def run():
+            request = Request({"type": "http", "method": "GET", "path": "/", "query_string": b"",
+                               "headers": [(b"accept-encoding", b"gzip")]})
+            # A burst of first requests for the same file
+            responses = await asyncio.gather(*(assets.response(request, "app.js") for _ in range(5)))
+            return threading.get_ident(), responses
+
+        loop_thread, responses = asyncio.run(run())
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], loop_thread)
+        self.assertEqual({r.headers["etag"] for r in responses}, {responses[0].headers["etag"]})
+        self.assertEqual(assets.stats()["hot_files"], 1)
+
+    def test_no_escape(self):
+        assets, client = make_client(self.dir)
+        self.assertIsNone(assets.resolve("../../etc/passwd"))
+        self.assertEqual(client.get("/static/../../etc/passwd").status_code, 404)
+        self.assertEqual(client.get("/static/missing.js").status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+import asyncio
+import json
+from backend.connection import ConnectionManager
+from backend.demand import stream_mode, MODE_FULL, MODE_REDUCED, MODE_KEYFRAME, MODE_PAUSED
+from fakes import FakeSocket
+
+class TestStreamDemand(unittest.TestCase):
+    def test_modes(self):
+        self.assertEqual(stream_mode(True, 0, 0), MODE_FULL)
+        self.assertEqual(stream_mode(False, 3, 1), MODE_REDUCED)
+        self.assertEqual(stream_mode(False, 3, 0), MODE_KEYFRAME)
+        self.assertEqual(stream_mode(False, 0, 0), MODE_PAUSED)
+
+    def test_pi_is_told(self):
+        async def run():
+            manager = ConnectionManager()
+            pi, viewer = FakeSocket(), FakeSocket()
+            await manager.connect(pi, "pi")
+            await manager.connect(viewer, "client")
+            await manager.process_client_message(viewer, {"text": json.dumps({"action": "set_visibility", "visible": False})})
+            manager.disconnect(viewer, "client")
+            await asyncio.sleep(0)
+            manager.ping_task.cancel()
+            manager.game_engine_task.cancel()
+            return pi.of_type("stream_mode", "keyframe")
+
+        messages = asyncio.run(run())
+        self.assertEqual([m.get("mode", "keyframe") for m in messages], [
+            MODE_PAUSED, # Sent as soon as the Pi connects
+            MODE_REDUCED, "keyframe", # First viewer gets a frame straight away
+            MODE_KEYFRAME, # Their tab went to the background
+            MODE_PAUSED
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
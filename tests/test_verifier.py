@@ -0,0 +1,155 @@
+import unittest
+import asyncio
+import json
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from solders.signature import Signature
+from backend.verifier import EntryVerifier, JsonRpc
+
+HOUSE = "House1111"
+PLAYER = "Player1111"
+FEE = 100_000_000
+
+def sig():
+    return str(Signature.new_unique())
+
+class FakeRpcServer:
+    """Local JSON-RPC server answering getSignatureStatuses / getTransaction from a dict."""
+    def __init__(self):
+        self.transactions = {} # signature -> getTransaction result
+        self.statuses_only = set() # Status reported, getTransaction still returns null
+        self.requests = [] # batches received
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                batch = body if isinstance(body, list) else [body]
+                fake.requests.append([r["method"] for r in batch])
+                if fake.down:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                out = [{"jsonrpc": "2.0", "id": r["id"], "result": fake.handle(r["method"], r["params"])} for r in batch]
+                data = json.dumps(out).encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.down = False
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def handle(self, method, params):
+        if method == "getSignatureStatuses":
+            value = []
+            for sig in params[0]:
+                tx = self.transactions.get(sig)
+                if sig in self.statuses_only:
+                    value.append({"err": None, "confirmationStatus": "confirmed"})
+                else:
+                    value.append({"err": tx["meta"]["err"], "confirmationStatus": "confirmed"} if tx else None)
+            return {"value": value}
+        if method == "getTransaction":
+            if params[0] in self.statuses_only:
+                return None
+            return self.transactions.get(params[0])
+
+    def add_transfer(self, sig, payer, dest, amount, err=None):
+        keys = [payer, dest, "11111111111111111111111111111111"]
+        self.transactions[sig] = {
+            "meta": {"err": err, "preBalances": [10 * FEE, 0, 1], "postBalances": [10 * FEE - amount - 5000, amount, 1]},
+            "transaction": {"message": {"accountKeys": keys}}
+        }
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class TestEntryVerifier(unittest.TestCase):
+    def setUp(self):
+        self.rpc = FakeRpcServer()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "used.json")
+
+    def tearDown(self):
+        self.rpc.close()
+        self.tmp.cleanup()
+
+    def make_verifier(self, **kwargs):
+        return EntryVerifier(JsonRpc(self.rpc.url), HOUSE, FEE, min_interval=0.01, max_interval=0.05,
+                             path=self.path, **kwargs)
+
+    def test_verifies_batch(self):
+        good, short, elsewhere, errored = sig(), sig(), sig(), sig()
+        self.rpc.add_transfer(good, PLAYER, HOUSE, FEE)
+        self.rpc.add_transfer(short, PLAYER, HOUSE, FEE // 2)
+        self.rpc.add_transfer(elsewhere, PLAYER, "Other1111", FEE)
+        self.rpc.add_transfer(errored, PLAYER, HOUSE, FEE, err={"InstructionError": 0})
+
+        async def run():
+            verifier = self.make_verifier()
+            results = await asyncio.gather(
+                verifier.verify(good, PLAYER),
+                verifier.verify(short, PLAYER),
+                verifier.verify(elsewhere, PLAYER),
+                verifier.verify(errored, PLAYER),
+                verifier.verify(good, "Someone"),
+                verifier.verify("not-a-signature", PLAYER),
+            )
+            # A ticket can't be reused
+            reused = await verifier.verify(good, PLAYER)
+            verifier.task.cancel()
+            return results, reused
+
+        results, reused = asyncio.run(run())
+        self.assertEqual(results, [True, False, False, False, False, False])
+        self.assertFalse(reused)
+        # All signatures were checked in one status query
+        self.assertIn(["getSignatureStatuses"], self.rpc.requests[:1])
+
+        # ...and still can't be after a restart
+        async def restarted():
+            verifier = self.make_verifier()
+            reused = await verifier.verify(good, PLAYER)
+            # Unless the entry was waiting on it when the server went down
+            resumed = await verifier.verify(good, PLAYER, resume=True)
+            return reused, resumed, await verifier.verify(good, "Someone", resume=True)
+
+        self.assertEqual(asyncio.run(restarted()), (False, True, False))
+
+    def test_times_out(self):
+        missing, late, unserved = sig(), sig(), sig()
+        self.rpc.statuses_only.add(unserved)
+
+        async def run():
+            verifier = self.make_verifier(timeout=0.1)
+            # Lands after the verifier has started polling
+            asyncio.get_running_loop().call_later(0.03, self.rpc.add_transfer, late, PLAYER, HOUSE, FEE)
+            results = await asyncio.gather(verifier.verify(missing, PLAYER), verifier.verify(late, PLAYER),
+                                           verifier.verify(unserved, PLAYER))
+            verifier.task.cancel()
+            return results
+
+        self.assertEqual(asyncio.run(run()), [False, True, False])
+
+    def test_times_out_while_rpc_fails(self):
+        self.rpc.down = True
+
+        async def run():
+            verifier = self.make_verifier(timeout=0.1)
+            result = await asyncio.wait_for(verifier.verify(sig(), PLAYER), timeout=2)
+            verifier.task.cancel()
+            return result
+
+        self.assertFalse(asyncio.run(run()))
+
+if __name__ == '__main__':
+    unittest.main()